@@ -0,0 +1,389 @@
+# benchmark.py
+"""
+Reproducible benchmark for the sorter's hot paths. Needs no network: the AI calls go
+to the local mock server in mock_llm.py.
+
+    python benchmark.py                                  # 200 papers, 0.2 s mock latency
+    python benchmark.py --papers 1000 --latency 0.5 --jitter 0.1 --error-rate 0.02 --json bench.json
+    python benchmark.py --only core                      # core_logic micro-benchmarks only
+
+Phases:
+  corpus      seeded synthetic PDFs: 1-40 pages, sparse to dense text, some with embedded
+              metadata (fast path), some exact and near duplicates, spread over topics
+  core        core_logic and helper functions called directly (text extraction, prompt
+              building and parsing, batching, naming, journal lookup, MinHash)
+  pipeline    ExtractionPipeline against the mock LLM, cold cache and then warm cache
+  duplicates  DuplicateIndex build over half the corpus, then a check for every other paper
+  move        folder suggestion, filename proposal and the move into a library tree
+  large       opt-in (--only large): peak RSS and time to read PDFs of --large-mb sizes (scanned
+              supplement pages past page 5), a truncated copy, a password-protected and a non-PDF
+              file, each in a fresh process, with pypdf's whole-file read and with pdf_guard's map
+
+Reports papers/sec, p50/p99 per stage and peak RSS (this process and its worker processes).
+"""
+
+import argparse
+import json
+import logging
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from queue import Queue
+
+try: import resource
+except ImportError: resource = None  # Windows: peak RSS is not reported
+
+from core_logic import (build_batch_prompt, build_single_prompt, extract_paper, extract_text_snippet, get_papers_details,
+                        parse_batch_response, parse_single_response, plan_batches, propose_filename, safe_rename)
+from duplicates import MINHASH_CHARS, DuplicateIndex, minhash
+from folder_suggest import FolderSuggester
+from journal_index import normalize_journal
+from llm_client import OpenAICompatClient
+from metrics import METRICS, quantile
+from mock_llm import MockLLMServer, guess_details
+from paper_cache import DetailsCache, file_sha256
+from pipeline import ExtractionPipeline
+from rate_limit import make_limiter
+
+PHASES = ("core", "pipeline", "duplicates", "move")
+OPT_IN_PHASES = ("large",)
+
+# ----------------------------
+# Synthetic corpus
+# ----------------------------
+TOPICS = {
+    "Radiology/MRI": (["Magnetic Resonance in Medicine", "Radiology", "Investigative Radiology"],
+                      "relaxation gadolinium contrast agent relaxivity imaging sequence tissue signal field strength voxel diffusion perfusion scanner"),
+    "Radiology/CT": (["European Radiology", "American Journal of Roentgenology", "Academic Radiology"],
+                     "tomography dose iodine attenuation reconstruction kernel hounsfield detector spectral photon counting scanner"),
+    "Chemistry/Coordination": (["Inorganic Chemistry", "Dalton Transactions", "Journal of the American Chemical Society"],
+                               "ligand complex chelate lanthanide coordination stability kinetics synthesis crystal structure spectroscopy"),
+    "Chemistry/Nanomaterials": (["ACS Nano", "Nano Letters", "Advanced Materials"],
+                                "nanoparticle colloid surface coating synthesis particle size shell core ligand assembly"),
+    "Medicine/Nephrology": (["Kidney International", "Journal of the American Society of Nephrology", "Nephrology Dialysis Transplantation"],
+                            "kidney renal dialysis glomerular filtration fibrosis patients cohort clearance injury transplant"),
+    "Medicine/Oncology": (["Journal of Clinical Oncology", "Cancer Research", "The Lancet Oncology"],
+                          "tumor cancer chemotherapy survival metastasis patients trial response immunotherapy biomarker"),
+    "Neuroscience": (["NeuroImage", "Brain", "Annals of Neurology"],
+                     "cortex neuronal connectivity cognition fmri network stroke hippocampus memory cerebral"),
+    "Methods/Statistics": (["Bioinformatics", "Nature Methods", "PLoS ONE"],
+                           "model estimation bayesian inference regression sampling algorithm variance dataset validation"),
+}
+_COMMON = ("the of and in to a with for was were is that by on as from at this these results methods study analysis "
+           "data significant observed compared measured using increased decreased between within").split()
+_SURNAMES = ("Smith Garcia Nguyen Mueller Rossi Tanaka Kowalski Johansson Okafor Silva Dubois Novak Kim Patel Cohen "
+             "Fischer Moreau Ivanova Haddad Larsen Costa Yamamoto Schneider Murphy Ferreira").split()
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: Path, pages: list[str], info: dict = None, images: dict = None):
+    """Minimal PDF (Helvetica, one content stream per page, optional /Info). `images` maps a page index to raw
+    8-bit grey pixels drawn on that page, standing in for scanned figures and supplements."""
+    objects = []; images = images or {}
+    def add(body: bytes) -> int: objects.append(body); return len(objects)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    xobjects = {i: add(b"<< /Type /XObject /Subtype /Image /Width %d /Height 1 /ColorSpace /DeviceGray /BitsPerComponent 8 /Length %d >>\nstream\n"
+                       % (len(pixels), len(pixels)) + pixels + b"\nendstream") for i, pixels in images.items()}
+    pages_id = len(objects) + 2 * len(pages) + 1; kids = []
+    for i, text in enumerate(pages):
+        stream = ("BT /F1 9 Tf 40 760 Td 11 TL " + " ".join(f"({_pdf_escape(l)}) '" for l in text.split("\n")) + " ET").encode("latin-1", "replace")
+        image = b""
+        if i in xobjects: stream += b" q 500 0 0 300 50 50 cm /Im1 Do Q"; image = b" /XObject << /Im1 %d 0 R >>" % xobjects[i]
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R /Resources << /Font << /F1 %d 0 R >>%s >> >>" % (pages_id, content, font, image)))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{k} 0 R" for k in kids).encode(), len(kids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    info_id = add(("<< " + " ".join(f"/{k} ({_pdf_escape(str(v))})" for k, v in info.items()) + " >>").encode("latin-1", "replace")) if info else None
+    out = bytearray(b"%PDF-1.4\n"); offsets = []
+    for i, body in enumerate(objects, 1): offsets.append(len(out)); out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1) + b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R %s>>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, b"/Info %d 0 R " % info_id if info_id else b"", xref)
+    with open(path, "wb") as f:  # in download-sized chunks: one huge write leaves large page-cache folios that inflate mapped RSS
+        for i in range(0, len(out), 64 * 1024): f.write(out[i:i + 64 * 1024])
+
+def _sentences(rng: random.Random, vocab: list[str], words: int, width: int = 95) -> str:
+    text = " ".join(rng.choice(vocab) if rng.random() < 0.35 else rng.choice(_COMMON) for _ in range(words))
+    lines, line = [], ""
+    for w in text.split():
+        if len(line) + len(w) + 1 > width: lines.append(line); line = w
+        else: line = f"{line} {w}".strip()
+    return "\n".join(lines + [line])
+
+def make_corpus(out_dir: Path, n: int, seed: int = 1) -> list[dict]:
+    """Writes n PDFs and returns one record per paper (path, topic, expected metadata, duplicate source)."""
+    rng = random.Random(seed); out_dir.mkdir(parents=True, exist_ok=True); papers = []
+    for i in range(n):
+        r = rng.random()
+        if papers and r < 0.05:  # exact copy under another name
+            src = rng.choice(papers); path = out_dir / f"download_{i:05d}.pdf"; shutil.copyfile(src["path"], path)
+            papers.append({**src, "path": path, "duplicate_of": src["path"].name}); continue
+        topic = rng.choice(list(TOPICS)); journals, vocab = TOPICS[topic]; vocab = vocab.split()
+        authors = [f"{rng.choice('ABCDEFGHJKLMNPRST')}. {rng.choice(_SURNAMES)}" for _ in range(rng.choice((1, 2, 3, 5, 8)))]
+        journal = rng.choice(journals); year = str(rng.randint(1995, 2025))
+        title = " ".join(rng.choice(vocab).capitalize() for _ in range(rng.randint(5, 12)))
+        pages, density = rng.choice((1, 2, 4, 8, 12, 20, 40)), rng.choice((60, 250, 600))
+        first = f"{title}\n{', '.join(authors)}\n{journal} {year}; {rng.randint(1, 80)}({rng.randint(1, 12)}): {rng.randint(1, 900)}\ndoi:10.{rng.randint(1000, 9999)}/bench.{i}\n"
+        body = [first + _sentences(rng, vocab, density)] + [_sentences(rng, vocab, density) for _ in range(pages - 1)]
+        near = papers and r < 0.10  # near duplicate: another paper's text with a new cover line (e.g. accepted manuscript)
+        if near:
+            src = rng.choice([p for p in papers if "duplicate_of" not in p] or papers)
+            body = [f"Accepted manuscript {rng.randint(1, 99999)}\n" + src["first_page"]]; topic, title, journal, year, authors = src["topic"], src["title"], src["journal"], src["year"], src["authors"]
+        info = {"Title": title, "Author": "; ".join(authors), "Subject": f"{journal}, {year}", "CreationDate": f"D:{year}0101"} if rng.random() < 0.2 else None
+        path = out_dir / f"paper_{i:05d}.pdf"; write_pdf(path, body, info)
+        papers.append({"path": path, "topic": topic, "title": title, "journal": journal, "year": year, "authors": authors,
+                       "pages": len(body), "first_page": body[0], **({"duplicate_of": src["path"].name} if near else {})})
+    return papers
+
+# ----------------------------
+# Measurement helpers
+# ----------------------------
+def summarize(samples: list[float], count: int = None, wall: float = None) -> dict:
+    s = sorted(samples); out = {"count": count if count is not None else len(s)}
+    if s: out.update(p50_ms=round(quantile(s, 0.5) * 1000, 3), p99_ms=round(quantile(s, 0.99) * 1000, 3), max_ms=round(s[-1] * 1000, 3))
+    if wall: out["per_sec"] = round(out["count"] / wall, 2)
+    return out
+
+def time_calls(fn, inputs, repeat: int = 1) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        for args in inputs:
+            start = time.perf_counter(); fn(*args); samples.append(time.perf_counter() - start)
+    return samples
+
+def peak_rss_mb() -> dict:
+    if resource is None: return {}
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)  # ru_maxrss is KiB on Linux, bytes on macOS
+    return {"self_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 1),
+            "children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale, 1)}
+
+def metric_stages() -> dict:
+    snap = METRICS.snapshot()["timers"]
+    return {k: {"count": v["count"], "p50_ms": round(v["p50_s"] * 1000, 3), "p99_ms": round(v["p99_s"] * 1000, 3)} for k, v in snap.items()}
+
+# ----------------------------
+# Phases
+# ----------------------------
+def bench_core(papers: list[dict], repeat: int) -> dict:
+    sample = papers[:min(len(papers), 100)]; paths = [(p["path"],) for p in sample]
+    snippets = [extract_text_snippet(p["path"]) or "" for p in sample]
+    batch = {str(i): s for i, s in enumerate(snippets[:8])}
+    batch_reply = json.dumps([{"id": k, **guess_details(v)} for k, v in batch.items()])
+    single_reply = "Here you go:\n" + json.dumps(guess_details(snippets[0])) + "\n"
+    many = {str(i): snippets[i % len(snippets)] for i in range(1000)}
+    details = [guess_details(s) for s in snippets]
+    journals = [(p["journal"],) for p in sample] + [("J Magn Reson Imaging",), ("Proc Natl Acad Sci U S A",), ("Not A Real Journal",)]
+    results = {}
+    def run(name, fn, inputs, reps=repeat):
+        start = time.perf_counter(); samples = time_calls(fn, inputs, reps); results[name] = summarize(samples, wall=time.perf_counter() - start)
+    run("extract_text_snippet", extract_text_snippet, paths, 1)
+    run("extract_paper", extract_paper, paths, 1)
+    run("build_single_prompt", build_single_prompt, [(s,) for s in snippets])
+    run("parse_single_response", parse_single_response, [(single_reply,)] * 50)
+    run("build_batch_prompt[8]", build_batch_prompt, [(batch,)] * 20)
+    run("parse_batch_response[8]", parse_batch_response, [(batch_reply, batch)] * 20)
+    run("plan_batches[1000]", plan_batches, [(many,)] * 3)
+    run("propose_filename", propose_filename, [(dict(d),) for d in details])
+    run("normalize_journal", normalize_journal, journals)
+    run("minhash", minhash, [(s[:MINHASH_CHARS],) for s in snippets])
+    return results
+
+def bench_pipeline(papers: list[dict], server: MockLLMServer, work: Path, args) -> dict:
+    client = OpenAICompatClient(server.base_url, "mock-model", timeout=30); client.limiter = make_limiter({"llm_rpm": args.rpm, "llm_tpm": args.tpm})
+    cache = DetailsCache(work / "cache.sqlite"); results = {}
+    for label in ("cold_cache", "warm_cache"):
+        METRICS.reset(); out = Queue(); failures = []; submitted = {}; latencies = []
+        pipeline = ExtractionPipeline(client, out, cache=cache, extract_workers=args.extract_workers, llm_workers=args.llm_workers,
+                                      batch_max_papers=args.batch, snippet_token_budget=args.snippet_budget,
+                                      retry_delay_s=args.retry_delay, on_failure=lambda mode, path, reason: out.put(("failed", path, reason)))
+        pipeline.start(); start = time.perf_counter()
+        def feed():
+            for p in papers: submitted[p["path"]] = time.perf_counter(); pipeline.submit("bench", p["path"])
+        threading.Thread(target=feed, daemon=True).start()
+        for _ in papers:
+            mode, path, payload = out.get(); latencies.append(time.perf_counter() - submitted[path])
+            if mode == "failed": failures.append(payload)
+        wall = time.perf_counter() - start; pipeline.shutdown()
+        results[label] = {"papers": len(papers), "failed": len(failures), "wall_s": round(wall, 2), "papers_per_sec": round(len(papers) / wall, 2),
+                          "end_to_end": summarize(latencies), "stages": metric_stages(), "counters": METRICS.snapshot()["counters"]}
+    # The synchronous batched path used by "Name Paper(s)" and get_papers_details callers.
+    METRICS.reset(); subset = [p["path"] for p in papers[:min(len(papers), 40)]]
+    start = time.perf_counter(); found = get_papers_details(subset, client, cache=DetailsCache(work / "cache_sync.sqlite"), max_papers=args.batch,
+                                                                   snippet_budget=args.snippet_budget)
+    wall = time.perf_counter() - start
+    results["get_papers_details"] = {"papers": len(subset), "failed": sum(1 for v in found.values() if not v), "wall_s": round(wall, 2),
+                                     "papers_per_sec": round(len(subset) / wall, 2), "stages": metric_stages()}
+    cache.close(); client.close()
+    return results
+
+# One fresh process per file and reader, so ru_maxrss is that read's peak alone.
+_PROBE = """
+import json, sys, time
+from pathlib import Path
+try: import resource
+except ImportError: resource = None
+mode, path = sys.argv[1], Path(sys.argv[2]); start = time.perf_counter()
+try:
+    if mode == "mapped":
+        from core_logic import extract_paper; extract_paper(path)
+    else:
+        from pypdf import PdfReader; reader = PdfReader(path)
+        for i in range(min(5, len(reader.pages))): reader.pages[i].extract_text()
+    result = "ok"
+except Exception as e: result = f"{type(e).__name__}: {e}"
+try: rss = int(next(l for l in open("/proc/self/status") if l.startswith("VmHWM")).split()[1]) / 1024  # Linux: ru_maxrss survives exec
+except OSError: rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1024 * 1024) if resource else None
+print(json.dumps({"seconds": round(time.perf_counter() - start, 3), "peak_rss_mb": rss and round(rss, 1), "result": result[:120]}))
+"""
+
+def bench_large(work: Path, sizes_mb: list[int], seed: int) -> list[dict]:
+    rng = random.Random(seed); out = work / "large"; out.mkdir(parents=True, exist_ok=True); files = []
+    text = ["A Large Thesis With Supplementary Scans\nA. Smith, B. Garcia\nRadiology 2021; 12(3): 45\ndoi:10.1234/large\n" + _sentences(rng, _COMMON, 400)]
+    text += [_sentences(rng, _COMMON, 250) for _ in range(39)]
+    for mb in sizes_mb:
+        path = out / f"large_{mb}mb.pdf"; files.append(path)
+        write_pdf(path, text, images={i: rng.randbytes(mb * 1024 * 1024 // 30) for i in range(10, 40)})
+    largest = files[-1].read_bytes(); files.append(out / "truncated.pdf"); files[-1].write_bytes(largest[:-len(largest) // 8]); del largest
+    files.append(out / "not_a_pdf.pdf"); files[-1].write_bytes(b"<html>login required</html>" * 40)
+    small = out / "small.pdf"; write_pdf(small, text[:3])
+    try:
+        from pypdf import PdfWriter
+        writer = PdfWriter(clone_from=small); writer.encrypt(user_password="secret", algorithm="RC4-128")
+        files.append(out / "password.pdf"); writer.write(files[-1])
+    except Exception as e: logging.warning(f"Skipping the password-protected sample: {e}")
+    rows = []
+    for path in files:
+        for mode in ("pypdf", "mapped"):
+            proc = subprocess.run([sys.executable, "-c", _PROBE, mode, str(path)], capture_output=True, text=True, cwd=Path(__file__).resolve().parent)
+            try: row = json.loads(proc.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError): row = {"result": (proc.stderr.strip().splitlines() or ["no output"])[-1][:120]}
+            rows.append({"file": path.name, "mb": round(path.stat().st_size / 1024 / 1024, 1), "reader": mode, **row})
+    return rows
+
+def bench_duplicates(papers: list[dict], work: Path) -> dict:
+    half = len(papers) // 2; library, incoming = papers[:half], papers[half:]
+    index = DuplicateIndex(work, work / "duplicates.sqlite")
+    start = time.perf_counter()
+    for p in library: index.add(p["path"], file_sha256(p["path"]), extract_text_snippet(p["path"], max_chars=MINHASH_CHARS) or "")
+    build = time.perf_counter() - start
+    texts = {p["path"]: extract_text_snippet(p["path"], max_chars=MINHASH_CHARS) or "" for p in incoming}
+    hashes = {p["path"]: file_sha256(p["path"]) for p in incoming}
+    samples, flagged = [], 0
+    for p in incoming:
+        t0 = time.perf_counter(); matches = index.check(hashes[p["path"]], texts[p["path"]]); samples.append(time.perf_counter() - t0)
+        flagged += bool(matches)
+    expected = sum(1 for p in incoming if "duplicate_of" in p)
+    return {"library": len(library), "build_s": round(build, 2), "check": summarize(samples), "flagged": flagged, "known_duplicates": expected}
+
+def bench_move(papers: list[dict], work: Path) -> dict:
+    library = work / "library"; suggester = FolderSuggester(library, work / "suggest.sqlite")
+    timings = {"suggest": [], "propose_filename": [], "move": [], "index_update": []}; correct = 0; total = 0; start = time.perf_counter()
+    for i, p in enumerate(papers):
+        if not p["path"].exists(): continue
+        text = f"{p['title']}\n{p['first_page']}"
+        t0 = time.perf_counter(); ranked = suggester.suggest(text); timings["suggest"].append(time.perf_counter() - t0)
+        if i >= len(papers) // 4:  # score suggestions once every folder has some papers
+            total += 1; correct += bool(ranked) and ranked[0][0] == library / p["topic"]
+        t0 = time.perf_counter(); name = propose_filename({"author": p["authors"][0].split()[-1], "journal": p["journal"], "year": p["year"],
+                                                           "is_multiple_authors": len(p["authors"]) > 1}); timings["propose_filename"].append(time.perf_counter() - t0)
+        dest = library / p["topic"]; dest.mkdir(parents=True, exist_ok=True)
+        t0 = time.perf_counter(); final = safe_rename(p["path"], dest / name)
+        timings["move"].append(time.perf_counter() - t0)
+        t0 = time.perf_counter(); suggester.add(final, text); timings["index_update"].append(time.perf_counter() - t0)
+    wall = time.perf_counter() - start
+    return {"papers_per_sec": round(len(timings["move"]) / wall, 2), **{k: summarize(v) for k, v in timings.items()},
+            "suggestion_top1_accuracy": round(correct / total, 3) if total else None}
+
+# ----------------------------
+# Report
+# ----------------------------
+def _row(name: str, s: dict) -> str:
+    return f"  {name:<32} {s.get('count', ''):>6} {s.get('p50_ms', ''):>10} {s.get('p99_ms', ''):>10} {s.get('per_sec', ''):>10}"
+
+def print_report(report: dict):
+    header = f"  {'':<32} {'count':>6} {'p50 ms':>10} {'p99 ms':>10} {'per sec':>10}"
+    print(f"\nCorpus: {report['corpus']['papers']} papers, {report['corpus']['pages']} pages, generated in {report['corpus']['seconds']} s")
+    if "core" in report:
+        print("\ncore_logic (direct calls)\n" + header)
+        for name, s in report["core"].items(): print(_row(name, s))
+    if "pipeline" in report:
+        for label, r in report["pipeline"].items():
+            print(f"\npipeline / {label}: {r['papers_per_sec']} papers/s ({r['papers']} papers, {r['failed']} failed, {r['wall_s']} s)\n" + header)
+            if "end_to_end" in r: print(_row("end_to_end", r["end_to_end"]))
+            for name, s in r["stages"].items(): print(_row(name, s))
+    if "duplicates" in report:
+        d = report["duplicates"]
+        print(f"\nduplicates: index of {d['library']} built in {d['build_s']} s; flagged {d['flagged']} (known duplicates: {d['known_duplicates']})\n" + header)
+        print(_row("check", d["check"]))
+    if "move" in report:
+        m = report["move"]
+        print(f"\nmove: {m['papers_per_sec']} papers/s; top-1 folder suggestion accuracy {m['suggestion_top1_accuracy']}\n" + header)
+        for name in ("suggest", "propose_filename", "move", "index_update"): print(_row(name, m[name]))
+    if "large" in report:
+        print(f"\nlarge files (fresh process per read)\n  {'file':<22} {'MB':>7} {'reader':<7} {'peak MB':>8} {'seconds':>8}  result")
+        for r in report["large"]:
+            print(f"  {r['file']:<22} {r['mb']:>7} {r['reader']:<7} {r.get('peak_rss_mb') or '':>8} {r.get('seconds', ''):>8}  {r['result']}")
+    if report.get("peak_rss"): print(f"\nPeak RSS: {report['peak_rss']['self_mb']} MB (worker processes: {report['peak_rss']['children_mb']} MB)")
+    if "mock_llm" in report:
+        m = report["mock_llm"]; print(f"Mock LLM: {m['requests']} requests, {m['errors']} injected errors, {m['quota_rejections']} over quota")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the sorter's hot paths against a synthetic corpus and a mock LLM.")
+    parser.add_argument("--papers", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", default=",".join(PHASES), help=f"comma-separated phases ({', '.join(PHASES + OPT_IN_PHASES)})")
+    parser.add_argument("--large-mb", default="16,64,256", help="file sizes for the large phase, comma-separated")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--quota-rpm", type=int, default=0, help="mock server answers 429 beyond this many requests/minute")
+    parser.add_argument("--extract-workers", type=int, default=2)
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=8, help="max papers per AI request")
+    parser.add_argument("--rpm", type=float, default=0, help="client-side requests/minute limit (0 = off)")
+    parser.add_argument("--tpm", type=float, default=0, help="client-side tokens/minute limit (0 = off)")
+    parser.add_argument("--retry-delay", type=float, default=2.0, help="first retry-queue delay in seconds")
+    parser.add_argument("--snippet-budget", type=int, default=500, help="tokens of compact excerpt per paper (0 = full snippet)")
+    parser.add_argument("--repeat", type=int, default=20, help="repetitions for micro-benchmarks")
+    parser.add_argument("--workdir", help="keep the corpus and indexes here instead of a temporary folder")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the sorter's own log output (injected failures are logged as errors)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL, format='%(asctime)s - %(message)s')
+    phases = [p.strip() for p in args.only.split(",") if p.strip()]
+    unknown = set(phases) - set(PHASES + OPT_IN_PHASES)
+    if unknown: parser.error(f"unknown phase(s): {', '.join(sorted(unknown))}")
+
+    work = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="paper_sorter_bench_")); work.mkdir(parents=True, exist_ok=True)
+    report = {"args": vars(args)}
+    try:
+        start = time.perf_counter(); papers = make_corpus(work / "corpus", args.papers, args.seed)
+        report["corpus"] = {"papers": len(papers), "pages": sum(p["pages"] for p in papers), "seconds": round(time.perf_counter() - start, 2)}
+        if "core" in phases: report["core"] = bench_core(papers, args.repeat)
+        if "pipeline" in phases:
+            server = MockLLMServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, malformed_rate=args.malformed_rate,
+                                   drop_rate=args.drop_rate, seed=args.seed, quota_rpm=args.quota_rpm).start()
+            try: report["pipeline"] = bench_pipeline(papers, server, work, args)
+            finally: server.stop()
+            report["mock_llm"] = {"requests": server.requests, "errors": server.errors, "quota_rejections": server.quota_rejections}
+        if "duplicates" in phases: report["duplicates"] = bench_duplicates(papers, work)
+        if "move" in phases: report["move"] = bench_move(papers, work)  # last: moves the corpus files
+        if "large" in phases: report["large"] = bench_large(work, sorted(int(mb) for mb in args.large_mb.split(",") if mb.strip()), args.seed)
+        report["peak_rss"] = peak_rss_mb()
+    finally:
+        if not args.workdir: shutil.rmtree(work, ignore_errors=True)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(report, f, indent=1, default=str)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
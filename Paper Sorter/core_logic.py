@@ -3,60 +3,441 @@
 import json
 import logging
 import re
+import string
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import google.generativeai as genai
-from pypdf import PdfReader
+from journal_index import normalize_journal
+from metrics import METRICS
+from move_engine import move_file
+from pdf_guard import open_pdf, page_text
+from pdf_metadata import embedded_details
+from rate_limit import error_status, is_retryable, retry_delay
+from snippet_selector import SNIPPET_TOKEN_BUDGET, fill_unknown, needs_wider_context, select_snippet
 
-def get_paper_details(pdf_path: Path, api_key: str):
+if TYPE_CHECKING:  # pypdf loads lazily, inside pdf_guard.open_pdf
+    from pypdf import PdfReader
+
+# Bump when the prompt changes so cached details from the old prompt are not reused.
+PROMPT_VERSION = "v3"
+
+def details_version(client) -> str:
+    # Cached details are only valid for the model (and prompt) that produced them.
+    return f"{client.model}/{PROMPT_VERSION}"
+
+SNIPPET_CHARS = 8000
+SNIPPET_MAX_PAGES = 5
+# Extracted text only depends on the PDF bytes and the budget, so it survives prompt/model changes.
+SNIPPET_VERSION = f"text/{SNIPPET_MAX_PAGES}p/{SNIPPET_CHARS}"
+# Same for the embedded-metadata check, so a cached paper can still take the fast path after a model/prompt change.
+# (The "text/" prefix also keeps these rows out of DetailsCache.latest_details.) Bump the suffix when pdf_metadata's checks change.
+EMBEDDED_VERSION = f"{SNIPPET_VERSION}/embedded/2"
+
+def iter_page_text(reader: "PdfReader", max_pages: int = SNIPPET_MAX_PAGES):
+    # Pages are parsed one at a time, only when the consumer asks for the next one.
+    for i in range(min(max_pages, len(reader.pages))):
+        text = page_text(reader, i)
+        if text is None: return  # time budget spent: keep the pages read so far
+        yield text
+
+def _read_pages(reader: "PdfReader", max_chars: int, max_pages: int) -> list[str]:
+    parts, total = [], 0
+    for extracted in iter_page_text(reader, max_pages):
+        if not extracted: continue
+        parts.append(extracted); total += len(extracted) + 2
+        if total >= max_chars: break  # budget met: later pages are never parsed
+    return parts
+
+def _snippet(parts: list[str], max_chars: int):
+    text_content = "\n\n".join(parts)
+    if not text_content.strip(): return None
+    return text_content[:max_chars]
+
+def extract_text_snippet(pdf_path: Path, max_chars: int = SNIPPET_CHARS, max_pages: int = SNIPPET_MAX_PAGES):
+    # CPU-bound stage; kept at module level so it can run in a process pool.
+    with open_pdf(pdf_path) as reader: return _snippet(_read_pages(reader, max_chars, max_pages), max_chars)
+
+# Embedded metadata must be complete and agree with page one before the LLM call is skipped.
+FAST_PATH_MIN_CONFIDENCE = 1.0
+
+def extract_paper(pdf_path: Path, max_chars: int = SNIPPET_CHARS, max_pages: int = SNIPPET_MAX_PAGES):
+    """One parse for both stages: (text snippet, (embedded details or None, confidence))."""
+    with open_pdf(pdf_path) as reader:
+        parts = _read_pages(reader, max_chars, max_pages)
+        return _snippet(parts, max_chars), embedded_details(reader, parts[0] if parts else "")
+
+def accept_embedded(pdf_path: Path, embedded: tuple, min_confidence: float = FAST_PATH_MIN_CONFIDENCE):
+    details, confidence = embedded
+    if details is None or confidence < min_confidence: return None
+    logging.info(f"Using embedded metadata for {pdf_path.name} (confidence {confidence:.0%}); skipping AI call.")
+    details['journal'] = normalize_journal(details['journal'])
+    METRICS.inc("fast_path_hits")
+    return details
+
+def cached_extraction(pdf_path: Path, cache):
+    """extract_paper's result from the cache, or None if the paper has to be parsed (again)."""
+    text_snippet = cache.get(pdf_path, SNIPPET_VERSION)
+    embedded = cache.get(pdf_path, EMBEDDED_VERSION) if text_snippet is not None else None
+    METRICS.inc("cache_lookups", kind="snippet", result="hit" if embedded is not None else "miss")
+    return (text_snippet, tuple(embedded)) if embedded is not None else None
+
+def cache_extraction(pdf_path: Path, cache, text_snippet, embedded: tuple):
+    if text_snippet: cache.put(pdf_path, text_snippet, SNIPPET_VERSION); cache.put(pdf_path, list(embedded), EMBEDDED_VERSION)
+
+def prepare_paper(pdf_path: Path, cache=None, min_confidence: float = FAST_PATH_MIN_CONFIDENCE):
+    """(embedded details if trustworthy else None, text snippet for the LLM)."""
+    extracted = cached_extraction(pdf_path, cache) if cache is not None else None
+    if extracted is None:
+        with METRICS.timer("stage", stage="extract"): extracted = extract_paper(pdf_path)
+        if cache is not None: cache_extraction(pdf_path, cache, *extracted)
+    text_snippet, embedded = extracted
+    return accept_embedded(pdf_path, embedded, min_confidence), text_snippet
+
+def get_text_snippet(pdf_path: Path, cache=None):
+    """extract_text_snippet with the per-file-hash snippet cache in front of it."""
+    if cache is not None:
+        cached = cache.get(pdf_path, SNIPPET_VERSION)
+        if cached is not None: return cached
+    text_snippet = extract_text_snippet(pdf_path)
+    if text_snippet and cache is not None: cache.put(pdf_path, text_snippet, SNIPPET_VERSION)
+    return text_snippet
+
+FIELD_INSTRUCTIONS = """
+    1. "author": ONLY the last name of the VERY FIRST author listed.
+    2. "year": the 4-digit publication year.
+    3. "journal": official NLM/PubMed journal abbreviation if available; else the full journal name. Preprints => "Preprint".
+    4. "title": the full official title of the paper.
+    5. "is_multiple_authors": boolean true/false."""
+
+def _apply_defaults(details: dict) -> dict:
+    details.setdefault('author', 'Unknown'); details.setdefault('year', 'Unknown')
+    details.setdefault('journal', 'Unknown'); details.setdefault('title', 'Unknown Title')
+    details.setdefault('is_multiple_authors', True)
+    details['journal'] = normalize_journal(details['journal'])  # local index first; the model's own abbreviation otherwise
+    return details
+
+def build_single_prompt(text_snippet: str) -> str:
+    return f"""
+    Analyze text from a research paper and output ONLY a valid JSON object with these keys:{FIELD_INSTRUCTIONS}
+    Example: {{"author": "FitzGerald", "year": "2016", "journal": "Invest Radiol", "title": "A Proposed...", "is_multiple_authors": true}}
+    Paper Text: ---
+    {text_snippet}
+    ---
+    """
+
+# --- Strict reply parsing: the first complete JSON value of the expected shape, checked field by field ---
+class MalformedResponse(ValueError):
+    """The reply is not the JSON the prompt asked for (retried); a valid object with Unknown fields is not malformed."""
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_REPLY_YEAR_RE = re.compile(r"\b(1[5-9]\d\d|20\d\d)\b")
+
+def _first_json(text: str, kind: type):
+    text = _FENCE_RE.sub("", (text or "").strip())
+    try:
+        value = json.loads(text)
+        if isinstance(value, kind): return value
+    except ValueError: pass
+    decoder = json.JSONDecoder()
+    for m in re.finditer(r"\{" if kind is dict else r"\[", text):  # prose around the JSON: decode from each opener
+        try: value, _ = decoder.raw_decode(text, m.start())
+        except ValueError: continue
+        if isinstance(value, kind): return value
+    raise MalformedResponse(f"no JSON {'object' if kind is dict else 'array'} in reply: {text[:80]!r}")
+
+def validate_details(item) -> dict:
+    """Checks one answer against the prompt's schema and normalizes it; raises MalformedResponse."""
+    if not isinstance(item, dict): raise MalformedResponse(f"expected an object, got {type(item).__name__}")
+    if not any(key in item for key in ("author", "year", "journal", "title")): raise MalformedResponse(f"unexpected keys {sorted(item)[:5]}")
+    details = {}
+    for key in ("author", "journal", "title"):
+        value = item.get(key)
+        if isinstance(value, list): value = value[0] if value else None  # e.g. "author": ["FitzGerald"]
+        if value is None or value == "": continue
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool): raise MalformedResponse(f"{key} is {type(value).__name__}")
+        details[key] = str(value).strip()
+    if item.get("year") not in (None, ""):
+        m = _REPLY_YEAR_RE.search(str(item["year"])); details['year'] = m.group(1) if m else 'Unknown'
+    multiple = item.get("is_multiple_authors")
+    if isinstance(multiple, str) and multiple.strip().lower() in ("true", "false", "yes", "no"): multiple = multiple.strip().lower() in ("true", "yes")
+    if isinstance(multiple, (bool, int)): details['is_multiple_authors'] = bool(multiple)
+    elif multiple is not None: raise MalformedResponse(f"is_multiple_authors is {multiple!r}")
+    return _apply_defaults(details)
+
+def parse_single_response(text: str) -> dict:
+    return validate_details(_first_json(text, dict))
+
+def _record_llm_call(kind: str, papers: int, prompt: str, reply: str, seconds: float):
+    METRICS.observe("llm_request", seconds, kind=kind); METRICS.inc("llm_requests", kind=kind); METRICS.inc("llm_papers", papers, kind=kind)
+    METRICS.inc("llm_prompt_chars", len(prompt)); METRICS.inc("llm_prompt_tokens_estimated", estimate_tokens(prompt))
+    METRICS.inc("llm_reply_chars", len(reply or ""))
+
+# --- Pacing and retries: every call reserves quota first; transient failures back off with jitter ---
+def _throttle_wait(client, prompt: str) -> float:
+    if client.limiter is None: return 0.0
+    wait = client.limiter.reserve(estimate_tokens(prompt))
+    if wait > 0: METRICS.observe("llm_throttle_wait", wait)
+    return wait
+
+def _after_reply(client, kind: str, papers: int, prompt: str, reply: str, seconds: float):
+    _record_llm_call(kind, papers, prompt, reply, seconds)
+    if client.limiter is not None: client.limiter.charge(estimate_tokens(reply or ""))
+
+def _retry_wait(client, exc: Exception, kind: str, attempt: int):
+    """Seconds to wait before the next attempt, or None to give up and raise."""
+    METRICS.inc("llm_errors", kind=kind)
+    if attempt + 1 >= client.max_attempts or not is_retryable(exc): return None
+    delay = retry_delay(exc, attempt); status = error_status(exc)
+    if status == 429 and client.limiter is not None: client.limiter.cooldown(delay)  # quota hit: pause every caller, not just this one
+    METRICS.inc("llm_retries", reason=str(status or type(exc).__name__))
+    logging.warning(f"AI request failed ({exc}); retrying in {delay:.1f} s (attempt {attempt + 2}/{client.max_attempts}).")
+    return delay
+
+def _generate(client, prompt: str, kind: str, papers: int = 1) -> str:
+    for attempt in range(client.max_attempts):
+        time.sleep(_throttle_wait(client, prompt)); start = time.perf_counter()
+        try: reply = client.generate(prompt)
+        except Exception as e:
+            delay = _retry_wait(client, e, kind, attempt)
+            if delay is None: raise
+            time.sleep(delay); continue
+        _after_reply(client, kind, papers, prompt, reply, time.perf_counter() - start); return reply
+
+async def _agenerate(client, prompt: str, kind: str, papers: int = 1) -> str:
+    import asyncio  # already loaded by the running event loop; kept off this module's import path
+    for attempt in range(client.max_attempts):
+        await asyncio.sleep(_throttle_wait(client, prompt)); start = time.perf_counter()
+        try: reply = await client.agenerate(prompt)
+        except Exception as e:
+            delay = _retry_wait(client, e, kind, attempt)
+            if delay is None: raise
+            await asyncio.sleep(delay); continue
+        _after_reply(client, kind, papers, prompt, reply, time.perf_counter() - start); return reply
+
+MALFORMED_RETRIES = 1  # extra asks when a single-paper reply is not valid JSON
+
+def _ask_single(client, prompt: str, kind: str) -> dict:
+    for attempt in range(MALFORMED_RETRIES + 1):
+        try: return parse_single_response(_generate(client, prompt, kind))
+        except MalformedResponse as e:
+            METRICS.inc("llm_malformed", kind=kind)
+            if attempt == MALFORMED_RETRIES: raise
+            logging.warning(f"Malformed AI reply ({e}); asking again.")
+
+async def _aask_single(client, prompt: str, kind: str) -> dict:
+    for attempt in range(MALFORMED_RETRIES + 1):
+        try: return parse_single_response(await _agenerate(client, prompt, kind))
+        except MalformedResponse as e:
+            METRICS.inc("llm_malformed", kind=kind)
+            if attempt == MALFORMED_RETRIES: raise
+            logging.warning(f"Malformed AI reply ({e}); asking again.")
+
+# --- Compact excerpts first; the full snippet only when a field comes back Unknown ---
+def _should_widen(details, excerpt: str, text_snippet: str) -> bool:
+    if excerpt == text_snippet or not needs_wider_context(details): return False
+    METRICS.inc("snippet_widened"); return True
+
+def request_paper_details(text_snippet: str, client, snippet_budget: int = SNIPPET_TOKEN_BUDGET):
+    # Network-bound stage: one LLM call for one snippet (two if the excerpt was not enough).
+    excerpt = select_snippet(text_snippet, snippet_budget)
+    details = _ask_single(client, build_single_prompt(excerpt), "single")
+    if _should_widen(details, excerpt, text_snippet):
+        try: details = fill_unknown(details, _ask_single(client, build_single_prompt(text_snippet), "single_widened"))
+        except Exception as e: logging.warning(f"Wider-context request failed ({e}); keeping the first answer.")
+    return details
+
+async def arequest_paper_details(text_snippet: str, client, snippet_budget: int = SNIPPET_TOKEN_BUDGET):
+    excerpt = select_snippet(text_snippet, snippet_budget)
+    details = await _aask_single(client, build_single_prompt(excerpt), "single")
+    if _should_widen(details, excerpt, text_snippet):
+        try: details = fill_unknown(details, await _aask_single(client, build_single_prompt(text_snippet), "single_widened"))
+        except Exception as e: logging.warning(f"Wider-context request failed ({e}); keeping the first answer.")
+    return details
+
+# --- Batch mode: several papers per request to amortize per-call latency ---
+BATCH_TOKEN_BUDGET = 24000
+BATCH_MAX_PAPERS = 8
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1  # ~4 characters per token for English prose
+
+def plan_batches(snippets: dict, token_budget: int = BATCH_TOKEN_BUDGET, max_papers: int = BATCH_MAX_PAPERS) -> list[list[str]]:
+    """Group snippet IDs so each batch stays within the token budget and paper limit."""
+    batches, current, used = [], [], 0
+    for paper_id, text in snippets.items():
+        cost = estimate_tokens(text) + 60  # per-paper delimiter and output overhead
+        if current and (used + cost > token_budget or len(current) >= max_papers):
+            batches.append(current); current, used = [], 0
+        current.append(paper_id); used += cost
+    if current: batches.append(current)
+    return batches
+
+def build_batch_prompt(snippets: dict) -> str:
+    papers = "\n".join(f"=== PAPER id={paper_id} ===\n{text}\n=== END PAPER id={paper_id} ===" for paper_id, text in snippets.items())
+    return f"""
+    Below are text excerpts from {len(snippets)} research papers, each delimited by its id.
+    Output ONLY a valid JSON array with one object per paper. Each object has the key "id" (copied exactly) plus these keys:{FIELD_INSTRUCTIONS}
+    Example: [{{"id": "0", "author": "FitzGerald", "year": "2016", "journal": "Invest Radiol", "title": "A Proposed...", "is_multiple_authors": true}}]
+    {papers}
+    """
+
+def parse_batch_response(text: str, paper_ids) -> dict:
+    """Returns {id: details} for the entries that validate; raises MalformedResponse if there is no JSON array at all."""
+    try: items = _first_json(text, list)
+    except MalformedResponse: METRICS.inc("llm_malformed", kind="batch"); raise
+    results = {}
+    for item in items:
+        paper_id = str(item.get('id', '')) if isinstance(item, dict) else ''
+        if paper_id not in paper_ids or paper_id in results: continue
+        try: results[paper_id] = validate_details(item)
+        except MalformedResponse as e: METRICS.inc("llm_malformed", kind="batch_item"); logging.debug(f"Batch answer for paper {paper_id} rejected: {e}")
+    return results
+
+def request_paper_details_batch(snippets: dict, client) -> dict:
+    """One request for several papers."""
+    return parse_batch_response(_generate(client, build_batch_prompt(snippets), "batch", len(snippets)), snippets)
+
+async def arequest_paper_details_batch(snippets: dict, client) -> dict:
+    return parse_batch_response(await _agenerate(client, build_batch_prompt(snippets), "batch", len(snippets)), snippets)
+
+def _log_partial_batch(batch_ids, missing):
+    if missing: logging.info(f"Batch of {len(batch_ids)} returned {len(batch_ids) - len(missing)} result(s); retrying {len(missing)} individually.")
+
+def _to_widen(results: dict, batched: set, snippets: dict, excerpts: dict) -> dict:
+    # Single requests widen on their own; batched answers with Unknown fields are re-asked together with full snippets.
+    return {i: snippets[i] for i in batched if _should_widen(results.get(i), excerpts[i], snippets[i])}
+
+def request_paper_details_many(snippets: dict, client, token_budget: int = BATCH_TOKEN_BUDGET, max_papers: int = BATCH_MAX_PAPERS,
+                               snippet_budget: int = SNIPPET_TOKEN_BUDGET) -> dict:
+    """Batch the excerpts, then retry only papers missing from a partial or malformed batch on their own."""
+    excerpts = {i: select_snippet(text, snippet_budget) for i, text in snippets.items()}
+    results, batched = {}, set()
+    for batch_ids in plan_batches(excerpts, token_budget, max_papers):
+        if len(batch_ids) > 1:
+            try: results.update(request_paper_details_batch({i: excerpts[i] for i in batch_ids}, client))
+            except Exception as e: logging.warning(f"Batch request for {len(batch_ids)} papers failed: {e}")
+            missing = [i for i in batch_ids if i not in results]; _log_partial_batch(batch_ids, missing)
+            batched.update(i for i in batch_ids if i in results)
+        else: missing = batch_ids
+        for paper_id in missing:
+            try: details = request_paper_details(snippets[paper_id], client, snippet_budget)
+            except Exception as e:
+                logging.error(f"AI processing error for paper {paper_id}: {e}"); details = None
+            if details: results[paper_id] = details
+    wider = _to_widen(results, batched, snippets, excerpts)
+    if wider:
+        answers = request_paper_details_many(wider, client, token_budget, max_papers, snippet_budget=0)
+        for paper_id in wider: results[paper_id] = fill_unknown(results[paper_id], answers.get(paper_id))
+    return results
+
+async def arequest_paper_details_many(snippets: dict, client, token_budget: int = BATCH_TOKEN_BUDGET, max_papers: int = BATCH_MAX_PAPERS,
+                                      snippet_budget: int = SNIPPET_TOKEN_BUDGET) -> dict:
+    """Async request_paper_details_many; individual retries of one batch run concurrently."""
+    import asyncio  # already loaded by the running event loop; kept off this module's import path
+    excerpts = {i: select_snippet(text, snippet_budget) for i, text in snippets.items()}
+    results, batched = {}, set()
+    for batch_ids in plan_batches(excerpts, token_budget, max_papers):
+        if len(batch_ids) > 1:
+            try: results.update(await arequest_paper_details_batch({i: excerpts[i] for i in batch_ids}, client))
+            except Exception as e: logging.warning(f"Batch request for {len(batch_ids)} papers failed: {e}")
+            missing = [i for i in batch_ids if i not in results]; _log_partial_batch(batch_ids, missing)
+            batched.update(i for i in batch_ids if i in results)
+        else: missing = batch_ids
+        answers = await asyncio.gather(*(arequest_paper_details(snippets[i], client, snippet_budget) for i in missing), return_exceptions=True)
+        for paper_id, details in zip(missing, answers):
+            if isinstance(details, BaseException):
+                logging.error(f"AI processing error for paper {paper_id}: {details}"); continue
+            if details: results[paper_id] = details
+    wider = _to_widen(results, batched, snippets, excerpts)
+    if wider:
+        answers = await arequest_paper_details_many(wider, client, token_budget, max_papers, snippet_budget=0)
+        for paper_id in wider: results[paper_id] = fill_unknown(results[paper_id], answers.get(paper_id))
+    return results
+
+def get_paper_details(pdf_path: Path, client, cache=None, snippet_budget: int = SNIPPET_TOKEN_BUDGET):
+    with METRICS.timer("get_paper_details"): return _get_paper_details(pdf_path, client, cache, snippet_budget)
+
+def _get_paper_details(pdf_path: Path, client, cache=None, snippet_budget: int = SNIPPET_TOKEN_BUDGET):
+    version = details_version(client)
+    if cache is not None:
+        cached = cache.get(pdf_path, version)
+        METRICS.inc("cache_lookups", kind="details", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            logging.info(f"Cache hit for {pdf_path.name}; skipping AI call."); return cached
     try:
-        reader = PdfReader(pdf_path); text_content = ""
-        for page in reader.pages[:5]:
-            extracted = page.extract_text()
-            if extracted: text_content += extracted + "\n\n"
-        if not text_content.strip(): return None
-        text_snippet = text_content[:8000]
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash', generation_config={'temperature': 0.0})
-        prompt = f"""
-        Analyze text from a research paper and output ONLY a valid JSON object with these keys:
-        1. "author": ONLY the last name of the VERY FIRST author listed.
-        2. "year": the 4-digit publication year.
-        3. "journal": official NLM/PubMed journal abbreviation if available; else the full journal name. Preprints => "Preprint".
-        4. "title": the full official title of the paper.
-        5. "is_multiple_authors": boolean true/false.
-        Example: {{"author": "FitzGerald", "year": "2016", "journal": "Invest Radiol", "title": "A Proposed...", "is_multiple_authors": true}}
-        Paper Text: ---
-        {text_snippet}
-        ---
-        """
-        response = model.generate_content(prompt)
-        m = re.search(r"\{.*\}", (response.text or ""), re.DOTALL)
-        if not m: return None
-        details = json.loads(m.group(0))
-        details.setdefault('author', 'Unknown'); details.setdefault('year', 'Unknown')
-        details.setdefault('journal', 'Unknown'); details.setdefault('title', 'Unknown Title')
-        details.setdefault('is_multiple_authors', True)
+        details, text_snippet = prepare_paper(pdf_path, cache)
+        if details is None and not text_snippet: return None
+        details = details or request_paper_details(text_snippet, client, snippet_budget)
+        if details and cache is not None: cache.put(pdf_path, details, version)
         return details
     except Exception as e:
         logging.error(f"AI processing error for {pdf_path.name}: {e}")
         return None
 
+def get_papers_details(pdf_paths: list[Path], client, cache=None, token_budget: int = BATCH_TOKEN_BUDGET, max_papers: int = BATCH_MAX_PAPERS,
+                       snippet_budget: int = SNIPPET_TOKEN_BUDGET) -> dict:
+    """Bulk counterpart of get_paper_details: returns {path: details or None} using batched requests."""
+    results, snippets = {}, {}; version = details_version(client)
+    for i, pdf_path in enumerate(pdf_paths):
+        cached = cache.get(pdf_path, version) if cache is not None else None
+        if cache is not None: METRICS.inc("cache_lookups", kind="details", result="hit" if cached is not None else "miss")
+        if cached is not None: results[pdf_path] = cached; continue
+        try: embedded, text_snippet = prepare_paper(pdf_path, cache)
+        except Exception as e:
+            logging.error(f"Text extraction error for {pdf_path.name}: {e}"); embedded, text_snippet = None, None
+        if embedded:
+            if cache is not None: cache.put(pdf_path, embedded, version)
+            results[pdf_path] = embedded
+        elif text_snippet: snippets[str(i)] = text_snippet
+        else: results[pdf_path] = None
+    answers = request_paper_details_many(snippets, client, token_budget, max_papers, snippet_budget)
+    for paper_id in snippets:
+        pdf_path = pdf_paths[int(paper_id)]; details = answers.get(paper_id)
+        if details and cache is not None: cache.put(pdf_path, details, version)
+        results[pdf_path] = details
+    return results
+
 def sanitize_filename_part(part):
     return re.sub(r'[\\/*?:"<>|]', "", str(part).strip()).replace(' ', '_')
 
 def cleanup_author_string(author: str) -> str:
+    if not author: return ''
     if ';' in author: author = author.split(';')[0]
     if ',' in author: author = author.split(',')[0]
     return author.strip()
 
+# --- NEW: filename templates (config "filename_template"), e.g. "{year}_{author}_{short_title}" ---
+FILENAME_TEMPLATE = "{author_et_al}_{journal}_{year}"
+TEMPLATE_FIELDS = ("author", "author_et_al", "journal", "year", "title", "short_title")
+MAX_STEM_CHARS = 120  # leaves room for the folder path under Windows' 260-character limit
+
+def template_fields(details: dict) -> dict:
+    author = cleanup_author_string(details.get('author', 'Unknown')) or 'Unknown'; title = str(details.get('title') or 'Unknown Title')
+    fields = {"author": author, "author_et_al": f"{author} et al" if details.get('is_multiple_authors', True) else author,
+              "journal": details.get('journal', 'Unknown'), "year": details.get('year', 'Unknown'),
+              "title": title, "short_title": " ".join(title.split()[:6])}
+    return {k: sanitize_filename_part(v) for k, v in fields.items()}
+
+def check_template(template: str) -> str:
+    """The template itself; ValueError for an unknown {field} or bad format spec."""
+    unknown = sorted({name for _, name, _, _ in string.Formatter().parse(template) if name is not None} - set(TEMPLATE_FIELDS))
+    if unknown: raise ValueError(f"Unknown field(s) {', '.join(unknown)} in template {template!r}; available: {', '.join(TEMPLATE_FIELDS)}")
+    template.format(**{k: "x" for k in TEMPLATE_FIELDS})
+    return template
+
+def render_template(template: str, details: dict) -> str:
+    """Template filled with sanitized fields. A "/" in the template separates folders; no part is empty or all dots."""
+    rendered = template.format(**template_fields(details)).replace("\\", "/")
+    return "/".join((part.strip(". ") or "Unknown")[:MAX_STEM_CHARS] for part in rendered.split("/"))
+
+def propose_filename(details: dict, template: str = FILENAME_TEMPLATE) -> str:
+    """Filename from a template (default Author_et_al_Journal_Year.pdf), as proposed in the GUI naming dialogs."""
+    return f"{render_template(template.replace('/', '_'), details)}.pdf"
+
 def safe_rename(src: Path, dst: Path) -> Path:
-    if not dst.exists(): src.rename(dst); return dst
-    stem, ext = dst.stem, dst.suffix; i = 1
-    while True:
-        candidate = dst.with_name(f"{stem}-{i}{ext}")
-        if not candidate.exists(): src.rename(candidate); return candidate
-        i += 1
+    """Moves without overwriting: `dst`, or `dst` with the first free -N suffix (see move_engine). Returns the final path."""
+    return move_file(src, dst)
 
 def list_dirs(parent: Path) -> list[Path]:
     try: return sorted([p for p in parent.iterdir() if p.is_dir() and not p.name.startswith('.')])
@@ -0,0 +1,150 @@
+# duplicates.py
+"""
+Content-level duplicate index over the sorted library.
+
+Three signals, strongest first:
+  - exact SHA-256 of the PDF bytes (same file saved under another name),
+  - DOI found in the text (same paper, different file),
+  - MinHash signature of word 3-gram shingles from the opening text, bucketed with
+    LSH bands so a lookup only compares against papers sharing a band (preprint vs.
+    published version, re-downloaded copies with a different cover page).
+
+Everything lives in memory for lookups and is persisted to SQLite.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+from pdf_metadata import find_doi
+
+MINHASH_CHARS = 3000   # roughly the first page
+NUM_PERM = 64
+BANDS, ROWS = 16, 4    # BANDS * ROWS == NUM_PERM; candidate threshold ~ (1/BANDS) ** (1/ROWS) ~= 0.5
+SIMILARITY_THRESHOLD = 0.6
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+
+def _make_perms(n: int) -> list[tuple[int, int]]:
+    # Deterministic so persisted signatures stay comparable across runs.
+    perms = []
+    for i in range(n):
+        d = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        perms.append((int.from_bytes(d[:8], 'little') % (_PRIME - 1) + 1, int.from_bytes(d[8:], 'little') % _PRIME))
+    return perms
+
+_PERMS = _make_perms(NUM_PERM)
+
+def shingles(text: str, k: int = 3) -> set[int]:
+    words = re.findall(r"[a-z0-9]+", (text or "")[:MINHASH_CHARS].lower())
+    grams = (" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1)))
+    return {int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), 'little') for g in grams if g}
+
+def minhash(text: str):
+    sh = shingles(text)
+    if not sh: return None
+    return array('I', (min(((a * x + b) % _PRIME) & _MASK for x in sh) for a, b in _PERMS))
+
+def estimate_similarity(sig_a, sig_b) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+def _band_keys(sig) -> list[tuple[int, bytes]]:
+    return [(b, sig[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+@dataclass
+class DuplicateMatch:
+    path: Path
+    score: float
+    reason: str
+
+class DuplicateIndex:
+    def __init__(self, root: Path, db_path: Path):
+        self.root = Path(root); self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._by_hash: dict[str, set[str]] = {}; self._by_doi: dict[str, set[str]] = {}
+        self._buckets: dict[tuple[int, bytes], set[str]] = {}; self._sigs: dict[str, array] = {}
+        self._rows: dict[str, tuple] = {}
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS papers (path TEXT PRIMARY KEY, sha256 TEXT, doi TEXT, minhash BLOB)")
+        self._load()
+
+    def _load(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT path, sha256, doi, minhash FROM papers").fetchall()
+            for rel, sha, doi, blob in rows:
+                sig = None
+                if blob: sig = array('I'); sig.frombytes(blob)
+                self._index(rel, sha, doi, sig)
+        logging.info(f"Duplicate index loaded: {len(rows)} paper(s).")
+
+    def _index(self, rel: str, sha: str, doi, sig):
+        # Caller holds the lock.
+        self._rows[rel] = (sha, doi, sig)
+        if sha: self._by_hash.setdefault(sha, set()).add(rel)
+        if doi: self._by_doi.setdefault(doi, set()).add(rel)
+        if sig is not None:
+            self._sigs[rel] = sig
+            for key in _band_keys(sig): self._buckets.setdefault(key, set()).add(rel)
+
+    def _unindex(self, rel: str):
+        # Caller holds the lock.
+        sha, doi, sig = self._rows.pop(rel, (None, None, None))
+        if sha: self._by_hash.get(sha, set()).discard(rel)
+        if doi: self._by_doi.get(doi, set()).discard(rel)
+        if sig is not None:
+            self._sigs.pop(rel, None)
+            for key in _band_keys(sig): self._buckets.get(key, set()).discard(rel)
+
+    def __contains__(self, path: Path): return os.path.relpath(str(path), str(self.root)) in self._rows
+    def __len__(self): return len(self._rows)
+
+    def add(self, path: Path, sha256: str, text: str):
+        rel = os.path.relpath(str(path), str(self.root)); doi = find_doi(text); sig = minhash(text)
+        with self._lock, self._conn:
+            self._unindex(rel); self._index(rel, sha256, doi, sig)
+            self._conn.execute("INSERT OR REPLACE INTO papers (path, sha256, doi, minhash) VALUES (?, ?, ?, ?)",
+                               (rel, sha256, doi, sig.tobytes() if sig is not None else None))
+
+    def remove(self, path: Path):
+        rel = os.path.relpath(str(path), str(self.root))
+        with self._lock, self._conn:
+            self._unindex(rel); self._conn.execute("DELETE FROM papers WHERE path = ?", (rel,))
+
+    def move(self, moves):
+        """Re-keys renamed/moved library files without re-reading them; `moves` is (src, dst) pairs in rename order."""
+        with self._lock, self._conn:
+            for src, dst in moves:
+                old, new = os.path.relpath(str(src), str(self.root)), os.path.relpath(str(dst), str(self.root))
+                row = self._rows.get(old)
+                if row is None: continue
+                self._unindex(old); self._index(new, *row)
+                self._conn.execute("DELETE FROM papers WHERE path = ?", (new,)); self._conn.execute("UPDATE papers SET path = ? WHERE path = ?", (new, old))
+
+    def hashes(self) -> dict[str, str]:
+        """Path relative to the library root -> SHA-256 for every indexed paper."""
+        with self._lock: return {rel: row[0] for rel, row in self._rows.items() if row[0]}
+
+    def check(self, sha256: str, text: str, exclude: Path = None) -> list[DuplicateMatch]:
+        """Best match per library file, strongest first. Stale entries (file gone) are dropped."""
+        doi = find_doi(text); sig = minhash(text); found: dict[str, DuplicateMatch] = {}
+        excluded = os.path.relpath(str(exclude), str(self.root)) if exclude else None
+        def offer(rel, score, reason):
+            if rel != excluded and (rel not in found or found[rel].score < score): found[rel] = DuplicateMatch(self.root / rel, score, reason)
+        with self._lock:
+            for rel in self._by_hash.get(sha256, ()): offer(rel, 1.0, "identical file")
+            for rel in self._by_doi.get(doi, ()) if doi else (): offer(rel, 0.99, f"same DOI ({doi})")
+            if sig is not None:
+                candidates = set().union(*(self._buckets.get(key, ()) for key in _band_keys(sig)))
+                for rel in candidates:
+                    score = estimate_similarity(sig, self._sigs[rel])
+                    if score >= SIMILARITY_THRESHOLD: offer(rel, score, "similar text")
+        stale = [rel for rel, m in found.items() if not m.path.exists()]
+        for rel in stale: self.remove(self.root / rel); del found[rel]
+        return sorted(found.values(), key=lambda m: m.score, reverse=True)
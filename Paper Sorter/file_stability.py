@@ -0,0 +1,70 @@
+# file_stability.py
+"""
+Non-blocking "wait until the file is fully written" for watchdog handlers.
+
+Handlers call `track(path)` and return immediately. One timer thread polls every
+pending file's size and mtime; a file fires as soon as both have been unchanged for
+`settle_s`, and all files that settle on the same tick are delivered to `on_stable`
+in a single call, so a sync client dropping hundreds of PDFs becomes a few batched
+enqueues instead of hundreds of sleeping observer callbacks.
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+class StabilityTracker:
+    def __init__(self, on_stable, settle_s: float = 1.0, poll_s: float = 0.5, max_wait_s: float = 120.0):
+        self.on_stable = on_stable  # callback(list[Path]) on the tracker thread
+        self.settle_s = settle_s; self.poll_s = poll_s; self.max_wait_s = max_wait_s
+        self._pending: dict[Path, list] = {}  # path -> [signature, stable_since, first_seen]
+        self._cond = threading.Condition(); self._stopped = False; self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stability-tracker", daemon=True); self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond: self._stopped = True; self._cond.notify()
+
+    def track(self, path: Path):
+        """Non-blocking; safe to call from the watchdog observer thread. Re-tracking restarts the clock."""
+        now = time.monotonic()
+        with self._cond:
+            self._pending[Path(path)] = [None, now, now]; self._cond.notify()
+
+    def pending_count(self) -> int:
+        with self._cond: return len(self._pending)
+
+    @staticmethod
+    def _signature(path: Path):
+        try: st = os.stat(path)
+        except OSError: return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped: self._cond.wait()
+                if self._stopped: return
+                paths = list(self._pending)
+            now = time.monotonic(); ready, expired = [], []
+            sigs = {p: self._signature(p) for p in paths}  # stat outside the lock
+            with self._cond:
+                for path in paths:
+                    state = self._pending.get(path)
+                    if state is None: continue
+                    sig = sigs[path]
+                    if sig != state[0]: state[0], state[1] = sig, now  # still changing (or just appeared)
+                    elif sig is not None and sig[0] > 0 and now - state[1] >= self.settle_s: ready.append(path)
+                    if now - state[2] > self.max_wait_s and path not in ready: expired.append(path)
+                for path in ready + expired: self._pending.pop(path, None)
+            for path in expired: logging.warning(f"Gave up waiting for '{path.name}' to finish writing.")
+            if ready:
+                try: self.on_stable(ready)
+                except Exception as e: logging.error(f"Stability callback failed: {e}")
+            deadline = time.monotonic() + self.poll_s
+            with self._cond:  # full poll interval even if track() notifies, so bursts don't cause re-stat storms
+                while not self._stopped and (remaining := deadline - time.monotonic()) > 0: self._cond.wait(remaining)
@@ -0,0 +1,123 @@
+# filename_index.py
+"""
+In-memory prefix index of the PDF filenames under SORTED_FOLDER.
+
+Replaces the per-paper `SORTED_FOLDER.rglob(f"{base}*.pdf")` duplicate check with a
+bisect lookup over a sorted array of case-folded filenames. The array is persisted
+between runs, refreshed by one background scan at startup and kept current by a
+watchdog handler on the sorted tree. Events that arrive while a rescan runs are applied
+to the current array and replayed onto the fresh one when it is swapped in.
+"""
+
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left, insort
+from pathlib import Path
+
+from watchdog.events import FileSystemEventHandler
+
+def _insert(entries: list, item: tuple):
+    i = bisect_left(entries, item)
+    if i == len(entries) or entries[i] != item: insort(entries, item)
+
+def _delete(entries: list, item: tuple):
+    i = bisect_left(entries, item)
+    if i < len(entries) and entries[i] == item: del entries[i]
+
+class FilenameIndex:
+    def __init__(self, root: Path, index_path: Path):
+        self.root = Path(root); self.index_path = Path(index_path)
+        self._lock = threading.Lock(); self._rebuild_lock = threading.Lock()  # one rescan at a time
+        self._entries: list[tuple[str, str]] = []  # sorted (casefolded filename, path relative to root)
+        self._pending = None  # (add?, item) events seen during a rescan, replayed onto its result
+
+    def _rel(self, path: Path) -> str:
+        return os.path.relpath(str(path), str(self.root))
+
+    def load(self) -> bool:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f: data = json.load(f)
+            if data.get("root") != str(self.root): return False
+            entries = sorted((name.casefold(), rel) for name, rel in ((Path(rel).name, rel) for rel in data.get("files", [])))
+        except (OSError, ValueError): return False
+        with self._lock: self._entries = entries
+        return True
+
+    def save(self):
+        with self._lock: files = [rel for _, rel in self._entries]
+        tmp = self.index_path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f: json.dump({"root": str(self.root), "files": files}, f)
+            os.replace(tmp, self.index_path)
+        except OSError as e: logging.warning(f"Could not save filename index: {e}")
+
+    def rebuild(self):
+        """Full scan of the sorted tree (os.scandir, no per-file stat)."""
+        with self._rebuild_lock:
+            with self._lock: self._pending = []
+            try:
+                entries = self._scan()
+                with self._lock:
+                    for added, item in self._pending: (_insert if added else _delete)(entries, item)
+                    self._entries = entries
+            finally:
+                with self._lock: self._pending = None
+        logging.info(f"Filename index built: {len(entries)} PDF(s) under {self.root}.")
+
+    def _scan(self) -> list:
+        entries, stack = [], [str(self.root)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith('.'): stack.append(entry.path)
+                        elif entry.name.lower().endswith('.pdf'): entries.append((entry.name.casefold(), self._rel(entry.path)))
+            except OSError: continue
+        entries.sort(); return entries
+
+    def rebuild_in_background(self):
+        def _run(): self.rebuild(); self.save()
+        threading.Thread(target=_run, name="filename-index-scan", daemon=True).start()
+
+    def add(self, path: Path):
+        path = Path(path)
+        if path.suffix.lower() != '.pdf': return
+        item = (path.name.casefold(), self._rel(path))
+        with self._lock:
+            _insert(self._entries, item)
+            if self._pending is not None: self._pending.append((True, item))
+
+    def remove(self, path: Path):
+        path = Path(path); item = (path.name.casefold(), self._rel(path))
+        with self._lock:
+            _delete(self._entries, item)
+            if self._pending is not None: self._pending.append((False, item))
+
+    def find_prefix(self, prefix: str) -> list[Path]:
+        """Equivalent of rglob(f"{prefix}*.pdf"), matched case-insensitively."""
+        key = prefix.casefold(); matches = []
+        with self._lock:
+            i = bisect_left(self._entries, (key, ""))
+            while i < len(self._entries) and self._entries[i][0].startswith(key):
+                matches.append(self.root / self._entries[i][1]); i += 1
+        return matches
+
+    def all_paths(self) -> list[Path]:
+        with self._lock: return [self.root / rel for _, rel in self._entries]
+
+    def __len__(self): return len(self._entries)
+
+class FilenameIndexHandler(FileSystemEventHandler):
+    """Keeps a FilenameIndex current from watchdog events on the sorted tree."""
+    def __init__(self, index: FilenameIndex): self.index = index
+    def on_created(self, event):
+        if not event.is_directory: self.index.add(Path(event.src_path))
+    def on_deleted(self, event):
+        if not event.is_directory: self.index.remove(Path(event.src_path))
+        else: self.index.rebuild_in_background()  # a whole folder went away
+    def on_moved(self, event):
+        if event.is_directory: self.index.rebuild_in_background(); return
+        self.index.remove(Path(event.src_path)); self.index.add(Path(event.dest_path))
@@ -0,0 +1,134 @@
+# folder_suggest.py
+"""
+Suggests destination folders for a new paper from the papers already sorted there.
+
+Each library paper's opening text (title, authors, abstract) becomes a hashed word
+unigram + bigram vector, log-scaled and L2-normalized. Vectors are summed into one
+row per folder of a NumPy matrix, so a query costs one sparse dot product per folder
+regardless of how many papers the library holds. Ranking is TF-IDF cosine between the
+query and each folder's centroid. Per-paper vectors are kept in SQLite, so a paper
+can be added or removed incrementally and the matrix rebuilt quickly at startup.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+SUGGEST_CHARS = 2000   # title block and abstract
+FEATURE_DIM = 1 << 13  # hashed feature space; collisions are harmless at folder granularity
+_STOP_WORDS = {"the", "and", "for", "with", "from", "that", "this", "are", "was", "were", "into", "using", "use",
+               "our", "their", "its", "has", "have", "been", "can", "which", "not", "but", "all", "also", "these",
+               "between", "than", "such", "both", "may", "each", "other", "here", "however", "doi", "http", "https", "www"}
+
+def text_features(text: str) -> tuple:
+    """(feature indices, weights) for a text; empty arrays when there are no usable words."""
+    words = [w for w in re.findall(r"[a-z][a-z0-9\-]{2,}", (text or "")[:SUGGEST_CHARS].lower()) if w not in _STOP_WORDS]
+    counts: dict[int, int] = {}
+    for gram in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        j = zlib.crc32(gram.encode()) & (FEATURE_DIM - 1); counts[j] = counts.get(j, 0) + 1
+    if not counts: return np.zeros(0, np.int32), np.zeros(0, np.float32)
+    idx = np.fromiter(counts.keys(), np.int32, len(counts))
+    val = 1.0 + np.log(np.fromiter(counts.values(), np.float32, len(counts)))
+    return idx, (val / np.linalg.norm(val)).astype(np.float32)
+
+class FolderSuggester:
+    def __init__(self, root: Path, db_path: Path):
+        self.root = Path(root); self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._folders: list[str] = []; self._folder_row: dict[str, int] = {}
+        self._sums = np.zeros((16, FEATURE_DIM), np.float32)  # one row per folder, grown by doubling
+        self._counts = np.zeros(16, np.int32)                 # papers per folder
+        self._df = np.zeros(FEATURE_DIM, np.float32)          # papers containing each feature
+        self._docs: dict[str, tuple] = {}                     # rel path -> (folder, idx, val)
+        self._norms = None                                    # cached ||sum_f * idf||, reset on every update
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS docs (path TEXT PRIMARY KEY, folder TEXT, idx BLOB, val BLOB)")
+        self._load()
+
+    def _load(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT path, folder, idx, val FROM docs").fetchall()
+            for rel, folder, idx, val in rows:
+                self._apply(rel, folder, np.frombuffer(idx, np.int32), np.frombuffer(val, np.float32), +1)
+        logging.info(f"Folder suggestion index loaded: {len(rows)} paper(s) in {len(self._folders)} folder(s).")
+
+    def _row(self, folder: str) -> int:
+        # Caller holds the lock.
+        row = self._folder_row.get(folder)
+        if row is None:
+            row = self._folder_row[folder] = len(self._folders); self._folders.append(folder)
+            if row >= len(self._sums):
+                self._sums = np.vstack([self._sums, np.zeros_like(self._sums)]); self._counts = np.concatenate([self._counts, np.zeros_like(self._counts)])
+        return row
+
+    def _apply(self, rel: str, folder: str, idx, val, sign: int):
+        # Caller holds the lock.
+        row = self._row(folder)
+        self._sums[row, idx] += sign * val; self._counts[row] += sign; self._df[idx] += sign
+        if sign > 0: self._docs[rel] = (folder, idx, val)
+        else: self._docs.pop(rel, None)
+        self._norms = None
+
+    def _rel(self, path: Path) -> str: return os.path.relpath(str(path), str(self.root))
+
+    def add(self, path: Path, text: str):
+        rel = self._rel(path); folder = os.path.dirname(rel)
+        if not folder or folder.startswith('..'): return  # papers at the root or outside it don't describe a folder
+        idx, val = text_features(text)
+        if not len(idx): return
+        with self._lock, self._conn:
+            old = self._docs.get(rel)
+            if old is not None: self._apply(rel, old[0], old[1], old[2], -1)
+            self._apply(rel, folder, idx, val, +1)
+            self._conn.execute("INSERT OR REPLACE INTO docs (path, folder, idx, val) VALUES (?, ?, ?, ?)", (rel, folder, idx.tobytes(), val.tobytes()))
+
+    def remove(self, path: Path):
+        rel = self._rel(path)
+        with self._lock, self._conn:
+            old = self._docs.get(rel)
+            if old is not None: self._apply(rel, old[0], old[1], old[2], -1)
+            self._conn.execute("DELETE FROM docs WHERE path = ?", (rel,))
+
+    def move(self, moves):
+        """Re-keys renamed/moved papers (vectors follow to the new folder's centroid); `moves` is (src, dst) pairs in rename order."""
+        with self._lock, self._conn:
+            for src, dst in moves:
+                old, new = self._rel(src), self._rel(dst); folder = os.path.dirname(new)
+                doc = self._docs.get(old)
+                if doc is None: continue
+                self._apply(old, doc[0], doc[1], doc[2], -1)
+                if not folder or folder.startswith('..'): self._conn.execute("DELETE FROM docs WHERE path = ?", (old,)); continue
+                self._apply(new, folder, doc[1], doc[2], +1)
+                self._conn.execute("DELETE FROM docs WHERE path = ?", (new,))
+                self._conn.execute("UPDATE docs SET path = ?, folder = ? WHERE path = ?", (new, folder, old))
+
+    def suggest(self, text: str, limit: int = 3, min_score: float = 0.05) -> list[tuple[Path, float]]:
+        """Best folders for a paper's opening text, as (folder path, cosine score), strongest first."""
+        q_idx, q_val = text_features(text)
+        with self._lock:
+            n = len(self._folders)
+            if not n or not len(q_idx): return []
+            docs = max(len(self._docs), 1); idf = np.log((docs + 1) / (self._df + 1)) + 1.0
+            if self._norms is None: self._norms = np.sqrt(np.square(self._sums[:n]) @ np.square(idf))
+            w = q_val * np.square(idf[q_idx])
+            scores = (self._sums[:n, q_idx] @ w) / (self._norms * np.linalg.norm(q_val * idf[q_idx]) + 1e-9)
+            scores[self._counts[:n] <= 0] = 0.0
+            best = np.argsort(-scores)[:limit]
+            return [(self.root / self._folders[i], float(scores[i])) for i in best if scores[i] >= min_score]
+
+    def prune(self, pdf_paths) -> int:
+        """Drops papers that are no longer in the library (`pdf_paths`); returns how many."""
+        present = {self._rel(p) for p in pdf_paths}
+        with self._lock: stale = [rel for rel in self._docs if rel not in present]
+        for rel in stale: self.remove(self.root / rel)
+        return len(stale)
+
+    def __contains__(self, path: Path): return self._rel(path) in self._docs
+    def __len__(self): return len(self._docs)
@@ -0,0 +1,121 @@
+# folder_tree.py
+"""
+In-memory cache of the folder tree under SORTED_FOLDER, for the destination picker.
+
+Expanding a level in FolderPicker used to list the directory from disk every time,
+which is slow on OneDrive and network shares. The tree is built by one background
+scan, kept current by a watchdog handler on the sorted tree, and answers both
+per-level listings and a type-ahead fuzzy search over every folder at any depth.
+"""
+
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+
+from watchdog.events import FileSystemEventHandler
+
+from metrics import METRICS
+
+def _tightest_span(term: str, text: str):
+    """Length of the shortest window of `text` containing `term` as a subsequence; None if there is none."""
+    best, start = None, text.find(term[0])
+    while start >= 0:
+        pos = start
+        for ch in term[1:]:
+            pos = text.find(ch, pos + 1)
+            if pos < 0: return best
+        if best is None or pos - start + 1 < best: best = pos - start + 1
+        start = text.find(term[0], start + 1)
+    return best
+
+def fuzzy_score(query: str, rel: str):
+    """Score for a relative folder path against a space-separated query; None if any term doesn't match."""
+    path = rel.casefold().replace('\\', '/'); leaf = path.rsplit('/', 1)[-1]; parts = path.split('/'); score = 0.0
+    for term in query.casefold().split():
+        if term in leaf: score += 4 + (2 if leaf.startswith(term) else 0)
+        elif any(p.startswith(term) for p in parts): score += 3
+        elif term in path: score += 2
+        elif len(term) > 1 and term in "".join(w[0] for w in re.split(r'[^a-z0-9]+', path) if w): score += 2  # initials: "ml" -> Machine Learning
+        else:  # loose subsequence ("catlys" -> "Catalysis"), only if the letters sit close together
+            span = _tightest_span(term, path)
+            if span is None or span > 2 * len(term): return None
+            score += 1 - (span - len(term)) / (2 * len(term))
+    return score - 0.01 * len(parts)  # shallower folders win ties
+
+class FolderTree:
+    def __init__(self, root: Path):
+        self.root = Path(root); self._lock = threading.Lock()
+        self._children: dict[str, list[str]] = {}  # relative folder path ("" for root) -> sorted child folder names
+        self.ready = threading.Event()  # set once the first full scan has finished
+
+    def _rel(self, path: Path) -> str:
+        rel = os.path.relpath(str(path), str(self.root))
+        return "" if rel == "." else rel
+
+    @staticmethod
+    def _list(path: str) -> list[str]:
+        try:
+            with os.scandir(path) as it:
+                return sorted(e.name for e in it if e.is_dir(follow_symlinks=False) and not e.name.startswith('.'))
+        except OSError: return []
+
+    def _scan(self, rel: str) -> dict[str, list[str]]:
+        found, stack = {}, [rel]
+        while stack:
+            cur = stack.pop(); names = self._list(str(self.root / cur) if cur else str(self.root))
+            found[cur] = names; stack.extend(os.path.join(cur, n) if cur else n for n in names)
+        return found
+
+    def rebuild(self):
+        found = self._scan("")
+        with self._lock: self._children = found
+        self.ready.set()
+        logging.info(f"Folder tree built: {len(found)} folder(s) under {self.root}.")
+
+    def children(self, parent: Path) -> list[Path]:
+        """Cached equivalent of list_dirs(parent); falls back to the disk for folders not seen yet."""
+        rel = self._rel(parent)
+        with self._lock: names = self._children.get(rel)
+        METRICS.inc("folder_list", source="cache" if names is not None else "disk")
+        if names is None:
+            with METRICS.timer("stage", stage="folder_list_disk"): names = self._list(str(parent))
+            with self._lock: self._children[rel] = names
+        return [Path(parent) / n for n in names]
+
+    def add_dir(self, path: Path):
+        rel = self._rel(path)
+        if rel.startswith('..') or Path(path).name.startswith('.'): return
+        found = self._scan(rel)  # a moved-in folder can bring a whole subtree
+        parent, name = os.path.split(rel)
+        with self._lock:
+            self._children.update(found)
+            siblings = self._children.get(parent)
+            if siblings is not None and name not in siblings: siblings.append(name); siblings.sort()
+
+    def remove_dir(self, path: Path):
+        rel = self._rel(path); parent, name = os.path.split(rel); prefix = rel + os.sep
+        with self._lock:
+            for key in [k for k in self._children if k == rel or k.startswith(prefix)]: del self._children[key]
+            siblings = self._children.get(parent)
+            if siblings is not None and name in siblings: siblings.remove(name)
+
+    def search(self, query: str, limit: int = 12) -> list[Path]:
+        if not query.strip(): return []
+        with self._lock: folders = [k for k in self._children if k]
+        scored = [(s, rel) for rel in folders if (s := fuzzy_score(query, rel)) is not None]
+        scored.sort(key=lambda item: (-item[0], item[1].casefold()))
+        return [self.root / rel for _, rel in scored[:limit]]
+
+    def __len__(self): return len(self._children)
+
+class FolderTreeHandler(FileSystemEventHandler):
+    """Keeps a FolderTree current from directory events on the sorted tree."""
+    def __init__(self, tree: FolderTree): self.tree = tree
+    def on_created(self, event):
+        if event.is_directory: self.tree.add_dir(Path(event.src_path))
+    def on_deleted(self, event):
+        self.tree.remove_dir(Path(event.src_path))  # Windows reports deleted folders with is_directory=False; no-op for files
+    def on_moved(self, event):
+        if event.is_directory: self.tree.remove_dir(Path(event.src_path)); self.tree.add_dir(Path(event.dest_path))
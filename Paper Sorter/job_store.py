@@ -0,0 +1,83 @@
+# job_store.py
+"""
+Durable per-file job state for the sorter, backed by SQLite.
+
+    queued -> extracting -> awaiting_review -> done
+                        \\-> failed (retried on the next start while retries < max_retries)
+
+One row per path, remembering the content hash it was enqueued with. Enqueueing a
+path whose job is already active with the same hash is a no-op, so the startup scan
+and the watchdog handler can both report the same file without paying for two
+extractions. Extracted details are stored with the job, so after a crash or a closed
+window, papers that were waiting for review come straight back without re-extraction.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+QUEUED, EXTRACTING, AWAITING_REVIEW, DONE, FAILED = "queued", "extracting", "awaiting_review", "done", "failed"
+ACTIVE_STATES = (QUEUED, EXTRACTING, AWAITING_REVIEW)
+
+@dataclass
+class Job:
+    path: Path
+    mode: str
+    state: str
+    sha256: str
+    retries: int
+    details: dict = None
+    error: str = None
+
+class JobStore:
+    def __init__(self, db_path: Path, max_retries: int = 3):
+        self.db_path = Path(db_path); self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS jobs (path TEXT PRIMARY KEY, mode TEXT, state TEXT, sha256 TEXT,
+                                  retries INTEGER DEFAULT 0, details TEXT, error TEXT, updated REAL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+
+    def enqueue(self, path: Path, mode: str, sha256: str) -> bool:
+        """True if the caller should process the file; False if an identical job is already active or exhausted."""
+        key = str(path)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT state, sha256, retries FROM jobs WHERE path = ?", (key,)).fetchone()
+            if row is not None and row[1] == sha256:
+                state, _, retries = row
+                if state in ACTIVE_STATES: return False
+                if state == FAILED and retries >= self.max_retries: return False
+                retries = retries if state == FAILED else 0
+            else: retries = 0  # new file, or the same name with different content
+            self._conn.execute("INSERT OR REPLACE INTO jobs (path, mode, state, sha256, retries, details, error, updated) VALUES (?, ?, ?, ?, ?, NULL, NULL, ?)",
+                               (key, mode, QUEUED, sha256, retries, time.time()))
+        return True
+
+    def set_state(self, path: Path, state: str, details: dict = None, error: str = None):
+        with self._lock, self._conn:
+            if state == FAILED:
+                self._conn.execute("UPDATE jobs SET state = ?, error = ?, retries = retries + 1, updated = ? WHERE path = ?", (state, error, time.time(), str(path)))
+            elif details is not None:
+                self._conn.execute("UPDATE jobs SET state = ?, details = ?, updated = ? WHERE path = ?", (state, json.dumps(details), time.time(), str(path)))
+            else:
+                self._conn.execute("UPDATE jobs SET state = ?, updated = ? WHERE path = ?", (state, time.time(), str(path)))
+
+    def resumable(self) -> list[Job]:
+        """Unfinished jobs plus failures that still have retries left, oldest first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, mode, state, sha256, retries, details, error FROM jobs WHERE state IN (?, ?, ?) OR (state = ? AND retries < ?) ORDER BY updated",
+                                      (*ACTIVE_STATES, FAILED, self.max_retries)).fetchall()
+        return [Job(Path(p), m, st, sha, r, json.loads(d) if d else None, e) for p, m, st, sha, r, d, e in rows]
+
+    def prune(self, older_than_days: float = 30):
+        """Drop finished jobs so the table doesn't grow without bound."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE state = ? AND updated < ?", (DONE, time.time() - older_than_days * 86400))
+
+    def close(self):
+        with self._lock: self._conn.close()
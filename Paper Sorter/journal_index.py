@@ -0,0 +1,179 @@
+# journal_index.py
+"""
+Offline journal-name index used to normalize the `journal` field to its NLM abbreviation.
+
+The index file (journals.idx) is plain text, one `key<TAB>abbreviation` line per key,
+sorted by key. Every journal contributes several keys: its normalized full name, the
+same name without stop words, its normalized NLM abbreviation and its ISSN. Lookups
+memory-map the file and binary-search it in place, so opening the index costs a few
+milliseconds and the table is never materialized as Python objects.
+
+Build or refresh the index:
+
+    python journal_index.py build journals.tsv            # bundled seed table
+    python journal_index.py build J_Medline.txt           # full NLM catalog (ftp.ncbi.nlm.nih.gov/pubmed/)
+"""
+
+import difflib
+import logging
+import mmap
+import re
+import sys
+import unicodedata
+from pathlib import Path
+
+INDEX_FILENAME = "journals.idx"
+_STOP_WORDS = {"the", "of", "and", "for", "in", "on", "a", "an", "de", "la"}
+ISSN_RE = re.compile(r'\b(\d{4})-?(\d{3}[\dxX])\b')
+FUZZY_MIN_RATIO = 0.88
+FUZZY_WORD_RATIO = 0.88   # per word: a typo ("Radiolgy"), not a different word ("Biochemistry" ~ "Chemistry" is 0.86)
+FUZZY_SCAN_LIMIT = 400
+
+def normalize_key(name: str) -> str:
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower().replace('&', ' and ')
+    return " ".join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+def compact_key(name: str) -> str:
+    return " ".join(w for w in normalize_key(name).split() if w not in _STOP_WORDS)
+
+def _word_match(a: str, b: str) -> bool:
+    if a == b: return True
+    short, long = sorted((a, b), key=len)
+    if len(short) >= 4 and long.startswith(short): return True  # abbreviation: "chem" ~ "chemistry"
+    return a[0] == b[0] and difflib.SequenceMatcher(None, a, b).ratio() >= FUZZY_WORD_RATIO
+
+def words_align(query: str, key: str, truncated: bool = False) -> bool:
+    """Every word of the query matches the candidate's word at the same position, and the candidate has no
+    words left over (unless the query is a shortened full title). Character-level similarity alone maps
+    "Analytical Biochemistry" onto "Anal Chem"."""
+    q, k = query.split(), key.split()
+    if len(q) > len(k) or (len(q) < len(k) and not truncated): return False
+    return all(_word_match(a, b) for a, b in zip(q, k))
+
+# ----------------------------
+# Building
+# ----------------------------
+def read_seed_tsv(path: Path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip(): continue
+            full, issn, abbr = (line.rstrip('\n').split('\t') + ['', ''])[:3]
+            yield full.strip(), [issn.strip()] if issn.strip() else [], abbr.strip()
+
+def read_medline(path: Path):
+    """Parses NLM's J_Medline.txt (records separated by dashed lines)."""
+    record = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('---'):
+                if record.get('MedAbbr'):
+                    issns = [record.get(k, '') for k in ('ISSN (Print)', 'ISSN (Online)') if record.get(k)]
+                    yield record.get('JournalTitle', ''), issns, record['MedAbbr']
+                record = {}; continue
+            key, _, value = line.partition(':'); record[key.strip()] = value.strip()
+    if record.get('MedAbbr'): yield record.get('JournalTitle', ''), [], record['MedAbbr']
+
+def build_index(journals, out_path: Path) -> int:
+    entries = {}
+    for full, issns, abbr in journals:
+        if not abbr: continue
+        keys = [normalize_key(full), compact_key(full), normalize_key(abbr)] + [i.upper().replace('-', '') for i in issns]
+        for key in keys:
+            if key and '\t' not in abbr: entries.setdefault(key, abbr)  # first journal wins on collisions
+    lines = sorted(f"{k}\t{v}\n".encode('utf-8') for k, v in entries.items())
+    tmp = Path(out_path).with_suffix('.tmp')
+    with open(tmp, 'wb') as f: f.writelines(lines)
+    tmp.replace(out_path)
+    return len(lines)
+
+# ----------------------------
+# Lookup
+# ----------------------------
+class JournalIndex:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _line(self, start: int) -> tuple[bytes, bytes, int]:
+        end = self._mm.find(b'\n', start)
+        if end < 0: end = len(self._mm)
+        key, _, value = self._mm[start:end].partition(b'\t')
+        return key, value, end + 1
+
+    def _lower_bound(self, target: bytes) -> int:
+        """Offset of the first line whose key is >= target."""
+        lo, hi = 0, len(self._mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._mm.rfind(b'\n', 0, mid) + 1
+            key, _, nxt = self._line(start)
+            if key < target: lo = nxt
+            else: hi = start
+        return lo
+
+    def exact(self, key: str):
+        target = key.encode('utf-8'); pos = self._lower_bound(target)
+        if pos >= len(self._mm): return None
+        k, v, _ = self._line(pos)
+        return v.decode('utf-8') if k == target else None
+
+    def _prefix_scan(self, prefix: str):
+        target = prefix.encode('utf-8'); pos = self._lower_bound(target)
+        for _ in range(FUZZY_SCAN_LIMIT):
+            if pos >= len(self._mm): return
+            k, v, pos = self._line(pos)
+            if not k.startswith(target): return
+            yield k.decode('utf-8'), v.decode('utf-8')
+
+    def lookup(self, name: str):
+        """(NLM abbreviation, score) for a journal name, abbreviation or ISSN; None if nothing is close."""
+        if not name: return None
+        m = ISSN_RE.search(name)
+        if m:
+            hit = self.exact(f"{m.group(1)}{m.group(2).upper()}")
+            if hit: return hit, 1.0
+        for key in (normalize_key(name), compact_key(name)):
+            hit = self.exact(key)
+            if hit: return hit, 1.0
+        query = compact_key(name)
+        if len(query) < 4: return None
+        best = None; long_query = len(query.split()) >= 3
+        for key, abbr in self._prefix_scan(query.split()[0][:4]):
+            if query.replace(" ", "") == key.replace(" ", ""): return abbr, 1.0  # "Proc Natl Acad Sci USA" ~ "... U S A"
+            truncated = long_query and key.startswith(query + " ")  # shortened full title
+            if not words_align(query, key, truncated): continue  # near-exact is not enough: keep the name as given
+            ratio = difflib.SequenceMatcher(None, query, key).ratio()
+            if truncated: ratio = max(ratio, 0.9)
+            if ratio >= FUZZY_MIN_RATIO and (best is None or ratio > best[1]): best = (abbr, ratio)
+        return best
+
+    def close(self):
+        self._mm.close(); self._file.close()
+
+_default_index = None
+
+def default_index():
+    """Index bundled next to the app; None (normalization disabled) if it is missing."""
+    global _default_index
+    if _default_index is None:
+        base = Path(getattr(sys, '_MEIPASS', Path(__file__).parent))  # PyInstaller unpack dir when frozen
+        try: _default_index = JournalIndex(base / INDEX_FILENAME)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Journal index unavailable ({e}); journal names will not be normalized.")
+            _default_index = False
+    return _default_index or None
+
+def normalize_journal(journal: str) -> str:
+    if not journal or journal in ("Preprint", "Unknown"): return journal
+    index = default_index()
+    hit = index.lookup(journal) if index is not None else None
+    return hit[0] if hit else journal
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "build":
+        print("usage: python journal_index.py build <journals.tsv | J_Medline.txt>"); sys.exit(2)
+    src = Path(sys.argv[2])
+    rows = read_medline(src) if src.suffix.lower() == ".txt" else read_seed_tsv(src)
+    out = Path(__file__).parent / INDEX_FILENAME
+    print(f"Wrote {build_index(rows, out)} keys to {out}")
@@ -0,0 +1,192 @@
+# llm_client.py
+"""
+Long-lived LLM clients shared by the GUI, the pipeline and the CLI.
+
+A client is created once per process and reused for every paper, so configuration,
+model construction and HTTP connections are paid for once. Each client offers a
+blocking `generate(prompt)` and an asyncio `agenerate(prompt)`; the async path lets
+one event-loop thread keep many requests in flight.
+
+Backends:
+  - "gemini" (default): google-generativeai.
+  - "openai": any OpenAI-compatible /chat/completions endpoint (a local stand-in
+    server for offline runs and tests, a self-hosted model, ...). Stdlib only, with
+    keep-alive connections for both the blocking and the async path.
+
+Clients carry the pacing and retry settings from config.json (`limiter`, `max_attempts`);
+core_logic applies them around every call.
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import ssl
+import threading
+from abc import ABC, abstractmethod
+from urllib.parse import urlsplit
+
+from rate_limit import make_limiter
+
+DEFAULT_GEMINI_MODEL = 'gemini-2.5-flash'
+LLM_MAX_ATTEMPTS = 4  # per request, for transient errors (429, 5xx, timeouts)
+
+class LLMError(Exception):
+    """Backend call failed. `status` is the HTTP status code when there is one; `retry_after` the server's hint in seconds."""
+    def __init__(self, message: str, status: int = None, retry_after: float = None):
+        super().__init__(message); self.status = status; self.retry_after = retry_after
+
+def _retry_after(value):
+    try: return float(value) if value else None
+    except ValueError: return None  # HTTP-date form; the backoff applies instead
+
+class LLMClient(ABC):
+    backend = "base"
+    limiter = None                   # rate_limit.RateLimiter shared by all callers, or None
+    max_attempts = LLM_MAX_ATTEMPTS
+    def __init__(self, model: str): self.model = model
+    @property
+    def name(self) -> str: return f"{self.backend}:{self.model}"
+    @abstractmethod
+    def generate(self, prompt: str) -> str: ...
+    @abstractmethod
+    async def agenerate(self, prompt: str) -> str: ...
+    def close(self): pass
+
+class GeminiClient(LLMClient):
+    backend = "gemini"
+    def __init__(self, api_key: str, model: str = DEFAULT_GEMINI_MODEL):
+        super().__init__(model)
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel(model, generation_config={'temperature': 0.0})
+    def generate(self, prompt: str) -> str:
+        return self._model.generate_content(prompt).text or ""
+    async def agenerate(self, prompt: str) -> str:
+        return (await self._model.generate_content_async(prompt)).text or ""
+
+class _AsyncConnectionPool:
+    """Minimal HTTP/1.1 keep-alive pool for JSON POSTs on an asyncio loop."""
+    def __init__(self, url: str, max_connections: int = 16, timeout: float = 120.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname; self.https = parts.scheme == "https"
+        self.port = parts.port or (443 if self.https else 80)
+        self.timeout = timeout; self.max_connections = max_connections
+        self._idle = []; self._sem = None
+
+    async def _open(self):
+        ctx = ssl.create_default_context() if self.https else None
+        return await asyncio.open_connection(self.host, self.port, ssl=ctx)
+
+    async def post_json(self, path: str, payload: dict, headers: dict) -> tuple[int, bytes, dict]:
+        if self._sem is None: self._sem = asyncio.Semaphore(self.max_connections)
+        body = json.dumps(payload).encode("utf-8")
+        head = [f"POST {path} HTTP/1.1", f"Host: {self.host}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}", "Connection: keep-alive"] + [f"{k}: {v}" for k, v in headers.items()]
+        request = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+        async with self._sem:
+            for attempt in (0, 1):
+                reused = bool(self._idle)
+                reader, writer = self._idle.pop() if reused else await self._open()
+                try:
+                    writer.write(request); await writer.drain()
+                    status, data, keep, headers = await asyncio.wait_for(self._read_response(reader), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError, OSError):
+                    writer.close()
+                    if reused and attempt == 0: continue  # server dropped an idle connection; retry on a fresh one
+                    raise
+                except BaseException:
+                    writer.close(); raise
+                if keep: self._idle.append((reader, writer))
+                else: writer.close()
+                return status, data, headers
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1]); headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n": break
+            k, _, v = line.decode("latin-1").partition(":"); headers[k.strip().lower()] = v.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0: await reader.readuntil(b"\r\n"); break
+                chunks.append(await reader.readexactly(size)); await reader.readexactly(2)
+            data = b"".join(chunks)
+        elif "content-length" in headers: data = await reader.readexactly(int(headers["content-length"]))
+        else: data = await reader.read(); headers["connection"] = "close"
+        return status, data, headers.get("connection", "").lower() != "close", headers
+
+    async def close(self):
+        while self._idle: self._idle.pop()[1].close()
+
+class OpenAICompatClient(LLMClient):
+    backend = "openai"
+    def __init__(self, base_url: str, model: str, api_key: str = None, timeout: float = 120.0, max_connections: int = 16):
+        super().__init__(model)
+        parts = urlsplit(base_url.rstrip("/"))
+        self.base_url = base_url.rstrip("/"); self.path = (parts.path or "") + "/chat/completions"
+        self.api_key = api_key; self.timeout = timeout
+        self._local = threading.local()  # one keep-alive connection per calling thread
+        self._pools = {}  # one async pool per event loop
+        self._max_connections = max_connections
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    def _payload(self, prompt: str) -> dict:
+        return {"model": self.model, "temperature": 0.0, "messages": [{"role": "user", "content": prompt}]}
+
+    def _parse(self, status: int, data: bytes, retry_after: str = None) -> str:
+        if status >= 400: raise LLMError(f"HTTP {status}: {data[:300].decode('utf-8', 'replace')}", status=status, retry_after=_retry_after(retry_after))
+        try: return json.loads(data)["choices"][0]["message"]["content"] or ""
+        except (ValueError, KeyError, IndexError, TypeError) as e: raise LLMError(f"Unexpected response: {e}", status=status)
+
+    def _connection(self, fresh: bool = False):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or fresh:
+            if conn is not None: conn.close()
+            parts = urlsplit(self.base_url)
+            cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            conn = self._local.conn = cls(parts.hostname, parts.port, timeout=self.timeout)
+        return conn
+
+    def generate(self, prompt: str) -> str:
+        body = json.dumps(self._payload(prompt)); headers = {"Content-Type": "application/json", **self._headers()}
+        for attempt in (0, 1):
+            conn = self._connection(fresh=attempt > 0)
+            try:
+                conn.request("POST", self.path, body=body, headers=headers)
+                resp = conn.getresponse(); return self._parse(resp.status, resp.read(), resp.getheader("Retry-After"))
+            except (http.client.RemoteDisconnected, ConnectionError, http.client.CannotSendRequest, http.client.BadStatusLine):
+                if attempt: raise
+
+    async def agenerate(self, prompt: str) -> str:
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None: pool = self._pools[loop] = _AsyncConnectionPool(self.base_url, self._max_connections, self.timeout)
+        status, data, headers = await pool.post_json(self.path, self._payload(prompt), self._headers())
+        return self._parse(status, data, headers.get("retry-after"))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None: conn.close()
+
+def make_client(config: dict, api_key: str = None) -> LLMClient:
+    """Build the client selected by config.json ("llm_backend", "llm_model", "llm_base_url", "llm_api_key_env",
+    plus "llm_rpm" / "llm_tpm" / "llm_max_attempts" for pacing and retries)."""
+    backend = config.get("llm_backend", "gemini")
+    if backend == "gemini":
+        client = GeminiClient(api_key or os.getenv("GEMINI_API_KEY"), config.get("llm_model", DEFAULT_GEMINI_MODEL))
+    elif backend == "openai":
+        key = os.getenv(config.get("llm_api_key_env", "OPENAI_API_KEY"))
+        client = OpenAICompatClient(config.get("llm_base_url", "http://127.0.0.1:8000/v1"), config.get("llm_model", "local-model"), api_key=key)
+    else: raise ValueError(f"Unknown llm_backend: {backend!r}")
+    client.limiter = make_limiter(config); client.max_attempts = max(1, int(config.get("llm_max_attempts", LLM_MAX_ATTEMPTS)))
+    return client
+
+def client_requires_key(config: dict) -> bool:
+    return config.get("llm_backend", "gemini") == "gemini"
@@ -0,0 +1,205 @@
+# metrics.py
+"""
+In-process metrics for the sorter: per-stage timers, counters and queue-depth gauges.
+
+Every module records into the shared `METRICS` registry:
+
+    with METRICS.timer("llm_request", kind="batch"): ...
+    METRICS.inc("cache_hits", kind="details")
+    METRICS.gauge("queue_depth", lambda: q.qsize(), queue="gui")
+
+Timers keep a count, a running sum and a bounded window of recent samples for
+p50/p90/p99. The registry can be scraped in Prometheus text format from a localhost
+HTTP endpoint (`MetricsServer`), written periodically as JSON (`MetricsFileWriter`),
+and an opt-in `SamplingProfiler` records collapsed stacks (flamegraph.pl / speedscope
+input) for long runs.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+PREFIX = "paper_sorter"
+TIMER_WINDOW = 1024  # recent samples kept per timer series for quantiles
+QUANTILES = (0.5, 0.9, 0.99)
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+def _fmt_labels(labels, extra: dict = None) -> str:
+    items = list(labels) + list((extra or {}).items())
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items) + "}" if items else ""
+
+def quantile(sorted_values: list, q: float) -> float:
+    if not sorted_values: return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        self._timers: dict[tuple, list] = {}  # key -> [count, sum, max, deque of recent samples]
+        self._gauges: dict[tuple, object] = {}  # key -> zero-arg callable
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock: self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            t = self._timers.get(key)
+            if t is None: t = self._timers[key] = [0, 0.0, 0.0, deque(maxlen=TIMER_WINDOW)]
+            t[0] += 1; t[1] += seconds; t[2] = max(t[2], seconds); t[3].append(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try: yield
+        finally: self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        """Clears counters and timers (gauges stay registered); used between benchmark phases."""
+        with self._lock: self._counters.clear(); self._timers.clear()
+
+    def gauge(self, name: str, fn, **labels):
+        with self._lock: self._gauges[_key(name, labels)] = fn
+
+    def _gauge_values(self) -> dict:
+        with self._lock: gauges = dict(self._gauges)
+        values = {}
+        for key, fn in gauges.items():
+            try: values[key] = float(fn())
+            except Exception: pass  # e.g. a queue that no longer exists
+        return values
+
+    def snapshot(self) -> dict:
+        """JSON-friendly view: counters, timers with quantiles, current gauges."""
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {k: (t[0], t[1], t[2], sorted(t[3])) for k, t in self._timers.items()}
+        label = lambda key: key[0] + _fmt_labels(key[1])
+        return {"uptime_s": round(time.time() - self.started, 1), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "counters": {label(k): v for k, v in sorted(counters.items())},
+                "timers": {label(k): {"count": c, "sum_s": round(s, 4), "max_s": round(m, 4),
+                                      **{f"p{int(q * 100)}_s": round(quantile(w, q), 4) for q in QUANTILES}}
+                           for k, (c, s, m, w) in sorted(timers.items())},
+                "gauges": {label(k): v for k, v in sorted(self._gauge_values().items())}}
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {k: (t[0], t[1], sorted(t[3])) for k, t in self._timers.items()}
+        lines, typed = [], set()
+        def declare(metric, kind):
+            if metric not in typed: typed.add(metric); lines.append(f"# TYPE {metric} {kind}")
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{PREFIX}_{name}_total"; declare(metric, "counter"); lines.append(f"{metric}{_fmt_labels(labels)} {value:g}")
+        for (name, labels), (count, total, window) in sorted(timers.items()):
+            metric = f"{PREFIX}_{name}_seconds"; declare(metric, "summary")
+            for q in QUANTILES: lines.append(f"{metric}{_fmt_labels(labels, {'quantile': q})} {quantile(window, q):.6f}")
+            lines.append(f"{metric}_sum{_fmt_labels(labels)} {total:.6f}"); lines.append(f"{metric}_count{_fmt_labels(labels)} {count}")
+        for (name, labels), value in sorted(self._gauge_values().items()):
+            metric = f"{PREFIX}_{name}"; declare(metric, "gauge"); lines.append(f"{metric}{_fmt_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+METRICS = Metrics()
+
+class MetricsServer:
+    """Serves METRICS in Prometheus text format at http://127.0.0.1:<port>/metrics."""
+    def __init__(self, port: int, metrics: Metrics = METRICS):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # only when the endpoint is enabled
+        registry = metrics
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"): self.send_error(404); return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200); self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body))); self.end_headers(); self.wfile.write(body)
+            def log_message(self, *args): pass  # keep scrapes out of the paper log
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler); self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logging.info(f"Metrics available at http://127.0.0.1:{self.port}/metrics"); return self
+
+    def stop(self): self._server.shutdown(); self._server.server_close()
+
+class MetricsFileWriter:
+    """Rewrites a JSON snapshot of METRICS every `interval_s` (atomically, so readers never see half a file)."""
+    def __init__(self, path: Path, interval_s: float = 30.0, metrics: Metrics = METRICS):
+        self.path = Path(path); self.interval_s = interval_s; self.metrics = metrics; self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="metrics-file", daemon=True).start(); return self
+
+    def write(self):
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f: json.dump(self.metrics.snapshot(), f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e: logging.warning(f"Could not write metrics file: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s): self.write()
+
+    def stop(self):
+        self._stop.set(); self.write()
+
+class SamplingProfiler:
+    """Opt-in wall-clock sampler over all threads; writes collapsed stacks ("a;b;c count") to `out_path`."""
+    def __init__(self, out_path: Path, interval_s: float = 0.01, flush_s: float = 60.0):
+        self.out_path = Path(out_path); self.interval_s = interval_s; self.flush_s = flush_s
+        self._stacks = Counter(); self._lock = threading.Lock(); self._stop = threading.Event(); self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True); self._thread.start()
+        logging.info(f"Sampling profiler on ({self.interval_s * 1000:.0f} ms); writing to {self.out_path}"); return self
+
+    def _sample(self, own_id: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id: continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code; stack.append(f"{Path(code.co_filename).name}:{code.co_name}"); frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            with self._lock: self._stacks[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        own_id = threading.get_ident(); last_flush = time.monotonic()
+        while not self._stop.wait(self.interval_s):
+            self._sample(own_id)
+            if time.monotonic() - last_flush >= self.flush_s: self.write(); last_flush = time.monotonic()
+
+    def write(self):
+        with self._lock: lines = [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+        try: self.out_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        except OSError as e: logging.warning(f"Could not write profile: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join(timeout=1)
+        self.write()
+
+def start_from_config(config: dict, base_dir: Path) -> list:
+    """Starts the endpoint, file writer and profiler enabled in config.json; returns them for stop()."""
+    started = []
+    port = config.get("metrics_port", 9464)
+    if port:
+        try: started.append(MetricsServer(int(port)).start())
+        except OSError as e: logging.warning(f"Metrics endpoint not started on port {port}: {e}")
+    interval = config.get("metrics_interval_seconds", 30)
+    if interval: started.append(MetricsFileWriter(Path(config.get("metrics_file") or base_dir / "metrics.json"), interval).start())
+    if config.get("profile_sampling", False):
+        started.append(SamplingProfiler(Path(config.get("profile_file") or base_dir / "profile.collapsed"),
+                                        interval_s=config.get("profile_interval_ms", 10) / 1000).start())
+    return started
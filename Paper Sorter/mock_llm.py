@@ -0,0 +1,119 @@
+# mock_llm.py
+"""
+Local OpenAI-compatible /chat/completions stand-in for benchmarks and offline runs.
+
+Answers the sorter's single-paper and batch prompts with metadata read from the
+excerpt itself (first line as title, second as authors, the first journal/year line
+it can find), after a configurable latency, and injects failures at configurable
+rates: HTTP 429/500 errors, malformed replies, and batch replies that drop papers.
+With a requests/minute quota it also answers 429 (with Retry-After) like a real API
+once the last minute's requests exceed it.
+
+    python mock_llm.py --port 8000 --latency 0.4 --jitter 0.1 --error-rate 0.02
+
+then point config.json at it with "llm_backend": "openai", "llm_base_url": "http://127.0.0.1:8000/v1".
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PAPER_RE = re.compile(r"=== PAPER id=(\S+) ===\n(.*?)\n=== END PAPER id=\1 ===", re.DOTALL)
+_YEAR_RE = re.compile(r"\b(19[5-9]\d|20\d\d)\b")
+
+def guess_details(excerpt: str) -> dict:
+    lines = [l.strip() for l in excerpt.strip().splitlines() if l.strip()]
+    title = lines[0] if lines else "Unknown Title"
+    authors = [a.strip() for a in re.split(r",| and ", lines[1])] if len(lines) > 1 else []
+    journal, year = "Unknown", "Unknown"
+    for line in lines[2:8]:
+        m = _YEAR_RE.search(line)
+        if m: year = m.group(1); journal = line[:m.start()].strip(" ,.;(") or journal; break
+    author = authors[0].split()[-1] if authors and authors[0] else "Unknown"
+    return {"author": author, "year": year, "journal": journal, "title": title, "is_multiple_authors": len(authors) > 1}
+
+class MockLLMServer:
+    def __init__(self, port: int = 0, latency: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0,
+                 malformed_rate: float = 0.0, drop_rate: float = 0.0, seed: int = None, quota_rpm: int = 0):
+        self.latency = latency; self.jitter = jitter; self.error_rate = error_rate
+        self.malformed_rate = malformed_rate; self.drop_rate = drop_rate
+        self._rng = random.Random(seed); self._rng_lock = threading.Lock()
+        self.requests = 0; self.errors = 0; self.quota_rejections = 0
+        self.quota_rpm = quota_rpm; self._recent = deque()  # accepted request times within the last minute
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, payload = server.respond(json.loads(body or b"{}"))
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status); self.send_header("Content-Type", "application/json")
+                if status == 429: self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", str(len(data))); self.end_headers(); self.wfile.write(data)
+            def log_message(self, *args): pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler); self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str: return f"http://127.0.0.1:{self.port}/v1"
+
+    def _draw(self) -> tuple:
+        with self._rng_lock:
+            fail = self._rng.random(); self.requests += 1; self.errors += fail < self.error_rate
+            return fail, self._rng.random(), self._rng.gauss(0, 1), self._rng.random()
+
+    def _over_quota(self) -> bool:
+        if not self.quota_rpm: return False
+        with self._rng_lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60: self._recent.popleft()
+            if len(self._recent) >= self.quota_rpm: self.quota_rejections += 1; return True
+            self._recent.append(now); return False
+
+    def respond(self, request: dict) -> tuple:
+        if self._over_quota(): return 429, {"error": {"message": "quota exceeded"}}
+        fail, malformed, noise, drop = self._draw()
+        time.sleep(max(0.0, self.latency + self.jitter * noise))
+        if fail < self.error_rate:
+            return (429 if fail < self.error_rate / 2 else 500), {"error": {"message": "injected failure"}}
+        prompt = request.get("messages", [{}])[0].get("content", "")
+        papers = _PAPER_RE.findall(prompt)
+        if malformed < self.malformed_rate: content = "Sorry, I can't help with that."
+        elif papers:
+            kept = [(pid, text) for pid, text in papers if not (len(papers) > 1 and drop < self.drop_rate and pid == papers[-1][0])]
+            content = json.dumps([{"id": pid, **guess_details(text)} for pid, text in kept])
+        else:
+            excerpt = prompt.split("Paper Text: ---", 1)[-1].rsplit("---", 1)[0]
+            content = json.dumps(guess_details(excerpt))
+        return 200, {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name="mock-llm", daemon=True).start(); return self
+
+    def stop(self): self._httpd.shutdown(); self._httpd.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server for benchmarks and offline runs.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 429/500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction answered with non-JSON text")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of batch replies missing their last paper")
+    parser.add_argument("--quota-rpm", type=int, default=0, help="answer 429 beyond this many requests per minute")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    server = MockLLMServer(args.port, args.latency, args.jitter, args.error_rate, args.malformed_rate, args.drop_rate, args.seed, args.quota_rpm).start()
+    print(f"Mock LLM listening on {server.base_url}")
+    try: threading.Event().wait()
+    except KeyboardInterrupt: server.stop()
+
+if __name__ == "__main__":
+    main()
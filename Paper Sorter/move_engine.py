@@ -0,0 +1,158 @@
+# move_engine.py
+"""
+Collision-aware, no-clobber file moves into the library.
+
+    final = move_file(src, folder / "Smith_et_al_Radiology_2019.pdf")   # -> ..._2019-3.pdf if taken
+
+Free names come from an in-memory set of each destination folder's names (one scandir
+the first time, again only when the folder's mtime shows someone else changed it), so a
+popular name costs no exists() probes. Names compare case-insensitively, as on Windows
+and macOS. The next "-N" per name is remembered.
+
+A move never overwrites. On one volume it is atomic: os.rename on Windows (which fails if
+the target exists), otherwise os.link + unlink (link fails if the target exists; a crash
+in between leaves both names on the same bytes, never neither). Filesystems without hard
+links claim the name with an exclusive create first. If another process takes the name
+anyway, the move tries the next one.
+
+Across volumes the file is streamed into a hidden .part file in the destination folder,
+fsynced, re-read and compared by CRC-32 (it guards against I/O errors, not tampering, and
+keeps up with any disk), then placed like a same-volume move; only then
+is the source removed.
+"""
+
+import errno
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from metrics import METRICS
+
+COPY_CHUNK = 1024 * 1024
+MAX_ATTEMPTS = 100  # names taken behind the index's back before giving up
+
+@dataclass
+class _Folder:
+    names: set                                 # casefolded entry names
+    mtime_ns: int                              # folder mtime when `names` was last known to be complete
+    next_n: dict = field(default_factory=dict)  # casefolded stem -> next "-N" to try
+
+def _list_names(folder: Path) -> set:
+    with os.scandir(folder) as it: return {entry.name.casefold() for entry in it}
+
+def place(src: Path, dst: Path) -> str:
+    """Atomic rename on one volume that never replaces an existing file: FileExistsError if `dst` is taken,
+    OSError(EXDEV) across volumes. Returns how ("rename", "link" or "claim")."""
+    if os.name == "nt": os.rename(src, dst); return "rename"
+    try: os.link(src, dst)
+    except FileExistsError:
+        if os.path.samefile(src, dst): os.rename(src, dst); return "rename"  # case-only rename on a case-insensitive volume
+        raise
+    except OSError as e:
+        if e.errno not in (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK): raise
+        # No hard links here (FAT/exFAT, some network shares): claim the name exclusively, then replace the placeholder.
+        os.close(os.open(dst, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        try: os.replace(src, dst)
+        except OSError: os.unlink(dst); raise
+        return "claim"
+    os.unlink(src); return "link"
+
+def _crc32(path: Path) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(COPY_CHUNK): crc = zlib.crc32(chunk, crc)
+    return crc
+
+def _fsync_dir(folder: Path):
+    if os.name == "nt": return  # directories cannot be opened for fsync; NTFS journals the metadata
+    fd = os.open(folder, os.O_RDONLY)
+    try: os.fsync(fd)
+    finally: os.close(fd)
+
+def copy_verified(src: Path, folder: Path) -> Path:
+    """Streams `src` into a new hidden .part file in `folder` (exclusive create), fsyncs it and checks it against the source."""
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=f".{Path(src).stem[:40]}-", suffix=".part"); tmp = Path(tmp)
+    try:
+        crc = 0; buf = bytearray(COPY_CHUNK); view = memoryview(buf)
+        with open(src, "rb") as fin, os.fdopen(fd, "wb") as fout:
+            while n := fin.readinto(buf): crc = zlib.crc32(view[:n], crc); fout.write(view[:n])
+            fout.flush(); os.fsync(fout.fileno())
+        shutil.copystat(src, tmp)  # keep the modification time, as a rename would
+        if _crc32(tmp) != crc: raise OSError(errno.EIO, f"copy of '{Path(src).name}' does not match the original")
+        return tmp
+    except BaseException:
+        tmp.unlink(missing_ok=True); raise
+
+class MoveEngine:
+    def __init__(self):
+        self._lock = threading.Lock(); self._folders: dict[str, _Folder] = {}
+
+    def _folder(self, folder: Path) -> _Folder:
+        # Caller holds the lock. One stat per call; a listing only when the folder changed behind our back.
+        key = os.path.normcase(str(folder)); mtime_ns = os.stat(folder).st_mtime_ns; known = self._folders.get(key)
+        if known is None or known.mtime_ns != mtime_ns: known = self._folders[key] = _Folder(_list_names(folder), mtime_ns)
+        return known
+
+    def reserve(self, dst: Path) -> Path:
+        """`dst`, or the first free `stem-N` next to it; the name stays reserved for this process."""
+        with self._lock:
+            folder = self._folder(dst.parent); name = dst.name.casefold()
+            if name not in folder.names: folder.names.add(name); return dst
+            stem, ext = dst.stem, dst.suffix; n = folder.next_n.get(stem.casefold(), 1)
+            while f"{stem}-{n}{ext}".casefold() in folder.names: n += 1
+            folder.next_n[stem.casefold()] = n + 1; folder.names.add(f"{stem}-{n}{ext}".casefold())
+        METRICS.inc("move_collisions")
+        return dst.with_name(f"{stem}-{n}{ext}")
+
+    def _release(self, path: Path):
+        with self._lock:
+            folder = self._folders.get(os.path.normcase(str(path.parent)))
+            if folder is not None: folder.names.discard(path.name.casefold())
+
+    def _moved(self, src: Path, dst: Path):
+        # Our own changes bump the folders' mtimes; record them so the next move doesn't re-list the folders.
+        with self._lock:
+            for path, present in ((src, False), (dst, True)):
+                folder = self._folders.get(os.path.normcase(str(path.parent)))
+                if folder is None: continue
+                if present: folder.names.add(path.name.casefold())
+                else: folder.names.discard(path.name.casefold())
+                try: folder.mtime_ns = os.stat(path.parent).st_mtime_ns
+                except OSError: self._folders.pop(os.path.normcase(str(path.parent)), None)
+
+    def move(self, src: Path, dst: Path) -> Path:
+        """Moves `src` to `dst` or, if that name is taken, `dst` with the first free -N suffix. Returns the final path."""
+        src, dst = Path(src), Path(dst); dst.parent.mkdir(parents=True, exist_ok=True)
+        if src.parent == dst.parent and src.name.casefold() == dst.name.casefold():  # same name up to case
+            if src.name == dst.name: return src
+            try: place(src, dst); self._moved(src, dst); return dst
+            except FileExistsError: pass  # a different file on a case-sensitive volume
+        source = src; how = None
+        try:
+            for _ in range(MAX_ATTEMPTS):
+                target = self.reserve(dst)
+                try: how = place(source, target); break
+                except FileExistsError: continue  # taken behind the index's back (still marked taken); try the next name
+                except OSError as e:
+                    self._release(target)
+                    if e.errno != errno.EXDEV or source is not src: raise
+                    source = copy_verified(src, dst.parent)  # other volume: copy once, then place the copy under the same name rules
+            else: raise FileExistsError(errno.EEXIST, f"no free name for '{dst.name}' after {MAX_ATTEMPTS} attempts", str(dst))
+        except BaseException:
+            if source is not src: source.unlink(missing_ok=True)
+            raise
+        if source is not src:
+            _fsync_dir(target.parent); os.unlink(src); how = "copy"  # the copy is durable before the original goes
+        self._moved(src, target); METRICS.inc("moves", how=how)
+        if target != dst: logging.debug(f"'{dst.name}' is taken; moved to '{target.name}'.")
+        return target
+
+MOVER = MoveEngine()
+
+def move_file(src: Path, dst: Path) -> Path:
+    return MOVER.move(src, dst)
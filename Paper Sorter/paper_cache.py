@@ -0,0 +1,123 @@
+# paper_cache.py
+"""
+Persistent, content-addressed cache for extracted paper details and text snippets.
+
+Entries are keyed by the SHA-256 of the PDF bytes, so a paper that is re-dropped,
+copied back into ToSort or re-queued after a crash is answered from disk instead of
+being re-parsed and re-sent to Gemini. A (path, size, mtime) table acts as a fast
+pre-check so unchanged files are never re-hashed. Total cache size is capped and the
+least recently used entries are evicted first; the running total is kept in memory, so
+a put never scans the table. (path, size, mtime) rows go with their last cached entry, or
+as soon as the path no longer exists.
+
+Each entry also carries a version string: details are stored under the prompt/model
+version, extracted text under the snippet budget, so a prompt change re-runs the LLM
+without re-parsing any PDFs.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+HASH_CHUNK_SIZE = 1 << 20
+EVICT_BATCH = 64  # LRU rows dropped per DELETE once over budget
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''): h.update(chunk)
+    return h.hexdigest()
+
+class DetailsCache:
+    def __init__(self, db_path: Path, max_mb: float = 256):
+        self.db_path = Path(db_path); self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS details (sha256 TEXT, version TEXT, payload TEXT, nbytes INTEGER, last_used REAL, PRIMARY KEY (sha256, version))")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS details_lru ON details (last_used)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS files_sha ON files (sha256)")
+            self._total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM details").fetchone()[0]  # bytes cached; kept current by put/_evict
+
+    def content_hash(self, path: Path) -> str:
+        """Return the SHA-256 of `path`, re-hashing only when its size or mtime changed."""
+        path = Path(path); key = str(path.resolve())
+        try: st = path.stat()
+        except OSError:
+            with self._lock, self._conn: self._conn.execute("DELETE FROM files WHERE path = ?", (key,))  # deleted or moved away
+            raise
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (key,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns: return row[2]
+        digest = file_sha256(path)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)", (key, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def get(self, path: Path, version: str = ""):
+        try: digest = self.content_hash(path)
+        except OSError: return None
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT payload FROM details WHERE sha256 = ? AND version = ?", (digest, version)).fetchone()
+            if row is None: return None
+            self._conn.execute("UPDATE details SET last_used = ? WHERE sha256 = ? AND version = ?", (time.time(), digest, version))
+        return json.loads(row[0])
+
+    def put(self, path: Path, value, version: str = ""):
+        try: digest = self.content_hash(path)
+        except OSError: return
+        payload = json.dumps(value, ensure_ascii=False); nbytes = len(payload.encode('utf-8'))
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT nbytes FROM details WHERE sha256 = ? AND version = ?", (digest, version)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO details (sha256, version, payload, nbytes, last_used) VALUES (?, ?, ?, ?, ?)",
+                               (digest, version, payload, nbytes, time.time()))
+            self._total += nbytes - (old[0] if old else 0)
+            self._evict()
+
+    # --- NEW: bulk reads for planning a library re-organize, and keeping paths current after moves ---
+    def hashed_files(self, under: Path = None) -> dict[str, tuple[int, int, str]]:
+        """Resolved path -> (size, mtime_ns, sha256) for every file hashed so far, optionally only under a folder."""
+        query, params = "SELECT path, size, mtime_ns, sha256 FROM files", ()
+        if under is not None: query += " WHERE path >= ? AND path < ?"; prefix = os.path.join(str(Path(under).resolve()), ""); params = (prefix, prefix + "\uffff")
+        with self._lock: return {path: (size, mtime_ns, sha) for path, size, mtime_ns, sha in self._conn.execute(query, params)}
+
+    def latest_details(self) -> dict[str, dict]:
+        """sha256 -> the most recently used details under any model/prompt version (extracted-text rows excluded)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT sha256, payload FROM details WHERE version NOT LIKE 'text/%' ORDER BY last_used").fetchall()
+        return {sha: json.loads(payload) for sha, payload in rows}  # later rows win
+
+    def record_moves(self, moves):
+        """Keeps moved files' hashes without re-reading them (same bytes; mtime survives a rename).
+        `moves` is (src, dst) pairs in the order the renames happened, applied in one transaction."""
+        with self._lock, self._conn:
+            for src, dst in moves:
+                src, dst = str(Path(src).resolve()), Path(dst).resolve()
+                row = self._conn.execute("SELECT sha256 FROM files WHERE path = ?", (src,)).fetchone()
+                if row is None: continue
+                self._conn.execute("DELETE FROM files WHERE path = ?", (src,))
+                try: st = dst.stat()
+                except OSError: continue
+                self._conn.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)", (str(dst), st.st_size, st.st_mtime_ns, row[0]))
+
+    def _evict(self):
+        # Caller holds the lock. Drop least-recently-used rows, a batch at a time, until the byte budget fits;
+        # a file's (path, size, mtime) rows go with its last cached entry.
+        while self._total > self.max_bytes:
+            rows = self._conn.execute("SELECT sha256, version, nbytes FROM details ORDER BY last_used ASC LIMIT ?", (EVICT_BATCH,)).fetchall()
+            if not rows: self._total = 0; return
+            for sha, version, nbytes in rows:
+                self._conn.execute("DELETE FROM details WHERE sha256 = ? AND version = ?", (sha, version)); self._total -= nbytes
+                if self._total <= self.max_bytes: break
+            self._conn.executemany("DELETE FROM files WHERE sha256 = ? AND NOT EXISTS (SELECT 1 FROM details WHERE sha256 = ?)",
+                                   {(sha, sha) for sha, _, _ in rows})
+
+    def close(self):
+        with self._lock: self._conn.close()
@@ -0,0 +1,168 @@
+"""
+paper_sorter_cli.py
+Headless batch runner for the AI Paper Sorter (no display needed).
+
+Walks a directory tree, extracts details for every PDF through the same staged
+pipeline the GUI uses, and appends one JSON object per paper to a manifest
+(JSON Lines). With --apply, each paper is renamed in place to its proposed name.
+
+    python paper_sorter_cli.py /data/papers -o run.jsonl              # dry run
+    python paper_sorter_cli.py /data/papers -o run.jsonl --resume     # continue after a crash
+    python paper_sorter_cli.py /data/papers -o run.jsonl --apply --resume
+                                           # applies proposals from the dry run without new AI calls
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from queue import Queue
+
+from core_logic import FILENAME_TEMPLATE, propose_filename, safe_rename
+from llm_client import client_requires_key, make_client
+from metrics import MetricsFileWriter, SamplingProfiler
+from paper_cache import DetailsCache
+from pdf_guard import limits_from_config, set_limits
+from pipeline import ExtractionPipeline
+
+# ----------------------------
+# Environment & paths
+# ----------------------------
+def _script_dir() -> Path:
+    if getattr(sys, "frozen", False):  # PyInstaller
+        return Path(sys.executable).parent.resolve()
+    return Path(__file__).parent.resolve()
+
+SCRIPT_DIR = _script_dir()
+
+def load_config(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f: return json.load(f)
+    except FileNotFoundError: return {}
+
+# ----------------------------
+# Manifest
+# ----------------------------
+def read_manifest(path: Path) -> dict:
+    """Last record per source path; truncated trailing lines (crash mid-write) are ignored."""
+    records = {}
+    if not path.exists(): return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try: rec = json.loads(line)
+            except json.JSONDecodeError: continue
+            if isinstance(rec, dict) and "source" in rec: records[rec["source"]] = rec
+    return records
+
+class ManifestWriter:
+    def __init__(self, path: Path):
+        self._f = open(path, "a", encoding="utf-8"); self._lock = threading.Lock()
+    def write(self, **record):
+        record["ts"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with self._lock:
+            self._f.write(json.dumps(record, ensure_ascii=False) + "\n"); self._f.flush()
+    def close(self): self._f.close()
+
+# ----------------------------
+# Run
+# ----------------------------
+def apply_proposal(src: Path, proposed_name: str) -> Path:
+    if src.name == proposed_name: return src
+    return safe_rename(src, src.parent / proposed_name)
+
+def record_result(manifest: ManifestWriter, src: Path, details: dict, apply: bool, template: str = FILENAME_TEMPLATE):
+    proposed_name = propose_filename(details, template)
+    if not apply:
+        manifest.write(source=str(src), status="proposed", proposed_name=proposed_name, details=details); return "proposed"
+    try:
+        dst = apply_proposal(src, proposed_name)
+        manifest.write(source=str(src), status="applied", proposed_name=proposed_name, destination=str(dst), details=details)
+        logging.info(f"Renamed: {src.name} -> {dst.name}"); return "applied"
+    except Exception as e:
+        manifest.write(source=str(src), status="failed", proposed_name=proposed_name, details=details, error=f"rename failed: {e}")
+        logging.error(f"Failed to rename {src.name}: {e}"); return "failed"
+
+def run(args) -> int:
+    config = load_config(Path(args.config)); set_limits(limits_from_config(config))
+    api_key = os.getenv("GEMINI_API_KEY")
+    root = Path(args.root).expanduser().resolve()
+    if not root.is_dir(): logging.error(f"Not a directory: {root}"); return 2
+    pdf_files = sorted(root.rglob("*.pdf") if args.recursive else root.glob("*.pdf"))
+    manifest_path = Path(args.manifest)
+    previous = read_manifest(manifest_path) if args.resume else {}
+    manifest = ManifestWriter(manifest_path)
+    counts = {"proposed": 0, "applied": 0, "failed": 0, "skipped": 0}; template = config.get("filename_template", FILENAME_TEMPLATE)
+
+    todo = []
+    for pdf_path in pdf_files:
+        rec = previous.get(str(pdf_path))
+        status = rec.get("status") if rec else None
+        if status == "applied" or (status == "proposed" and not args.apply): counts["skipped"] += 1; continue
+        if status == "proposed" and args.apply and rec.get("details"):  # reuse the dry run's proposal
+            counts[record_result(manifest, pdf_path, rec["details"], apply=True, template=template)] += 1; continue
+        todo.append(pdf_path)
+    logging.info(f"{len(pdf_files)} PDF(s) found, {counts['skipped']} already done, {len(todo)} to process.")
+    if todo and not api_key and client_requires_key(config):
+        logging.error("GEMINI_API_KEY not set."); manifest.close(); return 2
+
+    services = []
+    if args.metrics: services.append(MetricsFileWriter(Path(args.metrics), config.get("metrics_interval_seconds", 30) or 30).start())
+    if args.profile: services.append(SamplingProfiler(Path(args.profile)).start())
+    if todo:
+        results = Queue(maxsize=config.get("gui_queue_size", 8) * 4)
+        cache = DetailsCache(Path(args.cache or config.get("cache_path") or SCRIPT_DIR / "paper_cache.sqlite"), max_mb=config.get("cache_max_mb", 256))
+        pipeline = ExtractionPipeline(make_client(config, api_key), results, cache=cache,
+                                      extract_workers=args.extract_workers or config.get("extract_workers", 2),
+                                      llm_workers=args.llm_workers or config.get("llm_workers", 4),
+                                      queue_size=config.get("pipeline_queue_size", 16),
+                                      batch_max_papers=config.get("batch_max_papers", 8), batch_token_budget=config.get("batch_token_budget", 24000),
+                                      fast_path_min_confidence=config.get("fast_path_min_confidence", 1.0),
+                                      snippet_token_budget=config.get("snippet_token_budget", 500),
+                                      retry_rounds=config.get("llm_retry_rounds", 2), retry_delay_s=config.get("llm_retry_delay_seconds", 30),
+                                      on_failure=lambda mode, pdf_path, reason: results.put(("failed", pdf_path, reason)))
+        pipeline.start()
+        feeder = threading.Thread(target=lambda: [pipeline.submit("batch", p) for p in todo], name="cli-feeder", daemon=True); feeder.start()
+        try:
+            for done in range(1, len(todo) + 1):
+                mode, pdf_path, payload = results.get()
+                if mode == "failed":
+                    manifest.write(source=str(pdf_path), status="failed", error=payload); counts["failed"] += 1
+                else: counts[record_result(manifest, pdf_path, payload, args.apply, template)] += 1
+                if done % 50 == 0: logging.info(f"Progress: {done}/{len(todo)}")
+        except KeyboardInterrupt:
+            logging.warning("Interrupted; rerun with --resume to continue.")
+        finally:
+            pipeline.shutdown(); cache.close()
+    manifest.close()
+    for service in services: service.stop()
+    logging.info(f"Done. {counts['proposed']} proposed, {counts['applied']} applied, {counts['failed']} failed, {counts['skipped']} skipped.")
+    return 1 if counts["failed"] else 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless AI Paper Sorter: propose (and optionally apply) names for every PDF under a folder.")
+    parser.add_argument("root", help="folder to process")
+    parser.add_argument("-o", "--manifest", default="paper_sorter_manifest.jsonl", help="JSON Lines output (appended to)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--dry-run", dest="apply", action="store_false", help="only write proposals (default)")
+    mode.add_argument("--apply", dest="apply", action="store_true", help="rename files in place to the proposed names")
+    parser.add_argument("--resume", action="store_true", help="skip papers already recorded in the manifest")
+    parser.add_argument("--no-recursive", dest="recursive", action="store_false", help="only process the top-level folder")
+    parser.add_argument("--extract-workers", type=int, help="PDF parsing processes (default: config or 2)")
+    parser.add_argument("--llm-workers", type=int, help="concurrent AI requests (default: config or 4)")
+    parser.add_argument("--config", default=str(SCRIPT_DIR / "config.json"))
+    parser.add_argument("--cache", help="details cache path (default: config cache_path or paper_cache.sqlite next to the app)")
+    parser.add_argument("--metrics", help="write per-stage timings, counters and queue depths to this JSON file during and after the run")
+    parser.add_argument("--profile", help="sample all threads every 10 ms and write collapsed stacks to this file")
+    parser.set_defaults(apply=False)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', stream=sys.stderr)
+    return run(args)
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -4,8 +4,10 @@
 # - WATCH_FOLDER and SORTED_FOLDER are no longer hardcoded.
 # - Minor adjustments to accommodate dynamic paths.
 
+# --- NEW: imported first so the startup report's clock starts before the UI toolkit loads ---
+import startup
+
 import os
-import time
 import shutil
 import json
 import logging
@@ -14,6 +16,9 @@ from pathlib import Path
 import sys
 import threading
 import webbrowser
+import multiprocessing
+from collections import deque
+from typing import TYPE_CHECKING
 from queue import Queue
 from tkinter import filedialog
 
@@ -21,10 +26,23 @@ from tkinterdnd2 import DND_FILES, TkinterDnD
 import customtkinter as ctk
 from CTkMessagebox import CTkMessagebox
 from customtkinter import CTkInputDialog
-import google.generativeai as genai
-from pypdf import PdfReader
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+
+# Only light modules load before the window appears. pypdf, NumPy, watchdog observers, the pipeline and the
+# LLM SDKs are imported by App._warm_up on a background thread (core_logic opens pypdf on first use).
+from core_logic import FILENAME_TEMPLATE, get_papers_details, get_text_snippet, propose_filename, safe_rename, list_dirs
+from paper_cache import DetailsCache
+from file_stability import StabilityTracker
+from duplicates import MINHASH_CHARS, DuplicateIndex
+from job_store import AWAITING_REVIEW, DONE, EXTRACTING, FAILED, JobStore
+from prefetch import Prefetcher
+from metrics import METRICS, start_from_config
+from move_engine import place
+from pdf_guard import limits_from_config, set_limits
+from single_instance import InstanceLock, send
+import reorganize
+
+if TYPE_CHECKING:  # imported by App._warm_up
+    from folder_tree import FolderTree
 
 # --- NEW: DnD-enabled CTk root to keep CTk overlays/alpha in sync with main window ---
 class DnDCTk(ctk.CTk, TkinterDnD.DnDWrapper):
@@ -35,100 +53,83 @@ class DnDCTk(ctk.CTk, TkinterDnD.DnDWrapper):
         TkinterDnD.DnDWrapper.__init__(self)
 
 # ======================================================================
-# (All helper functions are unchanged and included below)
+# Helper functions live in core_logic.py so the GUI and any headless tooling share them.
 # ======================================================================
-def get_paper_details(pdf_path: Path, api_key: str):
-    # This function is unchanged.
-    try:
-        reader = PdfReader(pdf_path); text_content = ""
-        for page in reader.pages[:5]:
-            extracted = page.extract_text()
-            if extracted: text_content += extracted + "\n\n"
-        if not text_content.strip(): return None
-        text_snippet = text_content[:8000]
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash', generation_config={'temperature': 0.0})
-        prompt = f"""
-        Analyze text from a research paper and output ONLY a valid JSON object with these keys:
-        1. "author": ONLY the last name of the VERY FIRST author listed.
-        2. "year": the 4-digit publication year.
-        3. "journal": official NLM/PubMed journal abbreviation if available; else the full journal name. Preprints => "Preprint".
-        4. "title": the full official title of the paper.
-        5. "is_multiple_authors": boolean true/false.
-        Example: {{"author": "FitzGerald", "year": "2016", "journal": "Invest Radiol", "title": "A Proposed...", "is_multiple_authors": true}}
-        Paper Text: ---
-        {text_snippet}
-        ---
-        """
-        response = model.generate_content(prompt)
-        m = re.search(r"\{.*\}", (response.text or ""), re.DOTALL)
-        if not m: return None
-        details = json.loads(m.group(0))
-        details.setdefault('author', 'Unknown'); details.setdefault('year', 'Unknown')
-        details.setdefault('journal', 'Unknown'); details.setdefault('title', 'Unknown Title')
-        details.setdefault('is_multiple_authors', True)
-        return details
-    except Exception as e:
-        logging.error(f"AI processing error for {pdf_path.name}: {e}")
-        return None
 
-def sanitize_filename_part(part):
-    return re.sub(r'[\\/*?:"<>|]', "", str(part).strip()).replace(' ', '_')
-
-def cleanup_author_string(author: str) -> str:
-    if not author:
-        return ''
-    if ';' in author:
-        author = author.split(';')[0]
-    if ',' in author:
-        author = author.split(',')[0]
-    return author.strip()
-
-def safe_rename(src: Path, dst: Path) -> Path:
-    if not dst.exists(): src.rename(dst); return dst
-    stem, ext = dst.stem, dst.suffix; i = 1
-    while True:
-        candidate = dst.with_name(f"{stem}-{i}{ext}")
-        if not candidate.exists(): src.rename(candidate); return candidate
-        i += 1
-
-def list_dirs(parent: Path) -> list[Path]:
-    try: return sorted([p for p in parent.iterdir() if p.is_dir() and not p.name.startswith('.')])
-    except Exception: return []
-
-class TextboxRedirector:
-    def __init__(self, textbox: ctk.CTkTextbox): self.textbox = textbox
-    def write(self, text): self.textbox.after(0, self.textbox.insert, "end", text); self.textbox.after(0, self.textbox.see, "end")
-    def flush(self): pass
+# --- NEW: batched, bounded log pane (the full history stays in paper_sorter_log.txt) ---
+class TextboxLogHandler(logging.Handler):
+    """Buffers records from any thread and writes them to the textbox in one batch per frame, keeping the last `max_lines`."""
+    def __init__(self, textbox: ctk.CTkTextbox, max_lines: int = 2000, flush_ms: int = 16):
+        super().__init__(); self.textbox = textbox; self.max_lines = max_lines; self.flush_ms = flush_ms
+        self._pending = deque(maxlen=max_lines); self._scheduled = False; self._buf_lock = threading.Lock()
+    def emit(self, record):
+        try: line = self.format(record)
+        except Exception: self.handleError(record); return
+        with self._buf_lock:
+            self._pending.append(line)
+            if self._scheduled: return
+            self._scheduled = True
+        try: self.textbox.after(self.flush_ms, self._flush)  # one pending callback at most, however busy the workers are
+        except Exception: pass  # Tk already torn down during shutdown
+    def _flush(self):
+        with self._buf_lock: lines = list(self._pending); self._pending.clear(); self._scheduled = False
+        if not lines: return
+        self.textbox.insert("end", "\n".join(lines) + "\n")
+        excess = int(self.textbox.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0: self.textbox.delete("1.0", f"{excess + 1}.0")
+        self.textbox.see("end")
+
+class WakeupQueue(Queue):
+    """Queue that calls `on_put` after each put, so the Tk loop is woken instead of polling."""
+    def __init__(self, maxsize: int = 0, on_put=None): super().__init__(maxsize); self.on_put = on_put
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        if self.on_put is not None: self.on_put()
 
 class FolderPicker(ctk.CTkToplevel):
-    def __init__(self, master, root_path: Path):
+    def __init__(self, master, root_path: Path, tree: "FolderTree" = None, suggestions: list = None):
         super().__init__(master)
-        self.title("Choose Destination Folder"); self.geometry("520x360"); self.resizable(True, True)
+        self.title("Choose Destination Folder"); self.geometry("520x400"); self.resizable(True, True)
         self.transient(master); self.grab_set()
-        self.root_path = root_path; self.level_frames = []; self.selected_paths = []
-        self.columnconfigure(0, weight=1); self.rowconfigure(0, weight=1)
-        self.scroll = ctk.CTkScrollableFrame(self); self.scroll.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
-        self.btn_row = ctk.CTkFrame(self); self.btn_row.grid(row=1, column=0, padx=10, pady=(0,10), sticky="ew")
+        self.root_path = root_path; self.tree = tree; self.level_frames = []; self.level_vars = []; self.selected_paths = []
+        self.columnconfigure(0, weight=1); self.rowconfigure(2, weight=1)
+        # --- NEW: type-ahead search over the cached folder tree; Up/Down pick a match, Enter confirms it ---
+        self.search_hits = []; self.search_pos = 0; self.hit_buttons = []
+        self.search_entry = ctk.CTkEntry(self, placeholder_text="Search folders…"); self.search_entry.grid(row=0, column=0, padx=10, pady=(10,0), sticky="ew")
+        self.search_entry.bind("<KeyRelease>", self._on_search_key); self.search_entry.bind("<Return>", lambda e: self._confirm_hit())
+        self.search_entry.bind("<Down>", lambda e: self._move_hit(1)); self.search_entry.bind("<Up>", lambda e: self._move_hit(-1))
+        self.search_entry.bind("<Escape>", lambda e: self._clear_search())
+        # --- NEW: folders suggested from similar papers already in the library; the cascade opens on the first ---
+        self.suggestions = [p for p in (suggestions or []) if p.is_dir()]
+        if self.suggestions:
+            self.suggest_row = ctk.CTkFrame(self, fg_color="transparent"); self.suggest_row.grid(row=1, column=0, padx=10, pady=(6,0), sticky="ew")
+            ctk.CTkLabel(self.suggest_row, text="Suggested:").pack(side="left", padx=(0,5))
+            for path in self.suggestions:
+                ctk.CTkButton(self.suggest_row, text=path.name, width=60, command=lambda p=path: self._jump_to(p)).pack(side="left", padx=3)
+        self.results = ctk.CTkScrollableFrame(self)  # replaces the cascade while a query is typed
+        self.scroll = ctk.CTkScrollableFrame(self); self.scroll.grid(row=2, column=0, padx=10, pady=10, sticky="nsew")
+        self.btn_row = ctk.CTkFrame(self); self.btn_row.grid(row=3, column=0, padx=10, pady=(0,10), sticky="ew")
         self.btn_row.columnconfigure((0,1,2), weight=1)
         self.btn_ok = ctk.CTkButton(self.btn_row, text="Confirm", command=self._confirm); self.btn_ok.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
         self.btn_root = ctk.CTkButton(self.btn_row, text="Jump to Root", command=self._reset_to_root); self.btn_root.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         self.btn_cancel = ctk.CTkButton(self.btn_row, text="Cancel", command=self._cancel); self.btn_cancel.grid(row=0, column=2, padx=5, pady=5, sticky="ew")
         self._add_level(parent=self.root_path, label_text=str(self.root_path.name or self.root_path)); self.result = None
+        if self.suggestions: self._jump_to(self.suggestions[0])
+        self.after(100, self.search_entry.focus_set)
     def _reset_to_root(self):
         for f in self.level_frames: f.destroy()
-        self.level_frames.clear(); self.selected_paths.clear()
+        self.level_frames.clear(); self.level_vars.clear(); self.selected_paths.clear()
         self._add_level(parent=self.root_path, label_text=str(self.root_path.name or self.root_path))
     def _add_level(self, parent: Path, label_text: str):
         frame = ctk.CTkFrame(self.scroll); frame.pack(fill="x", padx=5, pady=5)
         lbl = ctk.CTkLabel(frame, text=label_text); lbl.pack(side="left", padx=5)
-        children = list_dirs(parent); options = [p.name for p in children]; options.append("New folder…"); options.append("<Select none>")
+        children = self.tree.children(parent) if self.tree is not None else list_dirs(parent); options = [p.name for p in children]; options.append("New folder…"); options.append("<Select none>")
         var = ctk.StringVar(value="<Select none>"); om = ctk.CTkOptionMenu(frame, variable=var, values=options, command=lambda choice, parent=parent: self._on_select(choice, parent))
         om.pack(side="left", padx=5, fill="x", expand=True)
-        self.level_frames.append(frame); self.selected_paths.append(parent)
+        self.level_frames.append(frame); self.level_vars.append(var); self.selected_paths.append(parent)
     def _remove_levels_after(self, index: int):
         while len(self.level_frames) > index + 1:
-            f = self.level_frames.pop(); f.destroy(); self.selected_paths.pop()
+            f = self.level_frames.pop(); f.destroy(); self.level_vars.pop(); self.selected_paths.pop()
     def _on_select(self, choice: str, parent: Path):
         idx = self._find_level_index_for_parent(parent)
         if idx is None: return
@@ -142,10 +143,42 @@ class FolderPicker(ctk.CTkToplevel):
         clean = re.sub(r'[\/*?:"<>|]', "", name).strip()
         if not clean: CTkMessagebox(master=self, title="Invalid Name", message="Folder name cannot be empty or only special characters."); return
         new_path = parent / clean
-        try: new_path.mkdir(parents=True, exist_ok=False)
+        try:
+            new_path.mkdir(parents=True, exist_ok=False)
+            if self.tree is not None: self.tree.add_dir(new_path)  # don't wait for the watchdog event
         except FileExistsError: CTkMessagebox(master=self, title="Exists", message="A folder with that name already exists.")
         except Exception as e: CTkMessagebox(master=self, title="Error", message=f"Failed to create folder: {e}")
         self._remove_levels_after(idx-1 if idx>0 else -1); self._add_level(parent=parent, label_text=str(parent.name))
+    def _on_search_key(self, event):
+        if event.keysym in ("Return", "Up", "Down", "Escape"): return
+        query = self.search_entry.get()
+        if not query.strip(): self._show_levels(); return
+        self.search_hits = self.tree.search(query) if self.tree is not None else []; self.search_pos = 0
+        for b in self.hit_buttons: b.destroy()
+        self.hit_buttons = []
+        for path in self.search_hits:
+            label = " / ".join(path.relative_to(self.root_path).parts)
+            b = ctk.CTkButton(self.results, text=label, anchor="w", fg_color="transparent", command=lambda p=path: self._jump_to(p))
+            b.pack(fill="x", padx=5, pady=1); self.hit_buttons.append(b)
+        if not self.search_hits:
+            b = ctk.CTkLabel(self.results, text="No matching folders"); b.pack(padx=5, pady=5); self.hit_buttons.append(b)
+        self._highlight_hit(); self.scroll.grid_remove(); self.results.grid(row=2, column=0, padx=10, pady=10, sticky="nsew")
+    def _highlight_hit(self):
+        for i, b in enumerate(self.hit_buttons[:len(self.search_hits)]):
+            b.configure(fg_color=ctk.ThemeManager.theme["CTkButton"]["fg_color"] if i == self.search_pos else "transparent")
+    def _move_hit(self, step: int):
+        if self.search_hits: self.search_pos = (self.search_pos + step) % len(self.search_hits); self._highlight_hit()
+    def _confirm_hit(self):
+        if self.search_hits: self.result = self.search_hits[self.search_pos]; self.destroy()
+    def _show_levels(self):
+        self.search_hits = []; self.results.grid_remove(); self.scroll.grid()
+    def _clear_search(self):
+        self.search_entry.delete(0, "end"); self._show_levels()
+    def _jump_to(self, path: Path):
+        # Rebuild the cascade along the match so the user can go deeper or create a subfolder from there.
+        self._clear_search(); self._reset_to_root(); parent = self.root_path
+        for part in path.relative_to(self.root_path).parts:
+            self.level_vars[-1].set(part); self._on_select(part, parent); parent = parent / part
     def _find_level_index_for_parent(self, parent: Path):
         for i, p in enumerate(self.selected_paths):
             if p == parent: return i
@@ -229,6 +262,7 @@ class App:
                 config = json.load(f)
             self.WATCH_FOLDER = Path(config["watch_folder"])
             self.SORTED_FOLDER = Path(config["sorted_folder"])
+            self.config = config
         except Exception as e:
             CTkMessagebox(master=self.root, title="Configuration Error", message=f"Failed to load config.json:\n{e}", icon="error")
             self.root.destroy()
@@ -238,6 +272,9 @@ class App:
         self.LOG_FILE = self.SORTED_FOLDER / 'paper_sorter_log.txt'
         self.WATCH_FOLDER.mkdir(exist_ok=True)
         self.SORTED_FOLDER.mkdir(exist_ok=True)
+        # Services (caches, indexes, job store, LLM client, pipeline) are built by _warm_up once the window is up.
+        self._stop_event = threading.Event(); self._ready = threading.Event()
+        self.filename_index = None; self.job_store = None; self.pipeline = None; self.metrics_services = []
         
         self.main_frame = ctk.CTkFrame(self.root)
         self.main_frame.grid(row=0, column=0, sticky="nsew")
@@ -265,13 +302,25 @@ class App:
         self.btn_name_papers = ctk.CTkButton(self.button_frame, text="Name Paper(s)", command=self.rename_papers_flow); self.btn_name_papers.pack(side="left", padx=5, pady=5)
         self.btn_view_sorted = ctk.CTkButton(self.button_frame, text="View Sorted", command=self.open_sorted_folder); self.btn_view_sorted.pack(side="left", padx=5, pady=5)
         self.btn_view_log = ctk.CTkButton(self.button_frame, text="View Log", command=self.open_log_file); self.btn_view_log.pack(side="left", padx=5, pady=5)
+        # --- NEW: bulk rename/re-file of the sorted library from cached details, with undo ---
+        self.btn_reorganize = ctk.CTkButton(self.button_frame, text="Re-organize", command=self.reorganize_library_flow); self.btn_reorganize.pack(side="left", padx=5, pady=5)
+        # --- NEW: rename prefetch progress (shown only while a "Name Paper(s)" run is active) ---
+        self.btn_cancel_rename = ctk.CTkButton(self.button_frame, text="Cancel", width=70, command=self._cancel_rename)
+        self.rename_progress = ctk.CTkProgressBar(self.button_frame, width=160); self.rename_progress_label = ctk.CTkLabel(self.button_frame, text="")
+        self.rename_prefetcher = None; self._rename_signal = ctk.IntVar(value=0)
         
         self.log_textbox = ctk.CTkTextbox(self.bottom_frame, activate_scrollbars=True); self.log_textbox.grid(row=1, column=0, padx=0, pady=(0, 10), sticky="nsew")
-        self.redirector = TextboxRedirector(self.log_textbox)
+        self.log_handler = TextboxLogHandler(self.log_textbox, max_lines=self.config.get("log_view_max_lines", 2000))
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', handlers=[
-            logging.FileHandler(self.LOG_FILE, encoding='utf-8'), logging.StreamHandler(self.redirector)])
-        self.file_queue = Queue(); self.rename_queue = Queue(); self.gui_queue = Queue()
-        self.root.after(100, self.start_app)
+            logging.FileHandler(self.LOG_FILE, encoding='utf-8'), self.log_handler])
+        self.file_queue = Queue(); self.rename_queue = Queue()
+        # Bounded so the extraction pipeline pauses while proposals wait for review; each put wakes process_gui_queue.
+        self._gui_wakeup_lock = threading.Lock(); self._gui_wakeup_pending = False; self._gui_queue_busy = False
+        self.gui_queue = WakeupQueue(maxsize=self.config.get("gui_queue_size", 8), on_put=self._wake_gui_queue)
+        METRICS.gauge("queue_depth", self.gui_queue.qsize, queue="gui"); METRICS.gauge("queue_depth", self.file_queue.qsize, queue="file")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        # Idle callbacks run after the pending geometry/redraw work, i.e. once the window is on screen.
+        self.root.after_idle(self._begin_warm_up)
         # One-time safety on startup
         self.root.after(0, self._normalize_root)
 
@@ -286,62 +335,178 @@ class App:
         except Exception:
             pass
 
+    def _scan_library(self):
+        # Folder tree first (the picker needs it soonest), then the filename index, then fingerprint
+        # any library papers the duplicate and folder-suggestion indexes haven't seen yet.
+        self.folder_tree.rebuild(); self.filename_index.rebuild(); self.filename_index.save()
+        library = self.filename_index.all_paths()
+        removed = self.folder_suggester.prune(library)
+        todo = [p for p in library if p not in self.duplicate_index or p not in self.folder_suggester]
+        if removed: logging.info(f"Folder suggestion index: removed {removed} paper(s) no longer in the library.")
+        if not todo: return
+        self._ready.wait()  # extraction runs in the pipeline's process pool, which start_app creates
+        self._index_library(todo)
+
+    def _index_library(self, pdf_paths):
+        # Each PDF is parsed at most once (snippet cache first) and feeds both indexes.
+        from folder_suggest import SUGGEST_CHARS  # already imported by _warm_up
+        added = 0
+        for pdf_path, text in self.pipeline.extract_many(pdf_paths, self._stop_event):
+            text = text or ""
+            try:
+                if pdf_path not in self.duplicate_index: self.duplicate_index.add(pdf_path, self.details_cache.content_hash(pdf_path), text[:MINHASH_CHARS])
+                if pdf_path not in self.folder_suggester: self.folder_suggester.add(pdf_path, text[:SUGGEST_CHARS])
+                added += 1
+            except Exception as e: logging.debug(f"Library indexing skipped {pdf_path}: {e}")
+        if added: logging.info(f"Duplicate and folder suggestion indexes: added {added} library paper(s).")
+
+    # --- NEW: window first; heavy imports and service construction run on a warm-up thread ---
+    def _begin_warm_up(self):
+        startup.mark("window")
+        threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
+
+    def _warm_up(self):
+        try:
+            with startup.phase("imports"):
+                startup.timed_import("pypdf", "numpy", "watchdog.observers", "llm_client", "pipeline", "filename_index", "folder_tree", "folder_suggest")
+            from filename_index import FilenameIndex
+            from folder_suggest import FolderSuggester
+            from folder_tree import FolderTree
+            from llm_client import client_requires_key, make_client
+            with startup.phase("services"):
+                # --- NEW: size/time guards for opening PDFs (also handed to the extraction processes) ---
+                set_limits(limits_from_config(self.config))
+                # --- NEW: content-addressed details cache (kept next to the app, not in the synced library) ---
+                self.details_cache = DetailsCache(Path(self.config.get("cache_path") or self.SCRIPT_DIRECTORY / "paper_cache.sqlite"),
+                                                  max_mb=self.config.get("cache_max_mb", 256))
+                # --- NEW: persisted filename prefix index for the duplicate check; refreshed by one background scan ---
+                self.filename_index = FilenameIndex(self.SORTED_FOLDER, self.SCRIPT_DIRECTORY / "filename_index.json")
+                self.filename_index.load()
+                # --- NEW: cached folder tree for the destination picker (listing + type-ahead search) ---
+                self.folder_tree = FolderTree(self.SORTED_FOLDER)
+                # --- NEW: text-similarity index that ranks destination folders for a new paper ---
+                self.folder_suggester = FolderSuggester(self.SORTED_FOLDER, self.SCRIPT_DIRECTORY / "folder_suggest.sqlite")
+                # --- NEW: content-level duplicate index (hash / DOI / MinHash) over the sorted library ---
+                self.duplicate_index = DuplicateIndex(self.SORTED_FOLDER, self.SCRIPT_DIRECTORY / "duplicate_index.sqlite")
+                # --- NEW: durable per-file job states, so restarts resume instead of re-extracting ---
+                self.job_store = JobStore(self.SCRIPT_DIRECTORY / "jobs.sqlite", max_retries=self.config.get("job_max_retries", 3))
+                self.job_store.prune()
+                # --- NEW: localhost metrics endpoint, periodic metrics.json and the opt-in sampling profiler ---
+                self.metrics_services = start_from_config(self.config, self.SCRIPT_DIRECTORY)
+            threading.Thread(target=self._scan_library, name="library-scan", daemon=True).start()
+            if not self.API_KEY and client_requires_key(self.config): logging.error("FATAL: GEMINI_API_KEY not set."); return
+            # One long-lived client for the whole session (configured once, connections reused); the Gemini SDK loads here.
+            with startup.phase("llm_client"): self.llm_client = make_client(self.config, self.API_KEY)
+        except Exception as e:
+            logging.error(f"FATAL: startup failed: {e}"); return
+        if not self._stop_event.is_set(): self.root.after(0, self.start_app)
+
     def start_app(self):
-        if not self.API_KEY: logging.error("FATAL: GEMINI_API_KEY not set."); return
+        from pipeline import ExtractionPipeline  # already imported by _warm_up
+        self.pipeline = ExtractionPipeline(self.llm_client, self.gui_queue, cache=self.details_cache,
+                                           extract_workers=self.config.get("extract_workers", 2),
+                                           llm_workers=self.config.get("llm_workers", 4),
+                                           queue_size=self.config.get("pipeline_queue_size", 16),
+                                           fast_path_min_confidence=self.config.get("fast_path_min_confidence", 1.0),
+                                           retry_rounds=self.config.get("llm_retry_rounds", 2), retry_delay_s=self.config.get("llm_retry_delay_seconds", 30),
+                                           on_failure=self._job_failed, **self._batch_settings())
+        self.pipeline.start()
         self.worker_thread = threading.Thread(target=self.processing_loop, daemon=True); self.worker_thread.start()
         self.rename_worker_thread = threading.Thread(target=self.rename_processing_loop, daemon=True); self.rename_worker_thread.start()
-        self.start_watcher(); self.process_gui_queue(); self.process_existing_files()
+        self.start_watcher(); self.process_gui_queue()
+        threading.Thread(target=self._resume_jobs, name="job-resume", daemon=True).start()
+        self._ready.set(); startup.mark("ready"); logging.info(startup.report())
+    def _batch_settings(self) -> dict:
+        return {"batch_max_papers": self.config.get("batch_max_papers", 8), "batch_token_budget": self.config.get("batch_token_budget", 24000),
+                "snippet_token_budget": self.config.get("snippet_token_budget", 500)}
     def on_closing(self):
         logging.info("--- Shutting down... ---")
+        self._stop_event.set()
+        try: self.stability_tracker.stop()
+        except Exception: pass
         try: self.observer.stop(); self.observer.join(timeout=3)
         except Exception: pass
+        try: self.pipeline.shutdown()
+        except Exception: pass
+        if self.rename_prefetcher is not None: self.rename_prefetcher.cancel()
+        if self.filename_index is not None: self.filename_index.save()  # None: closed before the warm-up finished
+        if self.job_store is not None: self.job_store.close()
+        for service in self.metrics_services: service.stop()
         self.root.destroy()
     def start_watcher(self):
+        from filename_index import FilenameIndexHandler
+        from folder_tree import FolderTreeHandler
+        from watchdog.observers import Observer
         event_handler = self.create_watchdog_handler(); self.observer = Observer()
-        self.observer.schedule(event_handler, str(self.WATCH_FOLDER), recursive=False); self.observer.start()
-        logging.info(f"Watching for new files in: {self.WATCH_FOLDER}"); self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.observer.schedule(event_handler, str(self.WATCH_FOLDER), recursive=False)
+        self.observer.schedule(FilenameIndexHandler(self.filename_index), str(self.SORTED_FOLDER), recursive=True)
+        self.observer.schedule(FolderTreeHandler(self.folder_tree), str(self.SORTED_FOLDER), recursive=True); self.observer.start()
+        logging.info(f"Watching for new files in: {self.WATCH_FOLDER}")
     def create_watchdog_handler(self):
+        from watchdog.events import FileSystemEventHandler
+        # Handlers only register the file; the stability tracker enqueues it once it has finished writing.
+        self.stability_tracker = StabilityTracker(self._enqueue_stable_files, settle_s=self.config.get("file_settle_seconds", 1.0)).start()
         class MyHandler(FileSystemEventHandler):
-            def __init__(self, queue): self.queue = queue
+            def __init__(self, tracker): self.tracker = tracker
             def on_created(self, event):
-                if not event.is_directory and event.src_path.lower().endswith('.pdf'):
-                    time.sleep(2); self.queue.put(Path(event.src_path))
-        return MyHandler(self.file_queue)
+                if not event.is_directory and event.src_path.lower().endswith('.pdf'): self.tracker.track(Path(event.src_path))
+            def on_moved(self, event):
+                if not event.is_directory and event.dest_path.lower().endswith('.pdf'): self.tracker.track(Path(event.dest_path))
+        return MyHandler(self.stability_tracker)
+    # --- NEW: files handed over by watch_and_launch.py (or a second launch) through single_instance ---
+    def receive_paths(self, paths):
+        pdfs = [p for p in paths if p.suffix.lower() == ".pdf" and p.is_file()]
+        if pdfs: logging.info(f"Received {len(pdfs)} file(s) from the watcher."); self._enqueue_stable_files(pdfs)
+    def show_window(self):
+        self.root.after(0, lambda: (self.root.deiconify(), self._normalize_root()))
+    def _enqueue_stable_files(self, paths):
+        if len(paths) > 1: logging.info(f"{len(paths)} new file(s) ready for processing.")
+        for pdf_path in paths: self.file_queue.put(pdf_path)
+    # Worker threads now only feed the staged pipeline; results arrive on gui_queue.
+    # The job store dedups the startup scan, watchdog events and resumed jobs reporting the same file.
     def processing_loop(self):
         while True:
             pdf_path = self.file_queue.get()
+            try: content_hash = self.details_cache.content_hash(pdf_path)
+            except OSError as e: logging.warning(f"Cannot read '{pdf_path.name}': {e}"); continue
+            if not self.job_store.enqueue(pdf_path, "sort", content_hash): continue
             logging.info(f"--- Processing (sort): {pdf_path.name} ---")
-            details = get_paper_details(pdf_path, self.API_KEY)
-            if details: self.gui_queue.put(("sort", pdf_path, details))
-            else: logging.error(f"Could not get details for {pdf_path.name}.")
+            self.job_store.set_state(pdf_path, EXTRACTING); self.pipeline.submit("sort", pdf_path)
     def rename_processing_loop(self):
         while True:
             pdf_path = self.rename_queue.get()
             logging.info(f"--- Processing (rename): {pdf_path.name} ---")
-            details = get_paper_details(pdf_path, self.API_KEY)
-            if details: self.gui_queue.put(("rename", pdf_path, details))
-            else: logging.error(f"Could not get details for {pdf_path.name}.")
+            self.pipeline.submit("rename", pdf_path)
+    def _wake_gui_queue(self):
+        with self._gui_wakeup_lock:
+            if self._gui_wakeup_pending: return
+            self._gui_wakeup_pending = True
+        self.root.after(0, self.process_gui_queue)
     def process_gui_queue(self):
+        with self._gui_wakeup_lock: self._gui_wakeup_pending = False
+        # Review dialogs run nested event loops; a wakeup arriving meanwhile must not open a second review.
+        if self._gui_queue_busy: return
+        self._gui_queue_busy = True
         try:
             while not self.gui_queue.empty():
                 mode, pdf_path, details = self.gui_queue.get()
-                if mode == "sort": self.handle_user_confirmation_sort(pdf_path, details)
+                if mode == "sort":
+                    if not pdf_path.exists(): self.job_store.set_state(pdf_path, DONE); continue  # moved away while queued
+                    self.job_store.set_state(pdf_path, AWAITING_REVIEW, details=details)
+                    self.handle_user_confirmation_sort(pdf_path, details)
+                    if not self._stop_event.is_set(): self.job_store.set_state(pdf_path, DONE)  # closing mid-review keeps it pending
                 elif mode == "rename": self.handle_rename_confirmation(pdf_path, details)
         finally:
-            self.root.after(200, self.process_gui_queue)
+            self._gui_queue_busy = False
+            if not self.gui_queue.empty() and not self._stop_event.is_set(): self._wake_gui_queue()  # items whose wakeup landed while busy
 
     # --- FIXED: Reworked function + normalization after every modal ---
     def handle_user_confirmation_sort(self, pdf_path: Path, details: dict):
-        details['author'] = cleanup_author_string(details.get('author', 'Unknown'))
-        author = details.get('author', 'Unknown'); year = details.get('year', 'Unknown')
-        journal = details.get('journal', 'Unknown'); is_multiple = bool(details.get('is_multiple_authors', True))
-        author_string = f"{author} et al" if is_multiple else author
-        new_filename_base = f"{sanitize_filename_part(author_string)}_{sanitize_filename_part(journal)}_{year}"
-        new_filename_ext = f"{new_filename_base}.pdf"; title = details.get('title', 'Unknown Title')
+        new_filename_ext = propose_filename(details, self.config.get("filename_template", FILENAME_TEMPLATE)); title = details.get('title', 'Unknown Title')
         
         # --- STEP 1: Propose and Edit Name ---
         name_dialog = FilenameEditorDialog(self.root, original_name=pdf_path.name, ai_title=title, proposed_name=new_filename_ext)
-        self.root.wait_window(name_dialog)
+        with METRICS.timer("modal_wait", dialog="name"): self.root.wait_window(name_dialog)
         self._normalize_root()  # <-- normalize after modal
         final_filename = name_dialog.result
 
@@ -350,18 +515,34 @@ class App:
 
         # --- STEP 2: Check for Duplicates (based on the user-approved name) ---
         final_filename_base = Path(final_filename).stem
-        if list(self.SORTED_FOLDER.rglob(f"{final_filename_base}*.pdf")):
-            msg_text = (f"A potential duplicate exists for:'{final_filename}'\n\nAdd anyway?")
+        with METRICS.timer("stage", stage="duplicate_check"):
+            try:
+                content_hash = self.details_cache.content_hash(pdf_path)
+                first_text = (get_text_snippet(pdf_path, self.details_cache) or "")[:MINHASH_CHARS]
+                content_matches = self.duplicate_index.check(content_hash, first_text)
+            except Exception as e:
+                logging.warning(f"Content duplicate check failed for '{pdf_path.name}': {e}")
+                content_hash, first_text, content_matches = None, "", []
+            name_matches = self.filename_index.find_prefix(final_filename_base)
+        if content_matches or name_matches:
+            if content_matches:
+                best = content_matches[0]; match_path, match_info = best.path, f"Similarity: {best.score:.0%} ({best.reason})"
+            else:
+                match_path, match_info = name_matches[0], "Similarity: filename match only"
+            try: match_display = str(match_path.relative_to(self.SORTED_FOLDER))
+            except ValueError: match_display = str(match_path)
+            msg_text = (f"A potential duplicate exists for:'{final_filename}'\n\nMatching file:\n{match_display}\n{match_info}\n\nAdd anyway?")
             msg = CTkMessagebox(master=self.root, title="Suspected Duplicate", message=msg_text, icon="question", option_1="Add Anyway", option_2="Skip")
-            choice = msg.get()
+            with METRICS.timer("modal_wait", dialog="duplicate"): choice = msg.get()
             self._normalize_root()  # <-- normalize after modal
             if choice == "Skip":
                 logging.warning(f"DUPLICATE: User chose to skip '{pdf_path.name}'.")
                 return
         
         # --- STEP 3: Choose the destination folder ---
-        picker = FolderPicker(self.root, self.SORTED_FOLDER)
-        self.root.wait_window(picker)
+        suggestions = [folder for folder, _ in self.folder_suggester.suggest(f"{title}\n{first_text}")]
+        picker = FolderPicker(self.root, self.SORTED_FOLDER, self.folder_tree, suggestions)
+        with METRICS.timer("modal_wait", dialog="folder_picker"): self.root.wait_window(picker)
         self._normalize_root()  # <-- normalize after modal
         dest_folder = picker.result
         
@@ -378,22 +559,20 @@ class App:
             folder_display = str(final_destination_path.parent)
         confirm_text = (f"Destination Folder:\n{folder_display}\n\nFilename:\n{final_destination_path.name}")
         confirm_msg = CTkMessagebox(master=self.root, title="Confirm Move", message=confirm_text, icon="question", option_1="Confirm", option_2="Cancel")
-        confirm_choice = confirm_msg.get()
+        with METRICS.timer("modal_wait", dialog="confirm_move"): confirm_choice = confirm_msg.get()
         self._normalize_root()  # <-- normalize after modal
         
         if confirm_choice == "Cancel":
             logging.info(f"User canceled final move for '{pdf_path.name}'."); return
         
-        # --- STEP 5: Move the file ---
+        # --- STEP 5: Move the file (never overwrites; a taken name gets the first free -N) ---
         try:
-            final_destination_path.parent.mkdir(parents=True, exist_ok=True)
-            if final_destination_path.exists():
-                final_destination_path = final_destination_path.with_name(f"{final_destination_path.stem}-1{final_destination_path.suffix}"); n = 1
-                while final_destination_path.exists():
-                    n += 1
-                    base_stem = final_destination_path.stem.rsplit('-',1)[0]
-                    final_destination_path = final_destination_path.with_name(f"{base_stem}-{n}{final_destination_path.suffix}")
-            shutil.move(str(pdf_path), str(final_destination_path))
+            with METRICS.timer("stage", stage="move"): final_destination_path = safe_rename(pdf_path, final_destination_path)
+            METRICS.inc("papers_sorted")
+            self.details_cache.record_moves([(pdf_path, final_destination_path)])  # a later re-organize finds its details without re-hashing
+            self.filename_index.add(final_destination_path)  # don't wait for the watchdog event
+            if content_hash: self.duplicate_index.add(final_destination_path, content_hash, first_text)
+            self.folder_suggester.add(final_destination_path, first_text)
             try:
                 rel_path = final_destination_path.relative_to(self.SCRIPT_DIRECTORY)
                 logging.info(f"MOVED: '{pdf_path.name}' -> '{rel_path}'")
@@ -406,6 +585,7 @@ class App:
 
     # (The rename flow can also be updated to use the new dialog if desired)
     def rename_papers_flow(self):
+        if not self._ready.is_set(): logging.info("Still starting up; try \"Name Paper(s)\" again in a moment."); return
         # Prompt user to select a folder or files
         choice = CTkMessagebox(master=self.root, title="Rename Papers", message="Would you like to select a folder or individual PDF files?", icon="question", option_1="Folder", option_2="Files", option_3="Cancel").get()
         if choice == "Cancel":
@@ -432,55 +612,155 @@ class App:
         total = len(pdf_files)
         renamed = 0
         skipped = 0
-        for pdf_path in pdf_files:
-            details = get_paper_details(pdf_path, self.API_KEY)
-            if not details:
-                logging.info(f"Could not extract details for {pdf_path.name}. Skipping.")
-                skipped += 1
-                continue
-            details['author'] = cleanup_author_string(details.get('author', 'Unknown'))
-            author = details.get('author', 'Unknown')
-            year = details.get('year', 'Unknown')
-            journal = details.get('journal', 'Unknown')
-            is_multiple = bool(details.get('is_multiple_authors', True))
-            author_string = f"{author} et al" if is_multiple else author
-            new_filename_base = f"{sanitize_filename_part(author_string)}_{sanitize_filename_part(journal)}_{year}"
-            new_filename_ext = f"{new_filename_base}.pdf"
-            title = details.get('title', 'Unknown Title')
-            # Show dialog for user to edit/approve
-            name_dialog = FilenameEditorDialog(self.root, original_name=pdf_path.name, ai_title=title, proposed_name=new_filename_ext)
-            self.root.wait_window(name_dialog)
-            self._normalize_root()
-            final_filename = name_dialog.result
-            if not final_filename:
-                logging.info(f"User skipped '{pdf_path.name}' at name proposal stage.")
-                skipped += 1
-                continue
-            final_path = pdf_path.parent / final_filename
-            if final_path.exists():
-                exists_box = CTkMessagebox(master=self.root, title="File Exists", message=f"A file named {final_filename} already exists. Skipping.")
-                self.root.wait_window(exists_box)
-                self._normalize_root()
-                logging.info(f"Skipped renaming '{pdf_path.name}' because '{final_filename}' already exists.")
-                skipped += 1
-                continue
-            try:
-                pdf_path.rename(final_path)
-                log_msg = f"Renamed (AI Naming): {pdf_path.name} -> {final_filename}"
-                logging.info(log_msg)
-                renamed += 1
-            except Exception as e:
-                logging.error(f"Failed to rename {pdf_path.name}: {e}")
-                error_box = CTkMessagebox(master=self.root, title="Rename Error", message=f"Failed to rename {pdf_path.name}: {e}")
-                self.root.wait_window(error_box)
-                self._normalize_root()
-                skipped += 1
+        # Extract in the background, a bounded window ahead of the review, and walk the user through proposals as they land.
+        logging.info(f"Extracting details for {total} paper(s)...")
+        prefetcher = self._start_rename_prefetch(pdf_files)
+        try:
+            for index, pdf_path in enumerate(pdf_files):
+                if not self._wait_for_prefetch(prefetcher, index): break
+                outcome = self._review_rename(pdf_path, prefetcher.result(index))
+                if outcome: renamed += 1
+                else: skipped += 1
+        finally:
+            canceled = prefetcher.cancelled; self._finish_rename_prefetch(prefetcher)
+        if canceled:
+            logging.info(f"Rename process canceled. {renamed} renamed, {skipped} skipped, {total - renamed - skipped} not reviewed.")
+            return
         logging.info(f"Rename process finished. {renamed} renamed, {skipped} skipped, {total} total.")
         CTkMessagebox(master=self.root, title="Rename Complete", message=f"Renaming complete.\nRenamed: {renamed}\nSkipped: {skipped}\nTotal: {total}")
+
+    def _start_rename_prefetch(self, pdf_files: list) -> Prefetcher:
+        batch = self._batch_settings()
+        fetch = lambda chunk: get_papers_details(chunk, self.llm_client, cache=self.details_cache,
+                                                 token_budget=batch["batch_token_budget"], max_papers=batch["batch_max_papers"],
+                                                 snippet_budget=batch["snippet_token_budget"])
+        # Worker-thread callbacks hop onto the Tk loop via after(), like the log redirector.
+        on_progress = lambda done, total: self.root.after(0, self._show_rename_progress, done, total)
+        on_ready = lambda index: self.root.after(0, self._bump_rename_signal)
+        self.rename_prefetcher = Prefetcher(pdf_files, fetch, lookahead=self.config.get("rename_lookahead", 16),
+                                            chunk_size=batch["batch_max_papers"], on_progress=on_progress, on_ready=on_ready)
+        self.btn_name_papers.configure(state="disabled")
+        self.rename_progress.set(0); self.rename_progress_label.configure(text=f"Extracting 0/{len(pdf_files)}")
+        self.rename_progress.pack(side="left", padx=(15, 5), pady=5); self.rename_progress_label.pack(side="left", padx=5, pady=5)
+        self.btn_cancel_rename.pack(side="left", padx=5, pady=5)
+        return self.rename_prefetcher.start()
+
+    def _show_rename_progress(self, done: int, total: int):
+        self.rename_progress.set(done / total); self.rename_progress_label.configure(text=f"Extracting {done}/{total}")
+
+    def _wait_for_prefetch(self, prefetcher: Prefetcher, index: int) -> bool:
+        # wait_variable keeps the event loop (and the Cancel button) responsive while the next proposal is in flight.
+        with METRICS.timer("stage", stage="rename_prefetch_wait"):
+            while not prefetcher.ready(index): self.root.wait_variable(self._rename_signal)
+        return not prefetcher.cancelled
+
+    def _cancel_rename(self):
+        if self.rename_prefetcher is not None:
+            self.rename_prefetcher.cancel(); self._bump_rename_signal()
+
+    def _bump_rename_signal(self): self._rename_signal.set(self._rename_signal.get() + 1)
+
+    def _finish_rename_prefetch(self, prefetcher: Prefetcher):
+        prefetcher.cancel(); self.rename_prefetcher = None
+        self.rename_progress.pack_forget(); self.rename_progress_label.pack_forget(); self.btn_cancel_rename.pack_forget()
+        self.btn_name_papers.configure(state="normal")
+
+    def _review_rename(self, pdf_path: Path, details: dict) -> bool:
+        """Shows the proposal for one paper and renames it on approval; True if the file was renamed."""
+        if not details:
+            logging.info(f"Could not extract details for {pdf_path.name}. Skipping.")
+            return False
+        new_filename_ext = propose_filename(details, self.config.get("filename_template", FILENAME_TEMPLATE))
+        title = details.get('title', 'Unknown Title')
+        # Show dialog for user to edit/approve
+        name_dialog = FilenameEditorDialog(self.root, original_name=pdf_path.name, ai_title=title, proposed_name=new_filename_ext)
+        with METRICS.timer("modal_wait", dialog="rename"): self.root.wait_window(name_dialog)
+        self._normalize_root()
+        final_filename = name_dialog.result
+        if not final_filename:
+            logging.info(f"User skipped '{pdf_path.name}' at name proposal stage.")
+            return False
+        final_path = pdf_path.parent / final_filename
+        try:
+            place(pdf_path, final_path)  # atomic and never overwrites: FileExistsError if the name is taken, even by a racing writer
+            log_msg = f"Renamed (AI Naming): {pdf_path.name} -> {final_filename}"
+            logging.info(log_msg)
+            return True
+        except FileExistsError:
+            exists_box = CTkMessagebox(master=self.root, title="File Exists", message=f"A file named {final_filename} already exists. Skipping.")
+            self.root.wait_window(exists_box)
+            self._normalize_root()
+            logging.info(f"Skipped renaming '{pdf_path.name}' because '{final_filename}' already exists.")
+            return False
+        except Exception as e:
+            logging.error(f"Failed to rename {pdf_path.name}: {e}")
+            error_box = CTkMessagebox(master=self.root, title="Rename Error", message=f"Failed to rename {pdf_path.name}: {e}")
+            self.root.wait_window(error_box)
+            self._normalize_root()
+            return False
+    # --- NEW: re-organize the sorted library: plan off the Tk thread, one confirmation, journaled apply, optional undo ---
+    def reorganize_library_flow(self):
+        if not self._ready.is_set(): logging.info("Still starting up; try \"Re-organize\" again in a moment."); return
+        self.btn_reorganize.configure(state="disabled"); logging.info("Planning library re-organize...")
+        threading.Thread(target=self._plan_reorganize, name="reorganize", daemon=True).start()
+
+    def _plan_reorganize(self):
+        try:
+            plan = reorganize.plan(self.SORTED_FOLDER, self.details_cache, self.config.get("filename_template", FILENAME_TEMPLATE),
+                                   self.config.get("reorganize_folder_template", ""), self.duplicate_index)
+        except Exception as e: logging.error(f"Re-organize planning failed: {e}"); plan = None
+        self.root.after(0, self._confirm_reorganize, plan)
+
+    def _confirm_reorganize(self, plan):
+        if plan is None or not plan.moves:
+            if plan is not None: logging.info(f"Library already matches the template ({plan.unchanged} paper(s); {len(plan.missing)} without cached details).")
+            self.btn_reorganize.configure(state="normal"); return
+        examples = "\n".join(f"{m.src.name} -> {m.dst.name}" for m in plan.moves[:5])
+        message = (f"{len(plan.moves)} paper(s) will be renamed or moved, {plan.unchanged} already match"
+                   f"{f', {len(plan.missing)} have no cached details and stay as they are' if plan.missing else ''}.\n\n{examples}\n\nThe run can be undone afterwards.")
+        choice = CTkMessagebox(master=self.root, title="Re-organize Library", message=message, icon="question", option_1="Apply", option_2="Cancel").get()
+        self._normalize_root()
+        if choice != "Apply": logging.info("User canceled the library re-organize."); self.btn_reorganize.configure(state="normal"); return
+        threading.Thread(target=self._run_reorganize, kwargs={"plan": plan}, name="reorganize", daemon=True).start()
+
+    def _run_reorganize(self, plan=None, undo_journal=None):
+        # The details cache and content indexes follow each rename; the watchdog handlers update the filename index and folder tree.
+        on_moved = reorganize.index_updater(self.details_cache, self.duplicate_index, self.folder_suggester)
+        workers = self.config.get("reorganize_workers", reorganize.REORGANIZE_WORKERS)
+        try:
+            if undo_journal is not None: result = reorganize.undo(undo_journal, workers, on_moved)
+            else: result = reorganize.apply(plan, self.SCRIPT_DIRECTORY / reorganize.JOURNAL_DIRNAME, workers, on_moved)
+        except Exception as e: logging.error(f"Re-organize failed: {e}"); result = None
+        self.root.after(0, self._reorganize_done, result, undo_journal is not None)
+
+    def _reorganize_done(self, result, undone: bool):
+        self.btn_reorganize.configure(state="normal")
+        if result is None or undone: return
+        message = f"Moved: {result['moved']}\nFailed: {result['failed']}\n\nRun {result['run']} (details in the log)."
+        choice = CTkMessagebox(master=self.root, title="Re-organize Complete", message=message, option_1="OK", option_2="Undo").get()
+        self._normalize_root()
+        if choice == "Undo":
+            self.btn_reorganize.configure(state="disabled")
+            threading.Thread(target=self._run_reorganize, kwargs={"undo_journal": result["journal"]}, name="reorganize", daemon=True).start()
+
     def handle_rename_confirmation(self, pdf_path: Path, details: dict):
         # ... (unchanged placeholder) ...
         pass
         
+    def _job_failed(self, mode: str, pdf_path: Path, reason: str):
+        if mode == "sort": self.job_store.set_state(pdf_path, FAILED, error=reason)
+
+    def _resume_jobs(self):
+        # Runs off the main thread: pipeline.submit and gui_queue.put both block under backpressure.
+        jobs = self.job_store.resumable()
+        if jobs: logging.info(f"Resuming {len(jobs)} unfinished job(s) from the last session.")
+        for job in jobs:
+            if not job.path.exists(): self.job_store.set_state(job.path, DONE); continue
+            if job.state == AWAITING_REVIEW and job.details: self.gui_queue.put((job.mode, job.path, job.details))
+            elif job.state == FAILED: self.file_queue.put(job.path)  # re-enqueue counts against max_retries
+            else: self.job_store.set_state(job.path, EXTRACTING); self.pipeline.submit(job.mode, job.path)
+        self.process_existing_files()
+
     def process_existing_files(self):
         logging.info(f"Scanning for existing files in {self.WATCH_FOLDER}...")
         pdf_files = list(self.WATCH_FOLDER.glob('*.pdf'))
@@ -520,6 +800,13 @@ class App:
         os.startfile(self.LOG_FILE)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # required for the extraction process pool in PyInstaller builds
+    # --- NEW: one GUI per user; a second launch brings the running window forward instead ---
+    instance = InstanceLock()
+    if not instance.acquire():
+        send("show"); sys.exit(0)
     root = DnDCTk()
     app = App(root)
+    instance.serve(on_paths=app.receive_paths, on_show=app.show_window)
     root.mainloop()
+    instance.close()
@@ -0,0 +1,146 @@
+# pdf_guard.py
+"""
+Bounded-memory PDF opening with per-file size and time guards.
+
+`PdfReader(path)` reads the whole file into memory before parsing it, so a 300 MB thesis
+costs 300 MB of heap to read five pages. `open_pdf` hands pypdf a read-only memory map
+instead: pypdf seeks to the xref at the end of the file and resolves only the objects of
+the pages that are read. The pages it touches are file-backed and shared with the OS
+page cache, so peak memory follows the pages read, not the file size.
+
+    with open_pdf(path) as reader:
+        text = page_text(reader, 0)
+
+Files are rejected (PdfRejected, with a short `reason`) before pypdf parses them when
+they are empty, not a PDF, over `max_mb`, large and truncated (no startxref at the end),
+or need a password. While reading, a damaged xref in a large file is not rebuilt (that
+reads the whole file), pages with a huge content stream are skipped, and reading stops
+once the file's time budget is spent, keeping the pages read so far.
+"""
+
+import logging
+import math
+import mmap
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from metrics import METRICS
+
+MB = 1024 * 1024
+HEADER_SCAN_BYTES = 1024      # "%PDF-" may follow some leading junk, but not much
+TAIL_SCAN_BYTES = 64 * 1024   # startxref sits in the last few hundred bytes; allow trailing garbage
+REPAIR_MAX_BYTES = 32 * MB    # below this, pypdf may rebuild a damaged xref by reading the whole file
+DEADLINE_CHECK_READS = 256    # reads between clock checks (pypdf reads byte by byte while parsing)
+
+@dataclass
+class PdfLimits:
+    max_mb: float = 1024               # larger files are rejected unread (0 = no limit)
+    time_budget_s: float = 30.0        # per file: open + pages; later pages are skipped once spent (0 = no limit)
+    max_page_content_mb: float = 8.0   # pages whose content stream is larger (huge vector figures) are skipped
+
+LIMITS = PdfLimits()
+
+def set_limits(limits: PdfLimits):
+    """Process-wide limits; also the ProcessPoolExecutor initializer, so extraction workers get the same ones."""
+    global LIMITS
+    LIMITS = limits
+
+def limits_from_config(config: dict) -> PdfLimits:
+    return PdfLimits(max_mb=config.get("pdf_max_mb", 1024), time_budget_s=config.get("pdf_time_budget_seconds", 30.0),
+                     max_page_content_mb=config.get("pdf_max_page_content_mb", 8.0))
+
+class PdfRejected(ValueError):
+    """The file was not (fully) parsed: `reason` is empty, not_pdf, too_large, truncated, damaged, encrypted or timeout."""
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(reason, detail)  # both in args, so the exception survives pickling out of a worker process
+        self.reason = reason; self.detail = detail
+
+    def __str__(self): return self.detail or self.reason
+
+def _timeout() -> PdfRejected: return PdfRejected("timeout", "took longer than the per-file time budget")
+
+class _MappedPdf(mmap.mmap):
+    """The stream pypdf reads from: refuses whole-file reads of large files and stops at the deadline.
+
+    pypdf catches most exceptions and tries to repair around them, so both refusals are
+    sticky flags that open_pdf and page_text turn back into PdfRejected."""
+    deadline = math.inf; page_limit = math.inf; refused = False; expired = False; _reads = 0
+
+    def read(self, n=-1):
+        if self.expired: raise _timeout()
+        if (n is None or n < 0) and len(self) > REPAIR_MAX_BYTES:
+            self.refused = True
+            raise PdfRejected("damaged", f"damaged cross-reference table (repairing it would read all {len(self) / MB:.0f} MB)")
+        self._reads += 1
+        if self._reads % DEADLINE_CHECK_READS == 0 and time.monotonic() > self.deadline:
+            self.expired = True; raise _timeout()  # every later read fails too, so pypdf gives up instead of repairing
+        return super().read(n)
+
+@contextmanager
+def open_pdf(pdf_path: Path, limits: PdfLimits = None):
+    """PdfReader over a read-only memory map of `pdf_path`; the map is closed on exit (Windows can move the file again)."""
+    limits = limits or LIMITS
+    try: mm = _map(Path(pdf_path), limits)
+    except PdfRejected as e: METRICS.inc("pdf_rejected", reason=e.reason); raise
+    try:
+        mm.page_limit = limits.max_page_content_mb * MB
+        if limits.time_budget_s: mm.deadline = time.monotonic() + limits.time_budget_s
+        yield _reader(mm)
+    except PdfRejected as e:
+        METRICS.inc("pdf_rejected", reason=e.reason); raise
+    finally: mm.close()
+
+def _map(pdf_path: Path, limits: PdfLimits) -> _MappedPdf:
+    with open(pdf_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0: raise PdfRejected("empty", "empty file")
+        if limits.max_mb and size > limits.max_mb * MB: raise PdfRejected("too_large", f"{size / MB:.0f} MB is over the {limits.max_mb:g} MB limit")
+        mm = _MappedPdf(f.fileno(), 0, access=mmap.ACCESS_READ)  # the map keeps its own handle
+    if mm.find(b"%PDF-", 0, HEADER_SCAN_BYTES) < 0: mm.close(); raise PdfRejected("not_pdf", "not a PDF (no %PDF- header)")
+    if size > REPAIR_MAX_BYTES and mm.rfind(b"startxref", max(0, size - TAIL_SCAN_BYTES)) < 0:
+        mm.close(); raise PdfRejected("truncated", "truncated or damaged (no startxref at the end of the file)")
+    return mm
+
+def _reader(mm: _MappedPdf):
+    # pypdf is imported on first use so importing this module (GUI start, worker spawn) stays cheap.
+    from pypdf import PasswordType, PdfReader
+    try: reader = PdfReader(mm)
+    except PdfRejected: raise
+    except Exception as e:
+        if mm.expired: raise _timeout() from e
+        if mm.refused: raise PdfRejected("damaged", f"damaged cross-reference table ({e})") from e
+        raise
+    if reader.is_encrypted:
+        # PdfReader already tried the empty user password; owner-password-only files (print/copy restrictions) open fine.
+        try: opened = reader.decrypt("") != PasswordType.NOT_DECRYPTED
+        except Exception as e: raise PdfRejected("encrypted", f"encrypted ({e})") from e
+        if not opened: raise PdfRejected("encrypted", "password-protected")
+    return reader
+
+def _content_bytes(page) -> int:
+    contents = page.get("/Contents")
+    if contents is None: return 0
+    contents = contents.get_object(); total = 0
+    for stream in contents if isinstance(contents, list) else [contents]:
+        stream = stream.get_object()
+        if "/Length" in stream: total += int(stream["/Length"])  # encoded size (item access resolves an indirect /Length)
+    return total
+
+def page_text(reader, index: int):
+    """Text of page `index`; "" for a page over the content-size limit, None once the file's time budget is spent."""
+    stream = reader.stream
+    if index and time.monotonic() > getattr(stream, "deadline", math.inf):
+        logging.warning(f"PDF time budget spent; keeping the first {index} page(s)."); return None
+    try:
+        page = reader.pages[index]
+        size = _content_bytes(page)
+        if size > getattr(stream, "page_limit", math.inf):
+            logging.info(f"Skipping page {index + 1}: {size / MB:.1f} MB content stream."); METRICS.inc("pdf_pages_skipped"); return ""
+        return page.extract_text() or ""
+    except Exception as e:
+        if not getattr(stream, "expired", False): raise
+        if not index: raise _timeout() from e
+        logging.warning(f"PDF time budget spent on page {index + 1}; keeping the first {index} page(s)."); return None
@@ -0,0 +1,102 @@
+# pdf_metadata.py
+"""
+Deterministic pre-extraction from what a PDF already carries: the /Info dictionary,
+the XMP packet (dc:/prism: fields), a DOI and an arXiv identifier on page one.
+
+`embedded_details` returns the same dict shape as the LLM path plus a confidence in
+[0, 1]. Each field found scores only if it is consistent with the first-page text, so
+stale or generic metadata ("Microsoft Word - draft3.docx", a creation date years after
+publication) lowers the score and the paper falls back to the LLM prompt.
+"""
+
+import html
+import re
+
+DOI_RE = re.compile(r'\b(10\.\d{4,9}/[^\s"<>]+)', re.IGNORECASE)
+ARXIV_RE = re.compile(r'arXiv:\s*(\d{2})(\d{2})\.\d{4,5}(?:v\d+)?', re.IGNORECASE)
+YEAR_RE = re.compile(r'(?<!\d)(19[5-9]\d|20\d\d)(?!\d)')
+_JUNK_TITLE_RE = re.compile(r'(^microsoft word|\.docx?$|\.pdf$|\.tex$|^untitled|^title$|^\s*$)', re.IGNORECASE)
+_NAME_PARTICLES = {'van', 'von', 'der', 'de', 'da', 'di', 'del', 'le', 'la', 'du'}
+
+def find_doi(text: str):
+    m = DOI_RE.search(text or "")
+    return m.group(1).rstrip('.,;:)]}').lower() if m else None
+
+def _norm(text: str) -> str:
+    return re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).strip()
+
+def _xmp_packet(reader) -> str:
+    try:
+        meta = reader.trailer['/Root'].get('/Metadata')
+        return meta.get_object().get_data().decode('utf-8', 'replace') if meta is not None else ''
+    except Exception: return ''
+
+def _xmp_field(packet: str, tag: str):
+    """Text of an XMP element, including the first <rdf:li> of an Alt/Seq/Bag container."""
+    m = re.search(rf'<{tag}[^>]*>(.*?)</{tag}>', packet, re.DOTALL)
+    if not m:
+        m = re.search(rf'{tag}="([^"]*)"', packet)  # attribute form
+        return html.unescape(m.group(1)).strip() if m else None
+    inner = m.group(1); items = re.findall(r'<rdf:li[^>]*>(.*?)</rdf:li>', inner, re.DOTALL)
+    return html.unescape(items[0] if items else re.sub(r'<[^>]+>', '', inner)).strip() or None
+
+def _xmp_list(packet: str, tag: str) -> list[str]:
+    m = re.search(rf'<{tag}[^>]*>(.*?)</{tag}>', packet, re.DOTALL)
+    return [html.unescape(x).strip() for x in re.findall(r'<rdf:li[^>]*>(.*?)</rdf:li>', m.group(1), re.DOTALL)] if m else []
+
+def _split_authors(author_field: str) -> list[str]:
+    parts = re.split(r'\s*;\s*|\s+and\s+|\s*&\s*', author_field or '')
+    if len(parts) == 1 and author_field.count(',') >= 2: parts = author_field.split(',')  # "A. Smith, B. Jones, C. Lee"
+    return [p.strip() for p in parts if p.strip()]
+
+def last_name(name: str) -> str:
+    name = name.strip()
+    if ',' in name: return name.split(',')[0].strip()  # "Smith, John"
+    tokens = [t for t in re.split(r'\s+', name) if t and not t.endswith('.')]
+    if not tokens: return ''
+    i = len(tokens) - 1
+    while i > 0 and tokens[i - 1].lower() in _NAME_PARTICLES: i -= 1
+    return " ".join(tokens[i:])
+
+def _info_year(info) -> str:
+    raw = str(info.get('/CreationDate', '') or '') if info else ''
+    m = re.match(r'(?:D:)?(\d{4})', raw)
+    return m.group(1) if m else None
+
+def embedded_details(reader, first_page_text: str) -> tuple:
+    """Returns (details or None, confidence)."""
+    try: info = reader.metadata or {}
+    except Exception: info = {}
+    packet = _xmp_packet(reader); page_norm = _norm(first_page_text)
+    doi = find_doi(first_page_text) or (find_doi(_xmp_field(packet, 'prism:doi') or '') if packet else None)
+    arxiv = ARXIV_RE.search(first_page_text or '')
+
+    title = _xmp_field(packet, 'dc:title') or str(info.get('/Title', '') or '').strip() or None
+    creators = _xmp_list(packet, 'dc:creator') or _split_authors(str(info.get('/Author', '') or ''))
+    journal = _xmp_field(packet, 'prism:publicationName')
+    subject = str(info.get('/Subject', '') or '')
+    if not journal and (YEAR_RE.search(subject) or DOI_RE.search(subject) or re.search(r'\bdoi\b', subject, re.IGNORECASE)):
+        # Publisher PDFs often use "/Subject (Journal Name, 2016, doi:10....)"; a bare keyword list ("Cancer; Immunotherapy") is not a journal.
+        journal = re.split(r',|;|\bdoi\b|\d{4}', subject, maxsplit=1)[0].strip() or None
+    year = None
+    for tag in ('prism:coverDate', 'prism:publicationDate', 'dc:date'):
+        m = YEAR_RE.search(_xmp_field(packet, tag) or '')
+        if m: year = m.group(1); break
+    if arxiv:
+        journal = "Preprint"; year = year or f"20{arxiv.group(1)}"
+    year = year or _info_year(info)
+
+    checks = []
+    title_ok = bool(title) and len(title) >= 15 and not _JUNK_TITLE_RE.search(title) and _norm(title)[:60] in page_norm
+    checks.append(title_ok)
+    author = last_name(creators[0]) if creators else None
+    checks.append(bool(author) and len(author) > 1 and _norm(author) in page_norm)
+    checks.append(bool(year) and (year in (first_page_text or '') or (arxiv is not None and year == f"20{arxiv.group(1)}")))
+    journal_ok = bool(journal) and (journal == "Preprint" or (bool(_norm(journal)) and _norm(journal) in page_norm))
+    checks.append(journal_ok)
+    confidence = sum(checks) / len(checks)
+    if not (title and author and year and journal): return None, confidence
+    details = {"author": author, "year": year, "journal": journal, "title": title,
+               "is_multiple_authors": len(creators) > 1}
+    if doi: details["doi"] = doi
+    return details, confidence
@@ -0,0 +1,220 @@
+# pipeline.py
+"""
+Staged extraction pipeline used by the GUI worker threads.
+
+    submit() -> [extract queue] -> process pool (pypdf + embedded metadata) -> [LLM queue] -> asyncio LLM workers -> out_queue
+
+Papers whose embedded metadata is complete and consistent skip the LLM stage entirely.
+The LLM stage is a single event-loop thread running `llm_workers` coroutines on one
+shared client, so many requests are in flight without a thread per request. When the
+LLM queue has a backlog (bulk runs), each worker drains several papers and sends them
+as one batched request sized to a token budget.
+
+Every hand-off is a bounded queue, so a slow reviewer (a full out_queue / gui_queue)
+stalls the LLM stage, which in turn stalls extraction, instead of piling work up in memory.
+
+Papers the LLM stage could not answer (quota or server errors that outlasted the
+per-request retries, malformed replies) go to a separate retry queue and are tried
+again after a growing delay, ahead of fresh work, before they are reported as failed.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from queue import Queue
+
+from core_logic import (BATCH_MAX_PAPERS, BATCH_TOKEN_BUDGET, FAST_PATH_MIN_CONFIDENCE, SNIPPET_TOKEN_BUDGET, accept_embedded,
+                        arequest_paper_details_many, cache_extraction, cached_extraction, details_version, extract_paper)
+import pdf_guard
+from metrics import METRICS
+
+LLM_RETRY_ROUNDS = 2          # extra passes through the retry queue before a paper is reported failed
+LLM_RETRY_ROUND_DELAY_S = 30  # first retry-queue delay; doubles each round (with jitter)
+
+class ExtractionPipeline:
+    def __init__(self, client, out_queue: Queue, cache=None, extract_workers: int = 2, llm_workers: int = 4, queue_size: int = 16,
+                 batch_max_papers: int = BATCH_MAX_PAPERS, batch_token_budget: int = BATCH_TOKEN_BUDGET, on_failure=None,
+                 fast_path_min_confidence: float = FAST_PATH_MIN_CONFIDENCE, snippet_token_budget: int = SNIPPET_TOKEN_BUDGET,
+                 retry_rounds: int = LLM_RETRY_ROUNDS, retry_delay_s: float = LLM_RETRY_ROUND_DELAY_S):
+        self.client = client; self.out_queue = out_queue; self.cache = cache
+        self.details_version = details_version(client); self.fast_path_min_confidence = fast_path_min_confidence
+        self.on_failure = on_failure  # optional callback(mode, pdf_path, reason) for papers that produce no details
+        self.extract_workers = max(1, int(extract_workers)); self.llm_workers = max(1, int(llm_workers))
+        self._extract_q = Queue(maxsize=queue_size)
+        self._inflight_q = Queue(maxsize=self.extract_workers * 2)  # futures handed to the pool, in submit order
+        self._queue_size = queue_size; self._llm_q = None; self._loop = None  # asyncio.Queue, created on the LLM loop
+        self.batch_max_papers = max(1, int(batch_max_papers)); self.batch_token_budget = int(batch_token_budget)
+        self.snippet_token_budget = int(snippet_token_budget)  # compact excerpt per paper; 0 sends the full snippet
+        self.retry_rounds = max(0, int(retry_rounds)); self.retry_delay_s = float(retry_delay_s)
+        self._retry_heap = []; self._retry_seq = itertools.count(); self._rounds = {}  # loop-thread only: (due, seq, item), path -> rounds used
+        self._pool = None; self._threads = []
+        METRICS.gauge("queue_depth", self._extract_q.qsize, queue="extract"); METRICS.gauge("queue_depth", self._inflight_q.qsize, queue="extract_inflight")
+        METRICS.gauge("queue_depth", lambda: self._llm_q.qsize() if self._llm_q is not None else 0, queue="llm")
+        METRICS.gauge("queue_depth", lambda: len(self._retry_heap), queue="llm_retry")
+        METRICS.gauge("queue_depth", out_queue.qsize, queue="out")
+
+    def start(self):
+        # Spawned workers (Windows, macOS) start from defaults: hand them this process's PDF size/time limits.
+        self._pool = ProcessPoolExecutor(max_workers=self.extract_workers, initializer=pdf_guard.set_limits, initargs=(pdf_guard.LIMITS,))
+        self._loop = asyncio.new_event_loop(); ready = threading.Event()
+        self._spawn(lambda: self._run_llm_loop(ready), "llm"); ready.wait()
+        self._spawn(self._extract_loop, "extract-dispatch"); self._spawn(self._collect_loop, "extract-collect")
+        logging.info(f"Pipeline started: {self.extract_workers} extraction process(es), {self.llm_workers} LLM worker(s).")
+
+    def _spawn(self, target, name):
+        t = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True); t.start(); self._threads.append(t)
+
+    def submit(self, mode: str, pdf_path: Path):
+        """Queue a paper for extraction. Blocks while the pipeline is saturated (backpressure)."""
+        METRICS.inc("papers_submitted"); self._extract_q.put((mode, pdf_path))
+
+    def _failed(self, mode: str, pdf_path: Path, reason: str):
+        logging.error(f"Could not get details for {pdf_path.name}: {reason}"); METRICS.inc("papers_failed")
+        if self.on_failure is None: return
+        try: self.on_failure(mode, pdf_path, reason)
+        except Exception as e: logging.error(f"Failure handler error for {pdf_path.name}: {e}")
+
+    def shutdown(self):
+        if self._pool is not None: self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._loop is not None and self._loop.is_running(): self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def extract_many(self, pdf_paths, stop_event: threading.Event = None):
+        """Yields (pdf_path, text_snippet) for background jobs such as library indexing: read from the snippet cache,
+        else parsed once in the extraction pool (and cached), at most one paper per process in flight so sorting isn't starved."""
+        pending = deque()
+        def finished(keep):
+            while len(pending) > keep:
+                pdf_path, future = pending.popleft()
+                try: text_snippet, embedded = future.result()
+                except Exception as e: logging.debug(f"Library scan skipped {pdf_path}: {e}"); continue
+                if self.cache is not None: cache_extraction(pdf_path, self.cache, text_snippet, embedded)
+                yield pdf_path, text_snippet
+        for pdf_path in pdf_paths:
+            if stop_event is not None and stop_event.is_set(): break
+            try: extracted = cached_extraction(pdf_path, self.cache) if self.cache is not None else None
+            except Exception as e: logging.debug(f"Library scan skipped {pdf_path}: {e}"); continue
+            if extracted is not None: yield pdf_path, extracted[0]; continue
+            try: pending.append((pdf_path, self._pool.submit(extract_paper, pdf_path)))
+            except RuntimeError: break  # pool shut down
+            yield from finished(self.extract_workers - 1)
+        yield from finished(0)
+
+    def _to_llm(self, item):
+        # Called from the extraction threads; blocks while the LLM queue is full.
+        asyncio.run_coroutine_threadsafe(self._llm_q.put(item), self._loop).result()
+
+    # Both loops guard each paper: an error (cache, disk, a bad file) fails that paper instead of killing the thread,
+    # which would leave everything queued behind it (and a CLI waiting on its results) hanging.
+    def _extract_loop(self):
+        while True:
+            mode, pdf_path = self._extract_q.get()
+            try: self._dispatch(mode, pdf_path)
+            except Exception as e: self._failed(mode, pdf_path, f"extraction error ({e})")
+
+    def _dispatch(self, mode: str, pdf_path: Path):
+        if self.cache is not None:
+            cached = self.cache.get(pdf_path, self.details_version)
+            METRICS.inc("cache_lookups", kind="details", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                logging.info(f"Cache hit for {pdf_path.name}; skipping AI call.")
+                METRICS.inc("papers_completed", source="cache"); self.out_queue.put((mode, pdf_path, cached)); return
+            extracted = cached_extraction(pdf_path, self.cache)
+            if extracted is not None:  # parsed before (e.g. under an older prompt): no re-parse, but the fast path still applies
+                self._route(mode, pdf_path, *extracted); return
+        try: future = self._pool.submit(extract_paper, pdf_path)
+        except RuntimeError as e:  # pool shut down
+            self._failed(mode, pdf_path, f"extraction pool unavailable ({e})"); return
+        self._inflight_q.put((mode, pdf_path, future, time.perf_counter()))
+
+    def _collect_loop(self):
+        while True:
+            mode, pdf_path, future, submitted = self._inflight_q.get()
+            try: self._collect(mode, pdf_path, future, submitted)
+            except Exception as e: self._failed(mode, pdf_path, f"extraction error ({e})")
+
+    def _collect(self, mode: str, pdf_path: Path, future, submitted: float):
+        try: text_snippet, embedded = future.result()
+        except pdf_guard.PdfRejected as e:  # counted here: the worker process's METRICS are not this one's
+            METRICS.inc("pdf_rejected", reason=e.reason); self._failed(mode, pdf_path, f"skipped ({e})"); return
+        except Exception as e:
+            self._failed(mode, pdf_path, f"text extraction error ({e})"); return
+        METRICS.observe("stage", time.perf_counter() - submitted, stage="extract")  # includes waiting for a free process
+        METRICS.inc("snippet_chars", len(text_snippet or ""))
+        if self.cache is not None: cache_extraction(pdf_path, self.cache, text_snippet, embedded)
+        self._route(mode, pdf_path, text_snippet, embedded)
+
+    def _route(self, mode: str, pdf_path: Path, text_snippet, embedded: tuple):
+        details = accept_embedded(pdf_path, embedded, self.fast_path_min_confidence)
+        if details is not None:  # zero-LLM fast path
+            if self.cache is not None: self.cache.put(pdf_path, details, self.details_version)
+            METRICS.inc("papers_completed", source="fast_path"); self.out_queue.put((mode, pdf_path, details)); return
+        if not text_snippet:
+            self._failed(mode, pdf_path, "no extractable text"); return
+        self._to_llm((mode, pdf_path, text_snippet, time.perf_counter()))
+
+    def _run_llm_loop(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        async def _main():
+            self._llm_q = asyncio.Queue(maxsize=self._queue_size); ready.set()
+            await asyncio.gather(*(self._llm_worker() for _ in range(self.llm_workers)))
+        try: self._loop.run_until_complete(_main())
+        except RuntimeError: pass  # loop stopped by shutdown()
+
+    def _due_retries(self) -> list:
+        items, now = [], time.monotonic()
+        while self._retry_heap and self._retry_heap[0][0] <= now and len(items) < self.batch_max_papers:
+            items.append(heapq.heappop(self._retry_heap)[2])
+        return items
+
+    async def _next_items(self) -> list:
+        # Due retries go first; otherwise wait for fresh work, waking up when the next retry falls due.
+        while True:
+            items = self._due_retries()
+            if items: return items
+            timeout = max(0.0, self._retry_heap[0][0] - time.monotonic()) if self._retry_heap else None
+            try: items = [await asyncio.wait_for(self._llm_q.get(), timeout)]
+            except asyncio.TimeoutError: continue
+            while len(items) < self.batch_max_papers:  # opportunistic: only batch what is already waiting
+                try: items.append(self._llm_q.get_nowait())
+                except asyncio.QueueEmpty: break
+            return items
+
+    def _schedule_retry(self, item) -> bool:
+        rounds = self._rounds.get(item[1], 0)
+        if rounds >= self.retry_rounds: self._rounds.pop(item[1], None); return False
+        self._rounds[item[1]] = rounds + 1; delay = self.retry_delay_s * 2 ** rounds * random.uniform(0.5, 1.0)
+        heapq.heappush(self._retry_heap, (time.monotonic() + delay, next(self._retry_seq), item[:3] + (time.perf_counter() + delay,)))  # queue wait counts from when it falls due
+        METRICS.inc("llm_retry_queued"); logging.info(f"No AI answer for {item[1].name} yet; retrying in {delay:.0f} s ({rounds + 1}/{self.retry_rounds}).")
+        return True
+
+    async def _llm_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._next_items()
+            started = time.perf_counter()
+            for *_, queued in items: METRICS.observe("stage", started - queued, stage="llm_queue_wait")
+            snippets = {str(i): text_snippet for i, (_, _, text_snippet, _) in enumerate(items)}
+            try: answers = await arequest_paper_details_many(snippets, self.client, self.batch_token_budget, self.batch_max_papers,
+                                                                   self.snippet_token_budget)
+            except Exception as e:
+                logging.error(f"AI processing error for {len(items)} paper(s): {e}"); answers = {}
+            METRICS.observe("stage", time.perf_counter() - started, stage="llm")
+            for i, item in enumerate(items):
+                mode, pdf_path = item[:2]; details = answers.get(str(i))
+                # Hand-offs can block (bounded out_queue), so they run off the event loop.
+                if not details:
+                    if not self._schedule_retry(item): await loop.run_in_executor(None, self._failed, mode, pdf_path, "no details from AI")
+                    continue
+                self._rounds.pop(pdf_path, None)
+                if self.cache is not None:
+                    try: self.cache.put(pdf_path, details, self.details_version)
+                    except Exception as e: logging.warning(f"Could not cache details for {pdf_path.name}: {e}")  # the answer is still good
+                METRICS.inc("papers_completed", source="llm")
+                await loop.run_in_executor(None, self.out_queue.put, (mode, pdf_path, details))
@@ -0,0 +1,62 @@
+# prefetch.py
+"""
+Ordered background prefetch for review flows that walk a list of papers one by one.
+
+A worker thread extracts details in chunks (one batched AI request per chunk), staying
+at most `lookahead` papers ahead of the paper currently under review, so proposals are
+ready when the user reaches them without spending API calls on a selection they may
+abandon halfway. Callers check `ready(i)` (or wait for `on_ready`) before `result(i)`.
+"""
+
+import logging
+import threading
+
+class Prefetcher:
+    def __init__(self, items: list, fetch_many, lookahead: int = 16, chunk_size: int = 8, on_progress=None, on_ready=None):
+        self.items = list(items); self.fetch_many = fetch_many  # fetch_many(list) -> {item: result or None}
+        self.chunk_size = max(1, chunk_size); self.lookahead = max(self.chunk_size, lookahead)
+        self.on_progress = on_progress  # callback(done, total) on the worker thread
+        self.on_ready = on_ready  # callback(index) on the worker thread, after each result lands
+        self._results = {}; self._cursor = 0; self._next = 0
+        self._cond = threading.Condition(); self._cancelled = False
+        self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+
+    def start(self):
+        self._thread.start(); return self
+
+    def cancel(self):
+        with self._cond: self._cancelled = True; self._cond.notify_all()
+
+    @property
+    def cancelled(self) -> bool: return self._cancelled
+
+    def ready(self, index: int) -> bool:
+        with self._cond: return index in self._results or self._cancelled
+
+    def result(self, index: int):
+        """Result for items[index] (None if extraction failed); also moves the lookahead window forward."""
+        with self._cond:
+            self._cursor = max(self._cursor, index); self._cond.notify_all()
+            return self._results.get(index)
+
+    def _run(self):
+        total = len(self.items)
+        while True:
+            with self._cond:
+                # Wait for room for a full chunk, unless the reviewer is already waiting on the next paper.
+                room = lambda: self._cursor + self.lookahead - self._next
+                self._cond.wait_for(lambda: self._cancelled or self._next >= total or self._cursor >= self._next
+                                    or room() >= min(self.chunk_size, total - self._next))
+                if self._cancelled or self._next >= total: return
+                # First chunk is a single paper so the first proposal appears as soon as possible.
+                size = 1 if self._next == 0 else min(self.chunk_size, max(1, room()))
+                start = self._next; chunk = self.items[start:start + size]; self._next = start + len(chunk)
+            try: found = self.fetch_many(chunk)
+            except Exception as e:
+                logging.error(f"Prefetch failed for {len(chunk)} paper(s): {e}"); found = {}
+            with self._cond:
+                for offset, item in enumerate(chunk): self._results[start + offset] = found.get(item)
+                self._cond.notify_all()
+            if self.on_progress is not None: self.on_progress(start + len(chunk), total)
+            if self.on_ready is not None:
+                for offset in range(len(chunk)): self.on_ready(start + offset)
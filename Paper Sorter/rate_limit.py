@@ -0,0 +1,84 @@
+# rate_limit.py
+"""
+Quota-aware pacing and retry policy for LLM calls.
+
+`RateLimiter` holds two token buckets, requests/minute and tokens/minute, shared by
+every thread and coroutine that uses the client. A caller reserves its request up
+front and gets back how long to wait, so callers queue up in arrival order, and a
+bulk run settles just under the quota instead of bursting into 429s:
+
+    wait = limiter.reserve(prompt_tokens)      # then time.sleep(wait) / await asyncio.sleep(wait)
+    ...
+    limiter.charge(reply_tokens)               # output tokens count against TPM too
+    limiter.cooldown(seconds)                  # after a 429: every caller pauses, not just the one that hit it
+
+`retry_delay` is the backoff policy for transient failures (429, 5xx, timeouts, dropped
+connections): exponential with full jitter, never shorter than a server's Retry-After.
+"""
+
+import http.client
+import random
+import threading
+import time
+
+RETRY_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 60.0
+
+BURST_FRACTION = 0.1  # share of a minute's quota that may go out at once
+
+class TokenBucket:
+    """Allows a burst of `per_minute * BURST_FRACTION`, refilled at a rate that keeps any 60 s window within
+    `per_minute` (providers count quotas over a sliding minute); reservations may run it negative (a queue of debt)."""
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, per_minute * BURST_FRACTION); self.rate = max(per_minute - self.capacity, 1.0) / 60.0
+        self.level = self.capacity; self.stamp = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate); self.stamp = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now); self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+class RateLimiter:
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.rpm = rpm; self.tpm = tpm
+        self._requests = TokenBucket(rpm) if rpm else None
+        self._tokens = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock(); self._cooldown_until = 0.0
+
+    def reserve(self, tokens: int) -> float:
+        """Books one request of `tokens` input tokens; returns the seconds to wait before sending it."""
+        with self._lock:
+            now = time.monotonic(); wait = max(0.0, self._cooldown_until - now)
+            if self._requests is not None: wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens is not None: wait = max(wait, self._tokens.reserve(tokens, now))
+            return wait
+
+    def charge(self, tokens: int):
+        if self._tokens is None: return
+        with self._lock: self._tokens.reserve(tokens, time.monotonic())
+
+    def cooldown(self, seconds: float):
+        with self._lock: self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+
+def make_limiter(config: dict):
+    rpm, tpm = config.get("llm_rpm", 0), config.get("llm_tpm", 0)
+    return RateLimiter(rpm, tpm) if rpm or tpm else None
+
+def error_status(exc: BaseException):
+    # LLMError.status (OpenAI-compatible backend) or google.api_core's GoogleAPICallError.code.
+    for attr in ("status", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int) and not isinstance(value, bool): return value
+    return None
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (TimeoutError, ConnectionError, EOFError, http.client.HTTPException)): return True
+    return error_status(exc) in RETRY_STATUSES
+
+def retry_delay(exc: BaseException, attempt: int, rng: random.Random = random) -> float:
+    """Seconds before retry number `attempt + 1` (attempt counts from 0)."""
+    delay = rng.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt))
+    return max(delay, float(getattr(exc, "retry_after", None) or 0))
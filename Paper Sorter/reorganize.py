@@ -0,0 +1,343 @@
+# reorganize.py
+"""
+Bulk re-organize of the sorted library: renames (and optionally re-files) every paper
+from its cached details and a filename template, with a write-ahead journal and undo.
+
+    python reorganize.py plan                                       # what would change; no files touched
+    python reorganize.py apply --template "{year}_{author}_{short_title}"
+    python reorganize.py apply --folders "{journal}"                # also file papers into per-journal folders
+    python reorganize.py undo                                       # reverse the latest run (or: undo <run>)
+    python reorganize.py list
+
+Planning reads no PDFs: one walk of the library plus one query each for the cached
+hashes and the cached details (any model or prompt version). Papers without cached
+details stay where they are and are listed. Target names are made unique per folder,
+case-insensitively as on Windows, against the files that stay and the other targets.
+
+Before the first rename the whole plan is written to reorganize/<run>.jsonl and synced
+to disk. Papers whose current name another paper will take are first moved aside to a
+hidden staging name; then every rename runs on a thread pool. `undo` finds each paper
+(at its new name, its staging name or already back) and moves it back through the same
+two steps, so it also cleans up a crashed apply and can be re-run if interrupted.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from core_logic import FILENAME_TEMPLATE, check_template, propose_filename, render_template
+from move_engine import place
+
+JOURNAL_DIRNAME = "reorganize"
+STAGE_PREFIX = ".reorganize-"
+REORGANIZE_WORKERS = 8
+
+@dataclass
+class Move:
+    src: Path
+    dst: Path
+    size: int
+    mtime_ns: int
+    stage: Path = None  # hidden name the paper waits under while another paper takes its current name
+
+@dataclass
+class Plan:
+    root: Path
+    template: str
+    folder_template: str = ""
+    moves: list = field(default_factory=list)
+    unchanged: int = 0
+    missing: list = field(default_factory=list)  # papers without cached details
+    numbered: int = 0                            # targets that got a -N suffix to avoid a clash
+    seconds: float = 0.0
+
+def _key(path: Path) -> str: return str(path).casefold()
+
+def _numbered(stem: str, base: str) -> bool:
+    # "Smith_2019-2" for "Smith_2019"; plain string checks, as a regex per paper would dominate planning.
+    head, _, n = stem.rpartition("-")
+    return n.isdigit() and head.casefold() == base.casefold()
+
+# ----------------------------
+# Planning
+# ----------------------------
+def scan_library(root: Path) -> list[tuple[Path, int, int]]:
+    """(path, size, mtime_ns) of every PDF under root; hidden folders and staging files are skipped."""
+    found, stack = [], [str(root)]
+    while stack:
+        try: entries = list(os.scandir(stack.pop()))
+        except OSError: continue
+        for entry in entries:
+            if entry.name.startswith('.'): continue
+            try:
+                if entry.is_dir(follow_symlinks=False): stack.append(entry.path)
+                elif entry.name.lower().endswith('.pdf'): st = entry.stat(); found.append((Path(entry.path), st.st_size, st.st_mtime_ns))
+            except OSError: continue
+    return found
+
+def cached_details(root: Path, files, cache, duplicate_index=None, hash_missing: bool = False) -> dict[Path, dict]:
+    """Details per file from the cache: by (path, size, mtime), else the duplicate index's hash, else (opt-in) a fresh hash."""
+    hashed = cache.hashed_files(root); by_hash = cache.latest_details()
+    indexed = duplicate_index.hashes() if duplicate_index is not None else {}
+    found = {}
+    for path, size, mtime_ns in files:
+        row = hashed.get(str(path))
+        sha = row[2] if row and row[0] == size and row[1] == mtime_ns else indexed.get(os.path.relpath(path, root))
+        if sha is None and hash_missing:
+            try: sha = cache.content_hash(path)
+            except OSError: continue
+        if sha in by_hash: found[path] = by_hash[sha]
+    return found
+
+def plan(root: Path, cache, template: str = FILENAME_TEMPLATE, folder_template: str = "", duplicate_index=None, hash_missing: bool = False) -> Plan:
+    start = time.perf_counter(); root = Path(root).resolve()
+    check_template(template)
+    if folder_template: check_template(folder_template)
+    result = Plan(root, template, folder_template)
+    files = scan_library(root); details = cached_details(root, files, cache, duplicate_index, hash_missing)
+    wanted = []
+    for path, size, mtime_ns in files:
+        d = details.get(path)
+        if d is None: result.missing.append(path); continue
+        folder = root / render_template(folder_template, d) if folder_template else path.parent
+        dst = folder / propose_filename(d, template)
+        # A paper already numbered against the same target (Smith_2019-2.pdf for Smith_2019.pdf) keeps its number.
+        if dst.parent == path.parent and _numbered(path.stem, dst.stem): dst = path
+        wanted.append((path, dst, size, mtime_ns))
+    moving = {_key(src) for src, dst, _, _ in wanted if _key(src) != _key(dst)}
+    taken = {_key(path) for path, _, _ in files if _key(path) not in moving}  # names that stay occupied
+    for src, dst, size, mtime_ns in sorted(wanted, key=lambda w: _key(w[0])):
+        if src == dst: result.unchanged += 1; continue
+        final = dst; n = 0
+        if _key(src) != _key(dst):  # a case-only rename keeps its own slot
+            while _key(final) in taken: n += 1; final = dst.with_name(f"{dst.stem}-{n}{dst.suffix}")
+            taken.add(_key(final)); result.numbered += bool(n)
+        result.moves.append(Move(src, final, size, mtime_ns))
+    result.seconds = time.perf_counter() - start
+    return result
+
+# ----------------------------
+# Journal
+# ----------------------------
+class Journal:
+    """Append-only JSON Lines log; `sync=True` records are on disk before the call returns."""
+    def __init__(self, path: Path):
+        self.path = Path(path); self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8"); self._lock = threading.Lock()
+    def write(self, sync: bool = False, **record):
+        with self._lock:
+            self._f.write(json.dumps(record, ensure_ascii=False) + "\n"); self._f.flush()
+            if sync: os.fsync(self._f.fileno())
+    def close(self): self._f.close()
+
+def read_journal(path: Path) -> tuple[dict, list[Move], bool]:
+    """(header, planned moves, whether the plan was committed); a torn last line is ignored."""
+    header, moves, committed = {}, [], False
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try: rec = json.loads(line)
+            except json.JSONDecodeError: continue
+            if "run" in rec and not header: header = rec
+            elif "i" in rec and "src" in rec:
+                moves.append(Move(Path(rec["src"]), Path(rec["dst"]), rec["size"], rec["mtime_ns"], Path(rec["stage"]) if rec.get("stage") else None))
+            elif "planned" in rec: committed = True
+    return header, moves, committed
+
+def list_runs(journal_dir: Path) -> list[dict]:
+    """Header plus outcome of every run, oldest first."""
+    runs = []
+    for path in sorted(Path(journal_dir).glob("*.jsonl"), key=lambda p: (p.stem[:15], len(p.stem), p.stem)):  # 20260101-120000, then -2, -3...
+        info = {"journal": path}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try: rec = json.loads(line)
+                except json.JSONDecodeError: continue
+                if "run" in rec and "run" not in info: info.update(rec)
+                elif "finished" in rec: info[rec["finished"]] = rec
+        runs.append(info)
+    return runs
+
+# ----------------------------
+# Applying and undoing
+# ----------------------------
+def _rename(src: Path, dst: Path):
+    dst.parent.mkdir(parents=True, exist_ok=True); place(src, dst)  # atomic and never overwrites: FileExistsError if dst is taken
+
+def _execute(moves: list[Move], journal: Journal, workers: int, on_moved=None, label: str = "i") -> tuple[int, int]:
+    """Staging pass, then the final renames, each on a thread pool. Returns (moved, failed)."""
+    staged, events = set(), []
+    renamed = lambda src, dst: events.append((src, dst))  # list.append is atomic; order is rename order
+    def flush():
+        # Indexes follow every rename, staging included, so swapped papers never share a key; one batch per pass.
+        if on_moved is None or not events: return
+        try: on_moved(events[:])
+        except Exception as e: logging.warning(f"Index update after {len(events)} rename(s) failed: {e}")
+        events.clear()
+    def stage(i):
+        m = moves[i]
+        try: _rename(m.src, m.stage)
+        except OSError as e: journal.write(**{label: i, "step": "failed", "error": str(e)}); logging.error(f"Could not set aside '{m.src.name}': {e}"); return
+        staged.add(i); journal.write(**{label: i, "step": "staged"}); renamed(m.src, m.stage)
+    def finish(i):
+        m = moves[i]; src = m.stage if i in staged else m.src
+        if m.stage is not None and i not in staged: return False  # staging failed; the paper never left
+        try: _rename(src, m.dst)
+        except OSError as e:
+            journal.write(**{label: i, "step": "failed", "error": str(e)}); logging.error(f"Could not move '{m.src.name}' -> '{m.dst.name}': {e}")
+            if i in staged:
+                try: _rename(src, m.src); renamed(src, m.src)
+                except OSError: logging.error(f"'{m.src.name}' is left as '{src}'; undo the run to restore it.")
+            return False
+        journal.write(**{label: i, "step": "moved"}); renamed(src, m.dst)
+        return True
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="reorganize") as pool:
+        try:
+            list(pool.map(stage, [i for i, m in enumerate(moves) if m.stage is not None])); flush()
+            outcomes = list(pool.map(finish, range(len(moves))))
+        finally: flush()
+    moved = sum(outcomes); failed = len(moves) - moved
+    return moved, failed
+
+def _assign_stages(moves: list[Move], run: str, tag: str = ""):
+    # Only papers whose current name is another paper's target need to step aside first.
+    targets = {_key(m.dst) for m in moves}
+    for i, m in enumerate(moves):
+        if _key(m.src) in targets and _key(m.src) != _key(m.dst): m.stage = m.src.with_name(f"{STAGE_PREFIX}{run}-{tag}{i}.pdf")
+
+def _new_journal(journal_dir: Path) -> tuple[str, Journal]:
+    run = time.strftime("%Y%m%d-%H%M%S"); n = 1; base = run
+    while (Path(journal_dir) / f"{run}.jsonl").exists(): n += 1; run = f"{base}-{n}"
+    return run, Journal(Path(journal_dir) / f"{run}.jsonl")
+
+def apply(result: Plan, journal_dir: Path, workers: int = REORGANIZE_WORKERS, on_moved=None) -> dict:
+    """Journals the plan (synced), then applies it. `on_moved(pairs)` gets the (src, dst) of every rename, staging included."""
+    run, journal = _new_journal(journal_dir); moves = result.moves; start = time.perf_counter()
+    _assign_stages(moves, run)
+    journal.write(run=run, root=str(result.root), template=result.template, folder_template=result.folder_template, moves=len(moves),
+                  ts=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    for i, m in enumerate(moves):
+        journal.write(i=i, src=str(m.src), dst=str(m.dst), stage=str(m.stage) if m.stage else None, size=m.size, mtime_ns=m.mtime_ns)
+    journal.write(planned=len(moves), sync=True)  # commit point: no file is touched before the plan is on disk
+    moved = failed = None
+    try: moved, failed = _execute(moves, journal, workers, on_moved)
+    finally:
+        seconds = round(time.perf_counter() - start, 2)
+        journal.write(finished="apply", moved=moved, failed=failed, seconds=seconds, sync=True); journal.close()
+    logging.info(f"Re-organize {run}: {moved} moved, {failed} failed in {seconds} s (journal {journal.path.name}).")
+    return {"run": run, "moved": moved, "failed": failed, "seconds": seconds, "journal": journal.path}
+
+def _same_paper(path: Path, m: Move) -> bool:
+    try: st = path.stat()
+    except OSError: return False
+    return st.st_size == m.size and st.st_mtime_ns == m.mtime_ns
+
+def undo(journal_path: Path, workers: int = REORGANIZE_WORKERS, on_moved=None) -> dict:
+    """Moves every paper of a run back to its original name; papers changed since (size/mtime) are left alone."""
+    header, moves, committed = read_journal(journal_path); run = header.get("run", Path(journal_path).stem)
+    back, left = [], 0
+    for m in moves if committed else []:
+        if _same_paper(m.src, m): continue  # never moved, or already back
+        at = next((p for p in (m.dst, m.stage) if p is not None and _same_paper(p, m)), None)
+        if at is None: left += 1; logging.warning(f"Undo {run}: '{m.dst.name}' was changed or removed since; leaving it."); continue
+        back.append(Move(at, m.src, m.size, m.mtime_ns))
+    _assign_stages(back, run, tag="u")
+    journal = Journal(journal_path); start = time.perf_counter()
+    journal.write(undo=len(back), ts=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    for i, m in enumerate(back): journal.write(u=i, src=str(m.src), dst=str(m.dst), stage=str(m.stage) if m.stage else None, sync=i == len(back) - 1)
+    moved = failed = None
+    try: moved, failed = _execute(back, journal, workers, on_moved, label="u")
+    finally:
+        seconds = round(time.perf_counter() - start, 2)
+        journal.write(finished="undo", moved=moved, failed=failed, left=left, seconds=seconds, sync=True); journal.close()
+    logging.info(f"Undo {run}: {moved} restored, {failed} failed, {left} left alone in {seconds} s.")
+    return {"run": run, "moved": moved, "failed": failed, "left": left, "seconds": seconds}
+
+def index_updater(cache=None, *indexes):
+    """on_moved callback that keeps the details cache and library indexes (anything with .move(pairs)) current."""
+    def on_moved(moves):
+        if cache is not None: cache.record_moves(moves)
+        for index in indexes:
+            if index is not None: index.move(moves)
+    return on_moved
+
+# ----------------------------
+# Command line
+# ----------------------------
+def _script_dir() -> Path:
+    if getattr(sys, "frozen", False): return Path(sys.executable).parent.resolve()  # PyInstaller
+    return Path(__file__).parent.resolve()
+
+def _describe(result: Plan, show: int) -> str:
+    rel = lambda p: os.path.relpath(p, result.root)
+    lines = [f"{len(result.moves)} to rename/move, {result.unchanged} unchanged, {len(result.missing)} without cached details, "
+             f"{result.numbered} numbered to avoid a clash (planned in {result.seconds:.2f} s)."]
+    lines += [f"  {rel(m.src)} -> {rel(m.dst)}" for m in result.moves[:show]]
+    if len(result.moves) > show: lines.append(f"  ... and {len(result.moves) - show} more")
+    return "\n".join(lines)
+
+def main(argv=None) -> int:
+    script_dir = _script_dir()
+    parser = argparse.ArgumentParser(description="Rename or re-file every paper in the sorted library from cached details, with undo.")
+    parser.add_argument("--config", default=str(script_dir / "config.json"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, text in (("plan", "show what would change"), ("apply", "plan and apply, journaled")):
+        p = commands.add_parser(name, help=text)
+        p.add_argument("--template", help=f"filename template (default: config filename_template or {FILENAME_TEMPLATE})")
+        p.add_argument("--folders", help='folder template under the library, e.g. "{journal}" or "{year}/{journal}" '
+                                         '(default: config reorganize_folder_template; empty keeps each paper in its folder)')
+        p.add_argument("--hash-missing", action="store_true", help="hash papers the cache has not seen (reads them) to find their details")
+        p.add_argument("--show", type=int, default=20, help="planned changes to print")
+        if name == "apply": p.add_argument("--workers", type=int, help=f"parallel renames (default: config reorganize_workers or {REORGANIZE_WORKERS})")
+    p = commands.add_parser("undo", help="reverse a run"); p.add_argument("run", nargs="?", help="run id (default: the latest)")
+    commands.add_parser("list", help="list runs")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', stream=sys.stderr)
+    try:
+        with open(args.config, "r", encoding="utf-8") as f: config = json.load(f)
+    except (OSError, ValueError) as e: logging.error(f"Cannot read {args.config}: {e}"); return 2
+    journal_dir = script_dir / JOURNAL_DIRNAME; workers = getattr(args, "workers", None) or config.get("reorganize_workers", REORGANIZE_WORKERS)
+
+    if args.command == "list":
+        for r in list_runs(journal_dir):
+            outcome = "; ".join(f"{k} {r[k].get('moved')} moved, {r[k].get('failed')} failed" for k in ("apply", "undo") if k in r)
+            print(f"{r.get('run', r['journal'].stem)}  {r.get('moves', '?')} planned  {outcome or 'not finished'}  template {r.get('template')!r}")
+        return 0
+    from single_instance import send
+    if args.command != "plan" and send("ping"): logging.error("The Paper Sorter window is open; close it first (its indexes would go stale)."); return 2
+    from duplicates import DuplicateIndex
+    from paper_cache import DetailsCache
+    cache = DetailsCache(Path(config.get("cache_path") or script_dir / "paper_cache.sqlite"), max_mb=config.get("cache_max_mb", 256))
+    # plan() and the journal work on resolved paths; the indexes key papers relative to their root, so they get the
+    # same resolved root (keys stay the ones the GUI wrote, even if sorted_folder goes through a symlink or mapped drive).
+    root = Path(config["sorted_folder"]).resolve()
+    duplicate_index = DuplicateIndex(root, script_dir / "duplicate_index.sqlite")
+    try:
+        if args.command == "undo":
+            runs = [r for r in list_runs(journal_dir) if not args.run or r.get("run") == args.run]
+            if not runs: logging.error(f"No run {args.run or ''} in {journal_dir}."); return 2
+            from folder_suggest import FolderSuggester
+            suggester = FolderSuggester(root, script_dir / "folder_suggest.sqlite")
+            done = undo(runs[-1]["journal"], workers, index_updater(cache, duplicate_index, suggester))
+            return 1 if done["failed"] else 0
+        try:
+            result = plan(root, cache, args.template or config.get("filename_template", FILENAME_TEMPLATE),
+                          config.get("reorganize_folder_template", "") if args.folders is None else args.folders, duplicate_index, args.hash_missing)
+        except (KeyError, ValueError) as e: logging.error(f"Bad template: {e}"); return 2
+        print(_describe(result, args.show))
+        if args.command == "plan" or not result.moves: return 0
+        from folder_suggest import FolderSuggester
+        suggester = FolderSuggester(root, script_dir / "folder_suggest.sqlite")
+        done = apply(result, journal_dir, workers, index_updater(cache, duplicate_index, suggester))
+        print(f"Run {done['run']}: {done['moved']} moved, {done['failed']} failed. Undo with: python reorganize.py undo {done['run']}")
+        return 1 if done["failed"] else 0
+    finally: cache.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
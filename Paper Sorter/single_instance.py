@@ -0,0 +1,114 @@
+# single_instance.py
+"""
+Single-instance lock and local hand-off channel for the GUI.
+
+The running GUI holds an OS file lock (instance.lock) and listens on a localhost port
+that it publishes, with a random token, in instance.json. Both files live in a per-user
+directory, so the watcher finds the GUI whichever folder each of them was installed in.
+On POSIX that is $XDG_RUNTIME_DIR when set, else a 0700 folder in the shared temp dir that
+must be owned by this user; instance.json is created 0600, so other local users cannot
+read the token.
+
+    lock = InstanceLock()
+    if not lock.acquire(): send("show"); sys.exit()      # second launch: raise the running window
+    lock.serve(on_paths=app.receive_paths, on_show=app.show_window)
+
+    send("open", paths)   # watcher: True if a running GUI took the files, False -> launch one
+
+Requests and replies are one JSON line each. The lock is released by the OS when the
+process exits, so a crash never leaves a stale instance behind.
+"""
+
+import getpass
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+MAX_REQUEST_BYTES = 1 << 20
+
+def instance_dir() -> Path:
+    runtime = os.environ.get("XDG_RUNTIME_DIR") if os.name != "nt" else None
+    if runtime and os.path.isdir(runtime): return Path(runtime) / "ai-paper-sorter"  # per-user, 0700, cleared at logout
+    try: user = getpass.getuser()
+    except Exception: user = "default"
+    return Path(tempfile.gettempdir()) / f"ai-paper-sorter-{user}"
+
+def _check_private(directory: Path):
+    """PermissionError unless `directory` is a real folder owned by this user; tightens it to 0700.
+    (A folder another user pre-created in /tmp could swap instance.json and collect what the watcher sends.)"""
+    if os.name == "nt": return  # the temp dir is already per-user
+    st = os.lstat(directory)  # lstat: a planted symlink is not followed
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid(): raise PermissionError(f"{directory} is not a folder owned by this user")
+    if stat.S_IMODE(st.st_mode) & 0o077: os.chmod(directory, 0o700)
+
+def _try_lock(f) -> bool:
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError: return False
+
+class InstanceLock:
+    def __init__(self, directory: Path = None):
+        self.directory = Path(directory or instance_dir()); self.info_path = self.directory / "instance.json"
+        self._file = None; self._server = None; self._token = secrets.token_hex(16)
+
+    def acquire(self) -> bool:
+        """True if this process is now the only GUI instance."""
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True); _check_private(self.directory)
+        f = open(self.directory / "instance.lock", "a+b"); f.seek(0)  # msvcrt locks from the current position
+        if not _try_lock(f): f.close(); return False
+        self._file = f; return True
+
+    def serve(self, on_paths, on_show=None):
+        """Starts the hand-off listener; callbacks run on its threads."""
+        token = self._token
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline(MAX_REQUEST_BYTES) or b"{}")
+                    if not hmac.compare_digest(str(request.get("token", "")), token): reply = {"ok": False, "error": "bad token"}
+                    else:
+                        command = request.get("command")
+                        if command == "open": on_paths([Path(p) for p in request.get("paths", [])])
+                        elif command == "show" and on_show is not None: on_show()
+                        reply = {"ok": command in ("open", "show", "ping")}
+                except Exception as e: reply = {"ok": False, "error": str(e)}
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler); self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="instance-ipc", daemon=True).start()
+        info = {"port": self._server.server_address[1], "token": token, "pid": os.getpid()}
+        tmp = self.info_path.with_suffix(".tmp"); tmp.unlink(missing_ok=True)
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w", encoding="utf-8") as f: json.dump(info, f)
+        os.replace(tmp, self.info_path)
+        logging.debug(f"Instance hand-off listening on 127.0.0.1:{info['port']}"); return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown(); self._server.server_close(); self._server = None
+            try: self.info_path.unlink()
+            except OSError: pass
+        if self._file is not None: self._file.close(); self._file = None
+
+def send(command: str, paths=(), directory: Path = None, timeout: float = 1.0) -> bool:
+    """Delivers a command ("open", "show", "ping") to the running GUI; False if none answered."""
+    try:
+        directory = Path(directory or instance_dir()); _check_private(directory)
+        info = json.loads((directory / "instance.json").read_text(encoding="utf-8"))
+        with socket.create_connection(("127.0.0.1", int(info["port"])), timeout=timeout) as conn:
+            conn.sendall(json.dumps({"command": command, "token": info["token"], "paths": [str(p) for p in paths]}).encode("utf-8") + b"\n")
+            reply = conn.makefile("rb").readline(MAX_REQUEST_BYTES)
+        return bool(json.loads(reply or b"{}").get("ok"))
+    except (OSError, ValueError, KeyError): return False  # no instance.json, nobody listening (stale file), or a garbled reply
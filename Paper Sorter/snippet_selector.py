@@ -0,0 +1,80 @@
+# snippet_selector.py
+"""
+Compact prompt excerpts: keeps the parts of a paper's extracted text that carry its
+citation metadata instead of sending the whole snippet (8000 characters, ~2000 tokens).
+
+  - title block: the first lines of page one (title, authors, affiliations)
+  - citation lines anywhere: DOI, copyright/licence, received/accepted/published dates,
+    volume(issue):pages, "Cite this article"
+  - running headers/footers: short lines repeated across pages (journal, year, volume)
+
+Pieces keep their original order, separated by "[...]", within a token budget. When the
+excerpt leaves author, year, journal or title Unknown, core_logic asks again with the
+full snippet (`needs_wider_context`) and fills only the missing fields (`fill_unknown`).
+"""
+
+import re
+from collections import Counter
+
+SNIPPET_TOKEN_BUDGET = 500  # 0 sends the full snippet
+HEAD_LINES = 12             # title block: first non-empty lines of page one
+MAX_LINE_CHARS = 200        # citation lines are short; longer lines are clipped
+GAP = "[...]"
+
+_CITATION_RE = re.compile(
+    r"\b10\.\d{4,9}/|\bdoi\b|©|\(c\)\s|\bcopyright\b|all rights reserved|creative commons|open access"
+    r"|\b(received|accepted|published|available online|epub)\b|cite this|citation:|to cite"
+    r"|\b(vol\.?|volume|issue|pp\.)\s*\d|\b\d{1,4}\s*\(\d{1,3}\)\s*[:,]\s*\d|\b(19|20)\d\d\s*[;,]\s*\d+", re.IGNORECASE)
+_JOURNAL_RE = re.compile(r"\b(journal|proceedings|transactions|letters|annals|bulletin|reports|preprint|arxiv|biorxiv|medrxiv)\b", re.IGNORECASE)
+_DIGITS_RE = re.compile(r"\d+")
+UNKNOWN = ("", "unknown", "unknown title", "none", "n/a")
+FIELDS = ("author", "year", "journal", "title")
+
+def _shape(line: str) -> str:
+    # Running headers differ only in page numbers: "Radiology 2019; 290: 12" ~ "Radiology 2019; 290: 13".
+    return _DIGITS_RE.sub("#", " ".join(line.lower().split()))
+
+def select_snippet(text: str, token_budget: int = SNIPPET_TOKEN_BUDGET) -> str:
+    """Returns `text` itself when it already fits (or the budget is 0), else a compact excerpt."""
+    max_chars = token_budget * 4  # same ~4 characters/token estimate as core_logic.estimate_tokens
+    if not text or token_budget <= 0 or len(text) <= max_chars: return text
+    lines = [l.strip() for l in text.splitlines()]
+    lines = [l[:MAX_LINE_CHARS] for l in lines if l]
+    repeats = Counter(_shape(l) for l in lines if 8 <= len(l) <= 120)
+    picks = []  # (priority, index): lower priority numbers are kept first when the budget runs out
+    for i, line in enumerate(lines):
+        if i < HEAD_LINES: picks.append((0, i))
+        elif len(line) <= 160 and _CITATION_RE.search(line): picks.append((1, i))
+        elif len(line) <= 100 and _JOURNAL_RE.search(line): picks.append((2, i))
+        elif repeats.get(_shape(line), 0) > 1: picks.append((3, i))
+    chosen, seen, used = set(), set(), 0
+    for _, i in sorted(picks):
+        shape = _shape(lines[i])
+        if shape in seen: continue  # one copy of each running header is enough
+        cost = len(lines[i]) + 1
+        if used + cost > max_chars:
+            if not chosen: chosen.add(i); used += cost  # never return an empty excerpt
+            continue
+        chosen.add(i); seen.add(shape); used += cost
+    out, last = [], -1
+    for i in sorted(chosen):
+        if last >= 0 and i != last + 1: out.append(GAP)
+        out.append(lines[i]); last = i
+    return "\n".join(out)[:max_chars]
+
+def is_unknown(value) -> bool:
+    return value is None or str(value).strip().lower() in UNKNOWN
+
+def needs_wider_context(details) -> bool:
+    return not details or any(is_unknown(details.get(key)) for key in FIELDS)
+
+def fill_unknown(details, wider):
+    """`details` with its Unknown fields taken from the wider-context answer."""
+    if not details: return wider
+    if not wider: return details
+    merged = dict(details)
+    for key in FIELDS:
+        if is_unknown(merged.get(key)) and not is_unknown(wider.get(key)):
+            merged[key] = wider[key]
+            if key == "author": merged["is_multiple_authors"] = wider.get("is_multiple_authors", merged.get("is_multiple_authors"))
+    return merged
@@ -0,0 +1,83 @@
+# startup.py
+"""
+Startup timing for the GUI: milestones since the process started, the cost of each
+module the background warm-up imports, and an offline import-time breakdown.
+
+    import startup                          # first import in the entry script
+    startup.mark("window")                  # milestone, seconds since startup was imported
+    with startup.phase("services"): ...     # duration of one warm-up step
+    startup.timed_import("pypdf", "numpy")  # imports and records each module's first-import cost
+    logging.info(startup.report())
+
+Everything is also recorded in METRICS (startup{milestone}, startup_phase{phase},
+import{module}). To see which imports dominate, run
+
+    python startup.py                       # -X importtime breakdown of paper_sorter_gui
+    python startup.py core_logic --top 30
+"""
+
+import argparse
+import importlib
+import logging
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from metrics import METRICS
+
+STARTED = time.perf_counter()
+_milestones: list[tuple[str, float]] = []  # (name, seconds since STARTED)
+_phases: list[tuple[str, float]] = []      # (name, duration), phases and first imports in order
+
+def mark(name: str) -> float:
+    elapsed = time.perf_counter() - STARTED; _milestones.append((name, elapsed))
+    METRICS.observe("startup", elapsed, milestone=name); return elapsed
+
+@contextmanager
+def phase(name: str):
+    start = time.perf_counter()
+    try: yield
+    finally:
+        elapsed = time.perf_counter() - start; _phases.append((name, elapsed)); METRICS.observe("startup_phase", elapsed, phase=name)
+
+def timed_import(*modules: str) -> list:
+    """Imports each module, recording how long it took (zero if something imported it earlier)."""
+    loaded = []
+    for name in modules:
+        start = time.perf_counter(); loaded.append(importlib.import_module(name)); elapsed = time.perf_counter() - start
+        _phases.append((f"import {name}", elapsed)); METRICS.observe("import", elapsed, module=name)
+    return loaded
+
+def report() -> str:
+    marks = ", ".join(f"{name} {t:.2f} s" for name, t in _milestones)
+    steps = ", ".join(f"{name} {t * 1000:.0f} ms" for name, t in sorted(_phases, key=lambda p: -p[1]) if t >= 0.005)
+    return f"Startup: {marks or 'no milestones'}" + (f" (warm-up: {steps})" if steps else "")
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def import_breakdown(target: str = "paper_sorter_gui", top: int = 20) -> list[tuple[float, float, str]]:
+    """Runs `python -X importtime -c "import <target>"` and returns the top (cumulative ms, self ms, module) rows."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"], capture_output=True, text=True)
+    rows = [(int(m.group(2)) / 1000, int(m.group(1)) / 1000, m.group(3)[1:] + m.group(4))
+            for m in map(_IMPORTTIME_RE.match, proc.stderr.splitlines()) if m]
+    if proc.returncode:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {target} failed"
+        if not rows: raise RuntimeError(error)
+        logging.warning(f"import {target} stopped early ({error}); the breakdown is partial.")
+    return sorted(rows, key=lambda r: -r[0])[:top]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Show which imports dominate a module's import time.")
+    parser.add_argument("module", nargs="?", default="paper_sorter_gui")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+    try: rows = import_breakdown(args.module, args.top)
+    except RuntimeError as e: print(f"Could not import {args.module}: {e}"); return 1
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module (indent = import depth)")
+    for cumulative, own, name in rows: print(f"{cumulative:>14.1f} {own:>9.1f}  {name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
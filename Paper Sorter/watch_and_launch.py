@@ -1,8 +1,9 @@
 """
 watch_and_launch.py
 Continuously watches the ToSort folder defined in config.json.
-Whenever a new PDF is dropped in, it launches the AI Paper Sorter GUI
-(if it is not already running).
+Whenever a new PDF is dropped in, it hands the file to the running AI Paper
+Sorter GUI over its local channel (single_instance.py), and launches the GUI
+only when no instance answers.
 """
 
 import sys
@@ -14,6 +15,9 @@ from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from file_stability import StabilityTracker
+from single_instance import send
+
 # ----------------------------
 # Environment & paths
 # ----------------------------
@@ -57,30 +61,7 @@ def find_gui_exe() -> Path | None:
             return cand
     return None
 
-def is_gui_running() -> bool:
-    try:
-        out = subprocess.check_output(
-            ["tasklist"], creationflags=0x08000000
-        ).decode(errors="ignore").lower()
-        return ("ai_paper_sorter.exe" in out) or (
-            "python.exe" in out and "paper_sorter_gui.py" in out
-        )
-    except Exception:
-        return False
-
-def wait_until_stable(path: Path, max_wait: float = 60.0, sample_interval: float = 0.5) -> bool:
-    deadline = time.time() + max_wait
-    last_size = -1
-    while time.time() < deadline:
-        try:
-            size = path.stat().st_size
-            if size == last_size and size > 0:
-                return True
-            last_size = size
-        except FileNotFoundError:
-            pass
-        time.sleep(sample_interval)
-    return False
+NO_WINDOW = 0x08000000 if os.name == "nt" else 0  # CREATE_NO_WINDOW; Popen rejects creation flags elsewhere
 
 def launch_gui():
     try:
@@ -89,13 +70,13 @@ def launch_gui():
             subprocess.Popen(
                 [str(exe)],
                 cwd=str(exe.parent),
-                creationflags=0x08000000,  # no console window
+                creationflags=NO_WINDOW,  # no console window
             )
         else:
             subprocess.Popen(
                 [sys.executable, str(GUI_PY)],
                 cwd=str(SCRIPT_DIR),
-                creationflags=0x08000000,
+                creationflags=NO_WINDOW,
             )
     except Exception as e:
         print("Launch error:", e)
@@ -108,27 +89,29 @@ class LaunchOnCreate(FileSystemEventHandler):
         super().__init__()
         self._last_launch_ts = 0.0
         self._DEBOUNCE_S = 5.0
+        # Events only register the file; the tracker calls back once per batch of settled files.
+        self.tracker = StabilityTracker(self._hand_off, settle_s=1.0, max_wait_s=60.0).start()
 
-    def _maybe_launch_gui(self):
+    def _hand_off(self, paths):
+        # A running GUI takes the files straight into its queue; no process scan needed.
+        if send("open", paths):
+            return
         now = time.time()
         if (now - self._last_launch_ts) < self._DEBOUNCE_S:
-            return
-        if not is_gui_running():
-            launch_gui()
+            return  # a GUI we just launched is still starting; its startup scan picks these files up
+        launch_gui()
         self._last_launch_ts = now
 
     def on_created(self, event):
         p = Path(getattr(event, "src_path", ""))
         if event.is_directory or p.suffix.lower() != ".pdf":
             return
-        if wait_until_stable(p):
-            self._maybe_launch_gui()
+        self.tracker.track(p)
 
     def on_moved(self, event):
         dest = Path(getattr(event, "dest_path", ""))
         if dest and dest.suffix.lower() == ".pdf":
-            if wait_until_stable(dest):
-                self._maybe_launch_gui()
+            self.tracker.track(dest)
 
 # ----------------------------
 # Main loop
@@ -146,6 +129,7 @@ def main():
         pass
     finally:
         observer.stop()
+        handler.tracker.stop()
         observer.join()
 
 if __name__ == "__main__":